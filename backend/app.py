@@ -1,19 +1,106 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, url_for
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import sys
 import os
-import numpy as np
+import threading
+import time
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 
 # Add backend to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
-from services.simulation import get_default_params, run_simulation, generate_plotly_chart
+from services.simulation import get_default_params, run_simulation, generate_plotly_chart, build_resumo
+from services.multi_fund import MAX_FUNDOS, montar_params_fundos, run_multi_fund_simulation
+from services.single_flight import canonical_params_key, create_single_flight
+from services.admission import AdmissionController, AdmissionRejected, combine_estimates, estimate_cost
+from services.jobs import JobRegistry
+from services.serialization import dataframe_to_columns, dumps
+from services.result_cache import ResultCache, TableCache
+from services.run_store import KPI_COLUMNS, RunStore
+from services.cube import ResultCube
+from services.calibration import DEFAULT_BOUNDS, Calibrator
+from services.live import LiveSessionManager
+from services import shared_results
+from utils.http import init_http_optimizations, source_version
+from utils.processes import process_context
+from utils.validators import validate_simulation_params
+from routes.credit_routes import credit_bp
 
 app = Flask(__name__, 
             template_folder='../frontend/templates',
             static_folder='../frontend/static')
 CORS(app)
 
+# Atrás de proxies reversos, TRUSTED_PROXIES = número de proxies confiáveis que
+# acrescentam X-Forwarded-For; só então o endereço remoto vem desse cabeçalho
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))
+if TRUSTED_PROXIES > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+# CRUD e endpoints em lote de créditos (/api/credits/...)
+app.register_blueprint(credit_bp, url_prefix='/api')
+
+# Compressão gzip/brotli e cache de longa duração para estáticos versionados
+init_http_optimizations(app)
+APP_STARTED_AT = time.time()
+
+# Coalesce chamadas concorrentes de /simulate com os mesmos parâmetros
+simulation_flight = create_single_flight()
+
+# Orçamento por requisição, limite por cliente e fila limitada de execução
+admission = AdmissionController.from_env()
+
+# Simulações pesadas são desviadas para execução assíncrona
+simulation_jobs = JobRegistry(
+    max_workers=int(os.environ.get("SIMULATE_ASYNC_WORKERS", 1)),
+    max_finished=int(os.environ.get("SIMULATE_ASYNC_MAX_RESULTS", 64)),
+    max_result_bytes=int(float(os.environ.get("SIMULATE_ASYNC_RESULTS_MB", 256)) * 1024 ** 2),
+)
+
+# Resultados recentes já serializados, para 304 e repetições sem recálculo
+result_cache = ResultCache(max_bytes=int(float(os.environ.get("SIMULATE_RESULT_CACHE_MB", 256)) * 1024 * 1024))
+
+# Simulações em processos separados, com o resultado entregue por memória compartilhada
+# (SIMULATE_PROCESS_WORKERS=0 executa na thread da requisição); workers via forkserver/spawn, não fork
+SIMULATE_PROCESS_WORKERS = int(os.environ.get("SIMULATE_PROCESS_WORKERS", 0))
+_simulation_processes = None
+_simulation_processes_lock = threading.Lock()
+
+def simulation_processes():
+    """
+    Pool de processos de /simulate, criado no primeiro uso: os workers
+    forkserver/spawn reimportam este módulo e não devem criar pools próprios.
+    """
+    global _simulation_processes
+    with _simulation_processes_lock:
+        if _simulation_processes is None:
+            _simulation_processes = ProcessPoolExecutor(max_workers=SIMULATE_PROCESS_WORKERS,
+                                                        mp_context=process_context())
+        return _simulation_processes
+
+# Tabelas grandes servidas por página (/simulate?tabelas=paginadas)
+table_cache = TableCache(max_bytes=int(float(os.environ.get("SIMULATE_TABLE_CACHE_MB", 256)) * 1024 * 1024))
+TABELAS_PAGINADAS = ("operacoes",)
+SUFIXO_PAGINADO = "-p"
+SUFIXO_AO_VIVO = "-v"
+MAX_TABLE_PAGE = 1_000_000
+
+# Versão do código que gerou os resultados (APP_VERSION ou hash do backend): entra no ETag
+# de /simulate, para que um deploy que muda a simulação não valide corpos antigos
+VERSAO_RESULTADOS = os.environ.get("APP_VERSION") or source_version(os.path.dirname(os.path.abspath(__file__)))
+
+# Calibrações rodam uma de cada vez (cada uma já usa um pool de processos)
+calibration_jobs = JobRegistry(max_workers=1, max_pending=int(os.environ.get("CALIBRATION_MAX_PENDING", 4)))
+
+# Limites por calibração
+MAX_CALIBRATION_REPLICAS = 20
+MAX_CALIBRATION_EVALUATIONS = 500
+
+# Histórico persistente das simulações (RUN_STORE_DB vazio desativa)
+run_store = RunStore.from_env()
+
 @app.route("/")
 def index():
     """Página principal com formulário de simulação"""
@@ -22,73 +109,575 @@ def index():
 @app.route("/parametros", methods=["GET"])
 def get_parametros():
     """Retorna os parâmetros padrão da simulação"""
-    return jsonify(get_default_params())
+    response = jsonify(get_default_params())
+    # Os padrões só mudam com um novo deploy: o navegador revalida e recebe 304
+    response.add_etag(weak=True)
+    response.last_modified = APP_STARTED_AT
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def merge_params(data):
+    """Mescla os parâmetros recebidos com os padrões da simulação"""
+    params = get_default_params()
+    # Se não houver dados, usa parâmetros padrão
+    if data:
+        params.update(data)
+    return params
+
+def invalid_params_response(errors):
+    """Resposta 400 com todos os erros de validação dos parâmetros"""
+    return jsonify({
+        "success": False,
+        "error": "Parâmetros de simulação inválidos: " + ", ".join(f"{e['field']} ({e['code']})" for e in errors),
+        "errors": errors
+    }), 400
+
+def build_simulation_body(params, paginado=False, cancel=None, salvar=True):
+    """
+    Executa a simulação e devolve o corpo JSON da resposta já serializado.
+
+    Com paginado=True, as tabelas de TABELAS_PAGINADAS ficam no servidor e a
+    resposta traz apenas colunas, tamanho e a URL das páginas. cancel é
+    repassado a run_simulation (SimulationCancelled interrompe a execução).
+    salvar=False não grava a execução no histórico (recálculos ao vivo).
+    """
+    # O cubo porte × safra × mês só é consultável pelo histórico: sem gravação, não é montado
+    gravar = run_store is not None and salvar
+    if SIMULATE_PROCESS_WORKERS > 0 and cancel is None:
+        # Executa em um processo do pool; as operações chegam como arrays sobre a memória
+        # compartilhada e seguem sem cópia até a serialização (ou o cache de tabelas)
+        df_carteira, df_fundo, operacoes, cubo = shared_results.simular_em_processo(
+            simulation_processes(), params, com_cubo=gravar)
+    else:
+        cubo = ResultCube(params["simulation_months"]) if gravar else None
+        df_carteira, df_fundo, df_operacoes = run_simulation(params, cubo=cubo, cancel=cancel)
+        operacoes = dataframe_to_columns(df_operacoes)
+    
+    # Gera gráfico interativo
+    chart = generate_plotly_chart(df_carteira, df_fundo)
+    
+    # Prepara resumo dos resultados
+    resumo = build_resumo(df_carteira, df_fundo)
+    
+    # Grava no histórico; uma falha no histórico não impede a resposta
+    key = canonical_params_key(params)
+    run_id = None
+    if gravar:
+        try:
+            run_id = run_store.save(key, params, resumo, df_carteira, df_fundo, cubo)
+        except Exception:
+            app.logger.exception("Falha ao gravar a simulação no histórico")
+    
+    # Tabelas em formato colunar, montadas direto dos arrays NumPy
+    payload = {
+        "success": True,
+        "run_id": run_id,
+        "resumo": resumo,
+        "chart": chart,
+        "carteira": dataframe_to_columns(df_carteira),
+        "fundo": dataframe_to_columns(df_fundo),
+        "operacoes": operacoes
+    }
+    if paginado:
+        for nome in TABELAS_PAGINADAS:
+            tabela = payload[nome]
+            table_cache.put(key, nome, tabela)
+            payload[nome] = {
+                "columns": tabela["columns"],
+                "length": tabela["length"],
+                "page_url": f"/simulate/tables/{key}/{nome}",
+            }
+    return dumps(payload)
+
+def client_id():
+    """
+    Identifica o cliente da requisição pelo endereço remoto.
+
+    X-Forwarded-For só é considerado com TRUSTED_PROXIES configurado (ProxyFix),
+    para que o cliente não escolha a própria identidade.
+    """
+    return request.remote_addr or "anonimo"
+
+def admission_error_response(error):
+    """Resposta JSON para requisições recusadas pelo controle de admissão"""
+    response = jsonify({
+        "success": False,
+        "error": str(error),
+        "estimate": error.estimate
+    })
+    response.status_code = error.status_code
+    if error.retry_after is not None:
+        response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+def simulation_etag(key):
+    """ETag de um resultado: chave dos parâmetros mais a versão do código"""
+    return f"{key}.{VERSAO_RESULTADOS}"
+
+def simulation_response(key, body, created_at=None, cache_status="miss"):
+    """Resposta de simulação com validadores para requisições condicionais"""
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(simulation_etag(key), weak=True)
+    if created_at is not None:
+        response.last_modified = created_at
+    response.cache_control.no_cache = True
+    response.headers["X-Simulation-Cache"] = cache_status
+    return response
+
+def compute_and_cache(key, compute):
+    """Executa a simulação e guarda o corpo serializado no cache de resultados"""
+    return result_cache.put(key, compute())["body"]
+
+def run_admitted_simulation(params, estimate, paginado=False, cancel=None, salvar=True):
+    """Executa a simulação ocupando um slot de execução do controle de admissão"""
+    with admission.worker_slot(estimate, cancel):
+        return build_simulation_body(params, paginado, cancel, salvar)
+
+def paginated_tables_available(key):
+    """As tabelas servidas por página deste resultado ainda estão em memória"""
+    return all(table_cache.contains(key, nome) for nome in TABELAS_PAGINADAS)
+
+def compute_live_body(params, cancel):
+    """
+    Resultado (paginado) de uma sessão ao vivo, reaproveitando o cache de resultados.
+
+    Os recálculos ao vivo não entram no histórico e ficam no cache sob uma chave
+    própria: uma submissão posterior dos mesmos parâmetros em /simulate não os
+    reaproveita e grava a execução normalmente.
+    """
+    key = canonical_params_key(params)
+    if paginated_tables_available(key):
+        for body_key in (key + SUFIXO_PAGINADO, key + SUFIXO_AO_VIVO):
+            cached = result_cache.get(body_key)
+            if cached is not None:
+                return cached["body"]
+    estimate = estimate_cost(params)
+    admission.check_budget(estimate)
+    return compute_and_cache(key + SUFIXO_AO_VIVO,
+                             lambda: run_admitted_simulation(params, estimate, True, cancel, salvar=False))
+
+# Recálculo ao vivo durante a edição do formulário (SSE + deltas de parâmetros)
+live_sessions = LiveSessionManager(
+    compute_live_body, canonical_params_key,
+    debounce_seconds=float(os.environ.get("LIVE_DEBOUNCE_MS", 250)) / 1000,
+    max_sessions=int(os.environ.get("LIVE_MAX_SESSIONS", 32)),
+    ttl_seconds=float(os.environ.get("LIVE_SESSION_TTL", 900)),
+)
+LIVE_HEARTBEAT_SECONDS = 15
 
 @app.route("/simulate", methods=["POST"])
 def simulate():
     """Executa a simulação com os parâmetros fornecidos"""
     try:
-        # Recebe parâmetros do frontend
-        data = request.get_json()
+        # Recebe parâmetros do frontend e mescla com padrões
+        params = merge_params(request.get_json(silent=True))
         
-        # Se não houver dados, usa parâmetros padrão
-        if not data:
-            params = get_default_params()
-        else:
-            # Mescla parâmetros recebidos com padrões
-            params = get_default_params()
-            params.update(data)
+        # Parâmetros inválidos falham antes de qualquer cálculo
+        errors = validate_simulation_params(params)
+        if errors:
+            return invalid_params_response(errors)
+        key = canonical_params_key(params)
         
-        # Executa simulação
-        df_carteira, df_fundo, df_operacoes = run_simulation(params)
+        # A variante paginada (operações servidas sob demanda) tem ETag e cache próprios,
+        # válidos enquanto as tabelas paginadas estiverem em memória
+        paginado = request.args.get("tabelas") == "paginadas"
+        body_key = key + SUFIXO_PAGINADO if paginado else key
+        disponivel = not paginado or paginated_tables_available(key)
         
-        # Gera gráfico interativo
-        chart = generate_plotly_chart(df_carteira, df_fundo)
+        # O cliente já possui o resultado destes parâmetros (ETag = chave canônica + versão)
+        if disponivel and request.if_none_match.contains_weak(simulation_etag(body_key)):
+            response = app.response_class(status=304)
+            response.set_etag(simulation_etag(body_key), weak=True)
+            return response
         
-        # Prepara resumo dos resultados
-        ultimo_mes_carteira = df_carteira.iloc[-1]
-        ultimo_mes_fundo = df_fundo.iloc[-1]
+        # Resultado recente para os mesmos parâmetros: responde sem recalcular
+        cached = result_cache.get(body_key) if disponivel else None
+        if cached is not None:
+            return simulation_response(body_key, cached["body"], cached["created_at"], cache_status="hit")
         
-        # Conta meses com paused=True (restrições operacionais)
-        meses_com_restricoes = int(df_carteira["paused"].sum())
+        # Estima o custo antes de executar e aplica o orçamento
+        estimate = estimate_cost(params, com_cubo=run_store is not None)
+        modo = admission.check_budget(estimate)
         
-        # Conta total de operações inadimplentes acumuladas
-        total_inadimplentes = int(df_carteira["operacoes_inadimplentes_novas"].sum())
+        # Simulações pesadas (ou pedidas com ?async=1) viram jobs assíncronos
+        if modo == "async" or request.args.get("async") == "1":
+            # O job conta no limite do cliente até terminar
+            vaga = ExitStack()
+            vaga.enter_context(admission.client_slot(client_id(), estimate))
+
+            def job(report):
+                with vaga:
+                    return compute_and_cache(body_key, lambda: build_simulation_body(params, paginado))
+
+            job_id = simulation_jobs.submit(job, kind="simulate")
+            if job_id is None:
+                vaga.close()
+                raise AdmissionRejected(503, "Fila de simulações assíncronas cheia.",
+                                        retry_after=max(1, int(estimate["segundos_estimados"])),
+                                        estimate=estimate)
+            status_url = url_for("simulate_job", job_id=job_id)
+            response = jsonify({
+                "success": True,
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": status_url,
+                "estimate": estimate
+            })
+            response.status_code = 202
+            response.headers["Location"] = status_url
+            return response
         
-        # Calcula ticket médio das operações (desembolso acumulado / total de operações)
-        total_ops = int(ultimo_mes_carteira["operacoes_realizadas_acum"])
-        desembolso_total = float(ultimo_mes_carteira["desembolso_acum"])
-        ticket_medio = desembolso_total / total_ops if total_ops > 0 else 0.0
+        with admission.client_slot(client_id(), estimate):
+            # Requisições concorrentes idênticas compartilham o mesmo cálculo
+            body, shared = simulation_flight.do(
+                body_key, lambda: compute_and_cache(
+                    body_key, lambda: run_admitted_simulation(params, estimate, paginado)))
         
-        resumo = {
-            "saldo_final_fundo": float(ultimo_mes_fundo["saldo_final"]),
-            "total_operacoes": total_ops,
-            "honras_acumuladas": float(ultimo_mes_carteira["honras_acumuladas"]),
-            "recuperacoes_acumuladas": float(ultimo_mes_carteira["recuperacoes_acumuladas"]),
-            "desembolso_acumulado": desembolso_total,
-            "ticket_medio": ticket_medio,
-            "meses_restricoes_operacionais": meses_com_restricoes,
-            "indice_sgc": float(ultimo_mes_carteira["indice_sgc"]),
-            "taxa_inadimplencia_qtd": float(ultimo_mes_carteira["taxa_inadimplencia_qtd"]),
-            "taxa_inadimplencia_valor": float(ultimo_mes_carteira["taxa_inadimplencia_valor"]),
-            "operacoes_inadimplentes": total_inadimplentes
-        }
+        response = simulation_response(body_key, body, time.time())
+        response.headers["X-Simulation-Shared"] = "1" if shared else "0"
+        return response
         
-        # Converte DataFrames para dict, substituindo NaN por None
-        carteira_dict = df_carteira.replace({np.nan: None}).to_dict(orient='records')
-        fundo_dict = df_fundo.replace({np.nan: None}).to_dict(orient='records')
-        operacoes_dict = df_operacoes.replace({np.nan: None}).to_dict(orient='records')
+    except AdmissionRejected as e:
+        return admission_error_response(e)
         
-        # Retorna dados completos para visualização
+    except Exception as e:
+        import traceback
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }), 400
+
+@app.route("/simulate/estimate", methods=["POST"])
+def simulate_estimate():
+    """Estima o custo de uma simulação sem executá-la"""
+    try:
+        params = merge_params(request.get_json(silent=True))
+        errors = validate_simulation_params(params)
+        if errors:
+            return invalid_params_response(errors)
+        estimate = estimate_cost(params, com_cubo=run_store is not None)
+        try:
+            modo = admission.check_budget(estimate)
+        except AdmissionRejected:
+            modo = "rejected"
+        return jsonify({"success": True, "estimate": estimate, "admission": modo})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route("/simulate/jobs/<job_id>", methods=["GET"])
+def simulate_job(job_id):
+    """Status (ou resultado, quando concluída) de uma simulação assíncrona"""
+    job = simulation_jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job não encontrado"}), 404
+    if job["status"] == "done":
+        return app.response_class(job["result"], mimetype="application/json")
+    if job["status"] == "error":
+        return jsonify({"success": False, "error": job["error"]}), 400
+    response = jsonify({"success": True, "job_id": job_id, "status": job["status"], "progress": job["progress"]})
+    response.status_code = 202
+    response.headers["Retry-After"] = "1"
+    return response
+
+@app.route("/simulate/tables/<key>/<nome>", methods=["GET"])
+def simulate_table_page(key, nome):
+    """Página (offset, limit) de uma tabela de resultado mantida no servidor"""
+    try:
+        offset = request.args.get("offset", 0, type=int)
+        limit = min(request.args.get("limit", 200, type=int), MAX_TABLE_PAGE)
+        pagina = table_cache.page(key, nome, offset, limit)
+        if pagina is None:
+            return jsonify({"success": False,
+                            "error": "Resultado expirado. Execute a simulação novamente."}), 410
+        response = app.response_class(dumps(pagina), mimetype="application/json")
+        # O conteúdo de uma chave nunca muda: o navegador pode reutilizar as páginas
+        response.cache_control.private = True
+        response.cache_control.max_age = 3600
+        return response
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route("/simulate/metrics", methods=["GET"])
+def simulate_metrics():
+    """Métricas de execução da simulação (coalescência e admissão)"""
+    return jsonify({
+        "single_flight": simulation_flight.stats(),
+        "admission": admission.stats(),
+        "result_cache": result_cache.stats(),
+        "table_cache": table_cache.stats(),
+        "live": live_sessions.stats(),
+        "shared_memory": shared_results.estatisticas(),
+        "async_jobs_pending": simulation_jobs.pending_count(),
+        "run_store": run_store.stats() if run_store is not None else None
+    })
+
+def live_session_urls(session_id):
+    return {
+        "session_id": session_id,
+        "events_url": url_for("live_events", session_id=session_id),
+        "params_url": url_for("live_params", session_id=session_id),
+        "cancel_url": url_for("live_cancel", session_id=session_id),
+    }
+
+def live_session_not_found():
+    return jsonify({"success": False, "error": "Sessão não encontrada ou expirada."}), 404
+
+@app.route("/live/sessions", methods=["POST"])
+def live_create():
+    """Abre uma sessão de recálculo ao vivo e agenda a simulação dos parâmetros iniciais"""
+    try:
+        params = merge_params(request.get_json(silent=True))
+        errors = validate_simulation_params(params)
+        if errors:
+            return invalid_params_response(errors)
+        session = live_sessions.create(params)
+        if session is None:
+            response = jsonify({"success": False, "error": "Limite de sessões ao vivo atingido."})
+            response.status_code = 503
+            response.headers["Retry-After"] = "30"
+            return response
+        versao = session.submit(params)
+        return jsonify({"success": True, "versao": versao, **live_session_urls(session.id)}), 201
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route("/live/sessions/<session_id>/events", methods=["GET"])
+def live_events(session_id):
+    """
+    Eventos da sessão (text/event-stream): executando, resultado (mesmo corpo
+    de /simulate?tabelas=paginadas), cancelado e erro; o id do evento é a versão.
+    """
+    session = live_sessions.get(session_id)
+    if session is None:
+        return live_session_not_found()
+
+    def stream():
+        yield b"retry: 2000\n\n"
+        for evento in session.listen(LIVE_HEARTBEAT_SECONDS):
+            if evento is None:
+                yield b": ping\n\n"
+                continue
+            nome, versao, dados = evento
+            corpo = dados if isinstance(dados, bytes) else dumps(dados)
+            yield b"event: %s\nid: %d\ndata: %s\n\n" % (nome.encode(), versao, corpo)
+
+    response = app.response_class(stream(), mimetype="text/event-stream")
+    # no-transform: sem compressão, para cada evento ser entregue assim que publicado
+    response.headers["Cache-Control"] = "no-cache, no-transform"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route("/live/sessions/<session_id>/params", methods=["PATCH"])
+def live_params(session_id):
+    """Aplica um delta aos últimos parâmetros da sessão e agenda o recálculo (cancela o anterior)"""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return live_session_not_found()
+    try:
+        delta = request.get_json(silent=True) or {}
+        if not isinstance(delta, dict):
+            return jsonify({"success": False, "error": "O delta deve ser um objeto JSON."}), 400
+        versao, errors = session.submit_delta(delta, validate_simulation_params)
+        if errors:
+            return invalid_params_response(errors)
+        return jsonify({"success": True, "versao": versao}), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route("/live/sessions/<session_id>/cancel", methods=["POST"])
+def live_cancel(session_id):
+    """Cancela a simulação em andamento (no próximo limite de mês) e a agendada"""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return live_session_not_found()
+    return jsonify({"success": True, "cancelada": session.cancel()})
+
+@app.route("/live/sessions/<session_id>", methods=["GET"])
+def live_info(session_id):
+    session = live_sessions.get(session_id)
+    if session is None:
+        return live_session_not_found()
+    return jsonify(session.info())
+
+@app.route("/live/sessions/<session_id>", methods=["DELETE"])
+def live_close(session_id):
+    if not live_sessions.close(session_id):
+        return live_session_not_found()
+    return "", 204
+
+def runs_unavailable():
+    return jsonify({"success": False, "error": "Histórico de simulações desativado (RUN_STORE_DB)."}), 404
+
+@app.route("/runs", methods=["GET"])
+def list_runs():
+    """
+    Consulta o histórico por KPIs, sem recalcular nada.
+
+    Filtros: min_<kpi>/max_<kpi>, created_after/created_before (epoch),
+    params_hash; ordenação: order_by (KPI, created_at, last_run_at, id),
+    desc (padrão 1), limit (padrão 20), params=1 inclui os parâmetros.
+    """
+    if run_store is None:
+        return runs_unavailable()
+    try:
+        args = request.args
+        filters = []
+        for kpi in KPI_COLUMNS:
+            if f"min_{kpi}" in args:
+                filters.append((kpi, ">=", args.get(f"min_{kpi}", type=float)))
+            if f"max_{kpi}" in args:
+                filters.append((kpi, "<=", args.get(f"max_{kpi}", type=float)))
+        if "created_after" in args:
+            filters.append(("created_at", ">=", args.get("created_after", type=float)))
+        if "created_before" in args:
+            filters.append(("created_at", "<=", args.get("created_before", type=float)))
+        if "params_hash" in args:
+            filters.append(("params_hash", "=", args["params_hash"]))
+        if any(valor is None for _, _, valor in filters):
+            raise ValueError("Filtros numéricos inválidos.")
+
+        inicio = time.perf_counter()
+        runs = run_store.query(
+            order_by=args.get("order_by", "created_at"),
+            descending=args.get("desc", "1") != "0",
+            limit=args.get("limit", 20, type=int),
+            filters=filters,
+            include_params=args.get("params") == "1",
+        )
         return jsonify({
             "success": True,
-            "resumo": resumo,
+            "runs": runs,
+            "count": len(runs),
+            "query_ms": round((time.perf_counter() - inicio) * 1000, 3)
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route("/runs/<int:run_id>", methods=["GET"])
+def get_run(run_id):
+    """Execução salva: parâmetros, resumo e séries colunares de carteira e fundo"""
+    if run_store is None:
+        return runs_unavailable()
+    run = run_store.get(run_id, include_series=request.args.get("series", "1") != "0")
+    if run is None:
+        return jsonify({"success": False, "error": "Execução não encontrada"}), 404
+    return app.response_class(dumps({"success": True, **run}), mimetype="application/json")
+
+@app.route("/runs/<int:run_id>/cube", methods=["GET"])
+def query_run_cube(run_id):
+    """
+    Recorte e agregação do cubo porte × safra × mês de uma execução.
+
+    Parâmetros: medidas, portes, agrupar (listas separadas por vírgula;
+    agrupar padrão "mes", vazio = total), safra_de/safra_ate, mes_de/mes_ate,
+    eixo=mes|idade (idade = meses desde a contratação).
+    """
+    if run_store is None:
+        return runs_unavailable()
+    try:
+        cubo = run_store.get_cube(run_id)
+        if cubo is None:
+            return jsonify({"success": False, "error": "Cubo não encontrado para esta execução"}), 404
+        args = request.args
+
+        def lista(nome, padrao=None):
+            if nome not in args:
+                return padrao
+            return [item.strip() for item in args[nome].split(",") if item.strip()]
+
+        resultado = cubo.query(
+            medidas=lista("medidas"),
+            portes=lista("portes"),
+            safras=(args.get("safra_de", type=int), args.get("safra_ate", type=int)),
+            meses=(args.get("mes_de", type=int), args.get("mes_ate", type=int)),
+            agrupar=lista("agrupar", ["mes"]),
+            eixo_tempo=args.get("eixo", "mes"),
+        )
+        return app.response_class(dumps({"success": True, "run_id": run_id, **resultado}),
+                                  mimetype="application/json")
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route("/runs/<int:run_id>", methods=["DELETE"])
+def delete_run(run_id):
+    """Remove uma execução do histórico"""
+    if run_store is None:
+        return runs_unavailable()
+    if not run_store.delete(run_id):
+        return jsonify({"success": False, "error": "Execução não encontrada"}), 404
+    return jsonify({"success": True})
+
+@app.route("/runs/compact", methods=["POST"])
+def compact_runs():
+    """Aplica a retenção e compacta o arquivo do histórico (?full=1 para VACUUM completo)"""
+    if run_store is None:
+        return runs_unavailable()
+    return jsonify({"success": True, **run_store.compact(full=request.args.get("full") == "1")})
+
+@app.route("/simulate/multi", methods=["POST"])
+def simulate_multi():
+    """Executa a simulação de vários fundos em paralelo e consolida o grupo"""
+    try:
+        data = request.get_json() or {}
+        fundos = data.get("fundos", [])
+        parametros_comuns = data.get("parametros_comuns", {})
+        master_seed = data.get("random_seed", get_default_params()["random_seed"])
+
+        if len(fundos) > MAX_FUNDOS:
+            return invalid_params_response([{"field": "fundos", "code": "too_many"}])
+
+        for idx, fundo in enumerate(fundos):
+            errors = validate_simulation_params({**merge_params(parametros_comuns), **fundo})
+            if errors:
+                for e in errors:
+                    e["field"] = f"fundos[{idx}].{e['field']}"
+                return invalid_params_response(errors)
+
+        # O grupo passa pela admissão como uma única requisição com o custo somado dos fundos
+        params_fundos = montar_params_fundos(fundos, parametros_comuns, master_seed)
+        estimate = combine_estimates([estimate_cost(p) for p in params_fundos])
+        try:
+            if admission.check_budget(estimate) == "async":
+                # Não há execução assíncrona para grupos: recusa em vez de prender a requisição
+                raise AdmissionRejected(
+                    422, "Simulação do grupo longa demais para execução síncrona; reduza o número "
+                         "de fundos ou o horizonte.", estimate=estimate)
+            with admission.client_slot(client_id(), estimate):
+                with admission.worker_slot(estimate):
+                    resultado = run_multi_fund_simulation(
+                        fundos,
+                        parametros_comuns=parametros_comuns,
+                        master_seed=master_seed,
+                        max_workers=data.get("max_workers"),
+                    )
+        except AdmissionRejected as e:
+            return admission_error_response(e)
+
+        consolidado = resultado["consolidado"]
+        chart = generate_plotly_chart(consolidado["carteira"], consolidado["fundo"])
+
+        fundos_dict = [
+            {
+                "nome": r["nome"],
+                "random_seed": r["random_seed"],
+                "resumo": r["resumo"],
+                "carteira": dataframe_to_columns(r["carteira"]),
+                "fundo": dataframe_to_columns(r["fundo"]),
+            }
+            for r in resultado["fundos"]
+        ]
+
+        body = dumps({
+            "success": True,
+            "resumo": consolidado["resumo"],
             "chart": chart,
-            "carteira": carteira_dict,
-            "fundo": fundo_dict,
-            "operacoes": operacoes_dict
+            "carteira": dataframe_to_columns(consolidado["carteira"]),
+            "fundo": dataframe_to_columns(consolidado["fundo"]),
+            "fundos": fundos_dict
         })
-        
+        return app.response_class(body, mimetype="application/json")
+
     except Exception as e:
         import traceback
         return jsonify({
@@ -97,6 +686,90 @@ def simulate():
             "traceback": traceback.format_exc()
         }), 400
 
+@app.route("/calibrate", methods=["POST"])
+def calibrate():
+    """
+    Inicia uma calibração assíncrona (202 + Location para acompanhar o progresso).
+
+    Corpo: {"alvos": {"kpis": {...}, "series": {...}, "pesos": {...}},
+            "parametros": {...}, "limites": {"taxa_inadimplencia_MEI": [0, 1], ...},
+            "replicas": 3, "random_seed": 42, "max_iter": 60, "max_avaliacoes": 200,
+            "tolerancia": 0.0}
+    """
+    try:
+        data = request.get_json() or {}
+        params = merge_params(data.get("parametros"))
+        errors = validate_simulation_params(params)
+        if errors:
+            return invalid_params_response(errors)
+
+        replicas = min(int(data.get("replicas", 3)), MAX_CALIBRATION_REPLICAS)
+        max_avaliacoes = min(int(data.get("max_avaliacoes", 200)), MAX_CALIBRATION_EVALUATIONS)
+        calibrador = Calibrator(
+            data.get("alvos") or {},
+            base_params=params,
+            bounds=data.get("limites") or DEFAULT_BOUNDS,
+            replicas=replicas,
+            master_seed=int(data.get("random_seed", params["random_seed"])),
+        )
+
+        # Os candidatos percorrem a caixa dos limites: os cantos precisam ser válidos
+        cantos = calibrador.corner_params()
+        for canto in cantos:
+            errors = validate_simulation_params(canto)
+            if errors:
+                for e in errors:
+                    e["field"] = f"limites.{e['field']}"
+                return invalid_params_response(errors)
+
+        # Cada avaliação é uma simulação por réplica: o custo do pior canto precisa caber no orçamento
+        estimate = max((estimate_cost(canto) for canto in cantos), key=lambda e: e["trabalho"])
+        admission.check_budget(estimate)
+        opcoes = {
+            "max_iter": int(data.get("max_iter", 60)),
+            "max_evaluations": max_avaliacoes,
+            "target_objective": float(data.get("tolerancia", 0.0)),
+        }
+
+        job_id = calibration_jobs.submit(lambda report: calibrador.run(report=report, **opcoes), kind="calibrate")
+        if job_id is None:
+            raise AdmissionRejected(503, "Fila de calibrações cheia.", retry_after=60, estimate=estimate)
+        status_url = url_for("calibrate_job", job_id=job_id)
+        response = jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": status_url,
+            "segundos_estimados_max": round(estimate["segundos_estimados"] * replicas * max_avaliacoes
+                                            / calibrador.max_workers, 1)
+        })
+        response.status_code = 202
+        response.headers["Location"] = status_url
+        return response
+
+    except AdmissionRejected as e:
+        return admission_error_response(e)
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route("/calibrate/jobs/<job_id>", methods=["GET"])
+def calibrate_job(job_id):
+    """Progresso e traço de convergência (202) ou resultado (200) de uma calibração"""
+    job = calibration_jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job não encontrado"}), 404
+    if job["status"] == "done":
+        return app.response_class(dumps({"success": True, "status": "done", **job["result"]}),
+                                  mimetype="application/json")
+    if job["status"] == "error":
+        return jsonify({"success": False, "error": job["error"]}), 400
+    response = app.response_class(
+        dumps({"success": True, "job_id": job_id, "status": job["status"], "progress": job["progress"]}),
+        status=202, mimetype="application/json")
+    response.headers["Retry-After"] = "5"
+    return response
+
 @app.route("/api")
 def api_info():
     """Informações sobre a API"""
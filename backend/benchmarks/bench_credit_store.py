@@ -0,0 +1,65 @@
+"""
+Vazão de escrita do armazenamento de créditos: inserções individuais (uma
+transação por crédito) contra inserções em lote (uma transação por lote),
+e leitura paginada por keyset.
+
+Uso (a partir da raiz do projeto):
+    python backend/benchmarks/bench_credit_store.py --n 20000 --lote 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.credit_store import CreditStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20_000, help="créditos por cenário")
+    parser.add_argument("--lote", type=int, default=5_000, help="créditos por transação no cenário em lote")
+    parser.add_argument("--pagina", type=int, default=1_000, help="tamanho da página na leitura")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(1_000, 200_000, args.n).round(2).tolist()
+    rates = rng.uniform(5, 30, args.n).round(4).tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CreditStore(os.path.join(tmp, "individual.db"))
+        inicio = time.perf_counter()
+        for amount, rate in zip(amounts, rates):
+            store.create(amount, rate)
+        individual = time.perf_counter() - inicio
+        store.pool.close()
+
+        store = CreditStore(os.path.join(tmp, "lote.db"))
+        inicio = time.perf_counter()
+        for i in range(0, args.n, args.lote):
+            store.create_many(zip(amounts[i:i + args.lote], rates[i:i + args.lote]))
+        lote = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        after_id, lidos = 0, 0
+        while True:
+            pagina = store.list_page(after_id=after_id, limit=args.pagina)
+            lidos += len(pagina["items"])
+            if pagina["next_after_id"] is None:
+                break
+            after_id = pagina["next_after_id"]
+        leitura = time.perf_counter() - inicio
+        store.pool.close()
+
+    print(f"{'individual':12s} {individual:8.3f} s  {args.n / individual:12,.0f} créditos/s")
+    print(f"{'lote':12s} {lote:8.3f} s  {args.n / lote:12,.0f} créditos/s  ({individual / lote:.0f}x)")
+    print(f"{'leitura':12s} {leitura:8.3f} s  {lidos / leitura:12,.0f} créditos/s  (páginas de {args.pagina})")
+
+
+if __name__ == "__main__":
+    main()
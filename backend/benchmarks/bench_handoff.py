@@ -0,0 +1,114 @@
+"""
+Compara a entrega do resultado de uma simulação executada em outro processo:
+pickle dos DataFrames (retorno padrão do ProcessPoolExecutor) contra o bloco
+de memória compartilhada de services.shared_results.
+
+As tabelas de N operações são montadas repetindo as de uma simulação real e
+ficam prontas no worker antes da medição; o tempo medido é só a entrega
+(preparo no worker + transferência + reconstrução no processo web) e, em
+seguida, a serialização JSON da resposta. A coluna "CPU web" é o tempo de
+CPU gasto no processo web (todas as threads, inclusive a que desfaz o
+pickle), que disputa o GIL com as requisições.
+
+Uso (a partir da raiz do projeto):
+    python backend/benchmarks/bench_handoff.py --operacoes 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.cube import ResultCube
+from services.serialization import dataframe_to_columns, dumps
+from services.shared_results import ResultadoCompartilhado, exportar_resultado
+from services.simulation import get_default_params, run_simulation
+
+_base = {}
+_tabelas = {}
+
+
+def _iniciar_worker(meses):
+    params = get_default_params()
+    params["simulation_months"] = meses
+    cubo = ResultCube(meses)
+    _base["tabelas"] = run_simulation(params, cubo=cubo)
+    _base["cubo"] = cubo.data
+
+
+def _preparar(n):
+    """Monta (uma vez por worker) a tabela de operações com n linhas"""
+    if n not in _tabelas:
+        df_carteira, df_fundo, df_operacoes = _base["tabelas"]
+        indices = np.resize(np.arange(len(df_operacoes)), n)
+        _tabelas[n] = (df_carteira, df_fundo, df_operacoes.iloc[indices].reset_index(drop=True))
+    return len(_tabelas[n][2])
+
+
+def _entregar_pickle(n):
+    return _tabelas[n]
+
+
+def _entregar_memoria(n):
+    df_carteira, df_fundo, df_operacoes = _tabelas[n]
+    return exportar_resultado(
+        {"carteira": dataframe_to_columns(df_carteira),
+         "fundo": dataframe_to_columns(df_fundo),
+         "operacoes": dataframe_to_columns(df_operacoes)},
+        {"cubo": _base["cubo"]},
+    )
+
+
+def _via_pickle(executor, n):
+    df_carteira, df_fundo, df_operacoes = executor.submit(_entregar_pickle, n).result()
+    entregue = time.perf_counter()
+    corpo = dumps({"carteira": dataframe_to_columns(df_carteira), "fundo": dataframe_to_columns(df_fundo),
+                   "operacoes": dataframe_to_columns(df_operacoes)})
+    return entregue, corpo
+
+
+def _via_memoria(executor, n):
+    resultado = ResultadoCompartilhado(executor.submit(_entregar_memoria, n).result())
+    tabelas = {nome: resultado.tabela(nome) for nome in ("carteira", "fundo", "operacoes")}
+    entregue = time.perf_counter()
+    corpo = dumps(tabelas)
+    return entregue, corpo
+
+
+def medir(fn, executor, n, repeticoes):
+    entregas, totais, cpu = [], [], []
+    for _ in range(repeticoes):
+        inicio_cpu = time.process_time()
+        inicio = time.perf_counter()
+        entregue, corpo = fn(executor, n)
+        fim = time.perf_counter()
+        cpu.append(time.process_time() - inicio_cpu)
+        entregas.append(entregue - inicio)
+        totais.append(fim - inicio)
+    return min(entregas), min(totais), min(cpu), len(corpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operacoes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--meses", type=int, default=60, help="horizonte da simulação usada como base")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=1, initializer=_iniciar_worker, initargs=(args.meses,)) as executor:
+        for n in args.operacoes:
+            executor.submit(_preparar, n).result()
+            print(f"Operações: {n:,}")
+            for nome, fn in (("pickle", _via_pickle), ("memória compartilhada", _via_memoria)):
+                entrega, total, cpu, tamanho = medir(fn, executor, n, args.repeticoes)
+                print(f"  {nome:22s} entrega {entrega * 1000:8.1f} ms   entrega + JSON {total * 1000:8.1f} ms"
+                      f"   CPU web {cpu * 1000:8.1f} ms   ({tamanho / 1024 ** 2:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compara a serialização antiga (lista de dicts por linha + json) com a
+orientada a colunas (arrays NumPy + orjson) nas tabelas de uma simulação.
+
+Uso (a partir da raiz do projeto):
+    python backend/benchmarks/bench_serialization.py  # ~20 mil operações com os padrões abaixo
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.simulation import get_default_params, run_simulation
+from services.serialization import dataframe_to_columns, dumps, orjson
+
+
+def serializar_linhas(tabelas):
+    """Formato antigo: replace(NaN) + to_dict(orient='records') + json"""
+    payload = {nome: df.replace({np.nan: None}).to_dict(orient="records") for nome, df in tabelas.items()}
+    return json.dumps(payload).encode("utf-8")
+
+
+def serializar_colunas(tabelas):
+    """Formato colunar: arrays NumPy direto para o encoder"""
+    payload = {nome: dataframe_to_columns(df) for nome, df in tabelas.items()}
+    return dumps(payload)
+
+
+def medir(fn, tabelas, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = fn(tabelas)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), len(corpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meses", type=int, default=108)
+    parser.add_argument("--multiplicador", type=float, default=2.0)
+    parser.add_argument("--aporte-mensal", type=float, default=300_000.0)
+    parser.add_argument("--alavancagem", type=float, default=6.0)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    params = get_default_params()
+    params["simulation_months"] = args.meses
+    params["multiplicador_volume_operacoes"] = args.multiplicador
+    params["alavancagem_maxima"] = args.alavancagem
+    params["aporte_mensal"] = args.aporte_mensal
+
+    df_carteira, df_fundo, df_operacoes = run_simulation(params)
+    tabelas = {"carteira": df_carteira, "fundo": df_fundo, "operacoes": df_operacoes}
+    print(f"Operações: {len(df_operacoes)} | meses: {len(df_carteira)} | "
+          f"encoder: {'orjson' if orjson is not None else 'json (stdlib)'}")
+
+    for nome, fn in (("linhas (antes)", serializar_linhas), ("colunas (depois)", serializar_colunas)):
+        segundos, tamanho = medir(fn, tabelas, args.repeticoes)
+        print(f"{nome:18s} {segundos * 1000:9.1f} ms  {tamanho / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compara a resposta completa de /simulate com a paginada (?tabelas=paginadas),
+em que as operações ficam no servidor e são buscadas por página.
+
+Mede o tamanho do corpo inicial, o tempo da resposta (servida do cache de
+resultados, como em uma consulta repetida) e o de uma página de operações,
+que é o que o navegador precisa antes de exibir a tabela. O tempo até a tela
+interativa no navegador fica em window.simulationTimings (console do navegador).
+
+Uso (a partir da raiz do projeto):
+    python backend/benchmarks/bench_tables.py  # ~20 mil operações com os padrões abaixo
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RUN_STORE_DB", "")
+
+from app import app
+from services.simulation import get_default_params
+
+
+def medir(fn, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = fn()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resposta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meses", type=int, default=108)
+    parser.add_argument("--multiplicador", type=float, default=2.0)
+    parser.add_argument("--aporte-mensal", type=float, default=300_000.0)
+    parser.add_argument("--alavancagem", type=float, default=6.0)
+    parser.add_argument("--pagina", type=int, default=200)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    params = get_default_params()
+    params["simulation_months"] = args.meses
+    params["multiplicador_volume_operacoes"] = args.multiplicador
+    params["alavancagem_maxima"] = args.alavancagem
+    params["aporte_mensal"] = args.aporte_mensal
+
+    client = app.test_client()
+    for url in ("/simulate", "/simulate?tabelas=paginadas"):
+        inicio = time.perf_counter()
+        resposta = client.post(url, json=params)
+        if resposta.status_code != 200:
+            sys.exit(f"{url}: HTTP {resposta.status_code} {resposta.get_data(as_text=True)[:200]}")
+        print(f"simulação {url:28s} {(time.perf_counter() - inicio) * 1000:9.1f} ms (primeira execução)")
+
+    completa_s, completa = medir(lambda: client.post("/simulate", json=params), args.repeticoes)
+    paginada_s, paginada = medir(lambda: client.post("/simulate?tabelas=paginadas", json=params), args.repeticoes)
+    operacoes = paginada.get_json()["operacoes"]
+    pagina_s, pagina = medir(
+        lambda: client.get(f"{operacoes['page_url']}?offset=0&limit={args.pagina}"), args.repeticoes)
+    print(f"Operações: {operacoes['length']}")
+
+    print(f"{'completa':28s} {completa_s * 1000:9.1f} ms  {len(completa.data) / 1024:10.1f} KiB")
+    print(f"{'paginada':28s} {paginada_s * 1000:9.1f} ms  {len(paginada.data) / 1024:10.1f} KiB")
+    print(f"{'página de ' + str(args.pagina) + ' operações':28s} {pagina_s * 1000:9.1f} ms  "
+          f"{len(pagina.data) / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
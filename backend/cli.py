@@ -0,0 +1,121 @@
+"""
+Linha de comando do backend.
+
+Uso (a partir da raiz do projeto):
+    python backend/cli.py elegibilidade solicitacoes.csv resultado.csv \
+        --limite-operacional 50000000 --valor-garantido 12000000 --bloco 50000
+    python backend/cli.py calibrar calibracao.json --saida resultado.json --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.calibration import DEFAULT_BOUNDS, Calibrator
+from services.eligibility import EligibilityEngine
+from services.serialization import dumps
+
+
+def cmd_elegibilidade(args):
+    """Avalia um CSV de solicitações em blocos, com memória limitada ao tamanho do bloco"""
+    regras = None
+    if args.regras:
+        with open(args.regras, encoding="utf-8") as f:
+            regras = json.load(f)
+    fundo = None
+    if args.limite_operacional is not None:
+        fundo = {"limite_operacional": args.limite_operacional, "valor_garantido": args.valor_garantido}
+
+    engine = EligibilityEngine(regras, fundo)
+    inicio = time.perf_counter()
+    total = 0
+    decisoes = {}
+
+    blocos = pd.read_csv(args.entrada, chunksize=args.bloco, sep=args.sep)
+    for n, resultado in enumerate(engine.score_stream(blocos)):
+        resultado.to_csv(args.saida, mode="w" if n == 0 else "a", header=(n == 0),
+                         index=False, sep=args.sep)
+        total += len(resultado)
+        for decisao, qtd in resultado["decisao"].value_counts().items():
+            decisoes[decisao] = decisoes.get(decisao, 0) + int(qtd)
+
+    duracao = time.perf_counter() - inicio
+    print(f"{total:,} solicitações em {duracao:.2f} s ({total / max(duracao, 1e-9):,.0f}/s)")
+    for decisao, qtd in sorted(decisoes.items()):
+        print(f"  {decisao:10s} {qtd:,}")
+    if fundo is not None:
+        print(f"  folga de alavancagem restante: R$ {engine.folga_restante:,.2f}")
+
+
+def cmd_calibrar(args):
+    """
+    Calibra parâmetros a partir de um JSON no mesmo formato do corpo de
+    POST /calibrate (alvos, parametros, limites, replicas, random_seed).
+    """
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+
+    calibrador = Calibrator(
+        config.get("alvos") or {},
+        base_params=config.get("parametros"),
+        bounds=config.get("limites") or DEFAULT_BOUNDS,
+        replicas=int(config.get("replicas", 3)),
+        master_seed=int(config.get("random_seed", 42)),
+        max_workers=args.workers,
+    )
+
+    def report(progresso):
+        ultimo = progresso["trace"][-1]
+        params = ", ".join(f"{k}={v:.4f}" for k, v in ultimo["melhor_params"].items())
+        print(f"[{ultimo['iteracao']:3d}/{progresso['max_iter']}] objetivo={ultimo['melhor_objetivo']:.6g} "
+              f"avaliações={ultimo['avaliacoes']} cache={ultimo['cache_hits']} {params}", flush=True)
+
+    resultado = calibrador.run(
+        max_iter=int(config.get("max_iter", args.max_iter)),
+        max_evaluations=int(config.get("max_avaliacoes", args.max_avaliacoes)),
+        target_objective=float(config.get("tolerancia", 0.0)),
+        report=report,
+    )
+    print(f"Parada: {resultado['motivo_parada']} após {resultado['iteracoes']} iterações, "
+          f"{resultado['simulacoes']} simulações em {resultado['segundos']:.1f} s")
+    for nome, valor in resultado["params"].items():
+        print(f"  {nome:28s} {valor:.6f}")
+    if args.saida:
+        with open(args.saida, "wb") as f:
+            f.write(dumps(resultado))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    eleg = sub.add_parser("elegibilidade", help="avalia a elegibilidade de um CSV de solicitações")
+    eleg.add_argument("entrada", help="CSV de entrada (porte, valor_solicitado, prazo, faturamento_mensal, ...)")
+    eleg.add_argument("saida", help="CSV de saída (id, decisao, score, motivos, ...)")
+    eleg.add_argument("--bloco", type=int, default=50_000, help="linhas por bloco")
+    eleg.add_argument("--sep", default=",", help="separador do CSV")
+    eleg.add_argument("--regras", help="JSON com sobrescritas das regras padrão")
+    eleg.add_argument("--limite-operacional", type=float, help="limite operacional atual do fundo")
+    eleg.add_argument("--valor-garantido", type=float, default=0.0, help="valor já garantido pelo fundo")
+    eleg.set_defaults(func=cmd_elegibilidade)
+
+    calib = sub.add_parser("calibrar", help="calibra inadimplência/recuperação contra KPIs ou séries-alvo")
+    calib.add_argument("config", help="JSON com alvos, parametros, limites, replicas e random_seed")
+    calib.add_argument("--saida", help="JSON de saída com o resultado e o traço de convergência")
+    calib.add_argument("--workers", type=int, help="processos do pool (padrão: número de CPUs)")
+    calib.add_argument("--max-iter", type=int, default=60)
+    calib.add_argument("--max-avaliacoes", type=int, default=200)
+    calib.set_defaults(func=cmd_calibrar)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,156 @@
-from flask import Blueprint, request, jsonify
-from backend.models.credit import Credit
-from backend.services.credit_service import CreditService
+from flask import Blueprint, current_app, request, jsonify
+import numpy as np
+import pandas as pd
+from models.credit import Credit
+from services.credit_service import CreditService
+from services.serialization import dataframe_to_columns, dumps, loads
+from utils.validators import validate_batch
 
 credit_bp = Blueprint('credit', __name__)
 credit_service = CreditService()
 
+# Limite de itens por requisição nos endpoints em lote
+MAX_BULK_ITEMS = 50_000
+
+# Máximo de erros de validação devolvidos na resposta
+MAX_REPORTED_ERRORS = 1_000
+
+# Limites do cálculo de parcelas em lote (cronogramas completos ocupam N × prazo)
+MAX_QUOTES = 500_000
+MAX_SCHEDULE_CELLS = 5_000_000
+
+def validation_error_response(errors):
+    """Resposta 400 com o relatório (row, field, code) dos erros de validação"""
+    return jsonify({
+        "detail": f"{len(errors)} erro(s) de validação.",
+        "errors": errors.head(MAX_REPORTED_ERRORS).to_dict(orient="list")
+    }), 400
+
+def read_single_credit():
+    """Corpo de POST/PUT de um crédito, validado com as mesmas regras do lote"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Envie um objeto com 'amount' e 'interest_rate'.")
+    errors = validate_batch([data])
+    return data, errors
+
 @credit_bp.route("/credits/", methods=["POST"])
 def create_credit():
     try:
-        data = request.get_json()
+        data, errors = read_single_credit()
+        if len(errors):
+            return validation_error_response(errors)
         credit = Credit(data['amount'], data['interest_rate'])
         return jsonify(credit_service.create_credit(credit)), 201
     except Exception as e:
         return jsonify({"detail": str(e)}), 400
 
+@credit_bp.route("/credits/", methods=["GET"])
+def list_credits():
+    try:
+        args = request.args
+        filters = {
+            name: args.get(name, type=float)
+            for name in ("min_amount", "max_amount", "min_rate", "max_rate")
+        }
+        page = credit_service.list_credits(
+            after_id=args.get("after_id", 0, type=int),
+            limit=args.get("limit", 100, type=int),
+            **filters
+        )
+        return jsonify(page)
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 400
+
+@credit_bp.route("/credits/bulk", methods=["POST"])
+def create_credits_bulk():
+    try:
+        items = request.get_json()
+        if isinstance(items, dict):
+            items = items.get("credits", [])
+        if not isinstance(items, list):
+            raise ValueError("Envie uma lista de créditos ou {'credits': [...]}.")
+        if len(items) > MAX_BULK_ITEMS:
+            raise ValueError(f"Máximo de {MAX_BULK_ITEMS} créditos por requisição.")
+        # Valida todos os itens de uma vez e devolve todos os erros encontrados
+        errors = validate_batch(items)
+        if len(errors):
+            return validation_error_response(errors)
+        credits = [Credit(data['amount'], data['interest_rate']) for data in items]
+        return jsonify(credit_service.create_credits_bulk(credits)), 201
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 400
+
+@credit_bp.route("/credits/bulk/read", methods=["POST"])
+def get_credits_bulk():
+    try:
+        ids = (request.get_json() or {}).get("ids", [])
+        if len(ids) > MAX_BULK_ITEMS:
+            raise ValueError(f"Máximo de {MAX_BULK_ITEMS} ids por requisição.")
+        credits = credit_service.get_credits_bulk([int(i) for i in ids])
+        return jsonify({"items": credits, "missing": len(ids) - len(credits)})
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 400
+
+@credit_bp.route("/credits/quotes", methods=["POST"])
+def quote_credits():
+    """
+    Calcula parcelas de muitos créditos de uma vez (entrada e saída colunares).
+
+    Corpo: {"amounts": [...], "annual_rates": [...], "terms": [...],
+            "systems": "PRICE" | "SAC" | [...], "schedules": false, "nominal_rate": false}
+
+    annual_rates em percentual ao ano (18 = 18% a.a.), como interest_rate dos créditos.
+    """
+    try:
+        data = loads(request.get_data())
+        amounts = np.asarray(data["amounts"], dtype=np.float64)
+        rates = np.asarray(data["annual_rates"], dtype=np.float64)
+        terms = np.asarray(data["terms"], dtype=np.int64)
+        systems = data.get("systems", "PRICE")
+        include_schedule = bool(data.get("schedules", False))
+
+        n_quotes = amounts.size
+        if n_quotes > MAX_QUOTES:
+            raise ValueError(f"Máximo de {MAX_QUOTES} cotações por requisição.")
+        if include_schedule and n_quotes * int(terms.max(initial=0)) > MAX_SCHEDULE_CELLS:
+            raise ValueError(f"Cronogramas completos limitados a {MAX_SCHEDULE_CELLS} parcelas por requisição.")
+
+        quotes = credit_service.calculate_payments(
+            amounts, rates, terms, system=systems,
+            include_schedule=include_schedule,
+            nominal_rate=bool(data.get("nominal_rate", False))
+        )
+        body = dumps({"count": int(n_quotes), **quotes})
+        return current_app.response_class(body, mimetype="application/json")
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 400
+
+@credit_bp.route("/credits/eligibility", methods=["POST"])
+def credits_eligibility():
+    """
+    Avalia a elegibilidade de muitas solicitações de uma vez.
+
+    Corpo: {"applications": [{...}, ...] | {coluna: [...]},
+            "fundo": {"limite_operacional": ..., "valor_garantido": ...},
+            "regras": {...}}
+    """
+    try:
+        data = loads(request.get_data())
+        applications = pd.DataFrame(data.get("applications", []))
+        if len(applications) > MAX_BULK_ITEMS:
+            raise ValueError(f"Máximo de {MAX_BULK_ITEMS} solicitações por requisição.")
+        result = credit_service.calculate_eligibility(
+            applications, fund_state=data.get("fundo"), rules=data.get("regras")
+        )
+        body = dumps({
+            "resultado": dataframe_to_columns(result),
+            "decisoes": {k: int(v) for k, v in result["decisao"].value_counts().items()},
+        })
+        return current_app.response_class(body, mimetype="application/json")
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 400
+
 @credit_bp.route("/credits/<int:credit_id>", methods=["GET"])
 def get_credit(credit_id):
     credit = credit_service.get_credit(credit_id)
@@ -24,9 +161,14 @@ def get_credit(credit_id):
 @credit_bp.route("/credits/<int:credit_id>", methods=["PUT"])
 def update_credit(credit_id):
     try:
-        data = request.get_json()
+        data, errors = read_single_credit()
+        if len(errors):
+            return validation_error_response(errors)
         credit = Credit(data['amount'], data['interest_rate'])
-        return jsonify(credit_service.update_credit(credit_id, credit))
+        updated = credit_service.update_credit(credit_id, credit)
+        if updated is None:
+            return jsonify({"detail": "Credit not found"}), 404
+        return jsonify(updated)
     except Exception as e:
         return jsonify({"detail": str(e)}), 400
 
@@ -35,4 +177,4 @@ def delete_credit(credit_id):
     success = credit_service.delete_credit(credit_id)
     if not success:
         return jsonify({"detail": "Credit not found"}), 404
-    return jsonify({"detail": "Credit deleted successfully"})
\ No newline at end of file
+    return jsonify({"detail": "Credit deleted successfully"})
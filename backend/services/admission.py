@@ -0,0 +1,258 @@
+"""
+Estimativa de custo e controle de admissão para /simulate.
+
+Antes de executar uma simulação, estima o número de operações, o trabalho
+(operações × meses percorridos pelo laço mensal), o tempo e a memória a partir
+dos parâmetros. O controlador de admissão usa essa estimativa para:
+  - recusar requisições acima do orçamento (422)
+  - desviar requisições pesadas para a execução assíncrona
+  - limitar requisições simultâneas por cliente (429 + Retry-After)
+  - enfileirar por tempo limitado quando todos os slots estão ocupados
+    e recusar com 503 + Retry-After quando a fila está cheia ou expira
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.cube import MEDIDAS, PORTES
+from services.simulation import SimulationCancelled, planejar_operacoes_mensais
+
+
+# Constantes calibradas com a implementação atual de run_simulation
+SEGUNDOS_POR_OPERACAO = 2e-5
+SEGUNDOS_POR_OPERACAO_MES = 5e-6
+BYTES_POR_OPERACAO = 1_500
+BYTES_POR_PARCELA = 64  # float em duas listas (parcelas e saldos)
+BYTES_CUBO_POR_MES2 = len(PORTES) * len(MEDIDAS) * 8  # cubo porte × safra × mês × medida
+
+# Intervalo (s) entre verificações do cancelamento durante a espera na fila
+INTERVALO_CANCELAMENTO = 0.1
+
+
+def estimate_cost(params: Dict, com_cubo: bool = False) -> Dict:
+    """
+    Estima o custo de uma simulação sem executá-la.
+
+    O volume pretendido por mês é um limite superior: durante a simulação a
+    capacidade de alavancagem pode reduzir o número de operações geradas.
+    com_cubo inclui na memória o cubo de resultados (quadrático em meses),
+    montado apenas quando a execução é gravada no histórico.
+
+    Returns:
+        Dicionário com meses, operações, trabalho (operações × meses),
+        segundos estimados e memória estimada em MB
+    """
+    meses = int(params["simulation_months"])
+    alvos = np.asarray(planejar_operacoes_mensais(params), dtype=np.int64)
+    operacoes = int(alvos.sum())
+    # Cada mês percorre todas as operações já contratadas
+    trabalho = int(np.cumsum(alvos).sum())
+
+    prazo_medio = (params["prazo_operacao_MEI"] * params["prop_MEI"] +
+                   params["prazo_operacao_ME"] * params["prop_ME"] +
+                   params["prazo_operacao_EPP"] * params["prop_EPP"])
+    memoria_bytes = operacoes * (BYTES_POR_OPERACAO + BYTES_POR_PARCELA * max(1.0, float(prazo_medio)))
+    if com_cubo:
+        memoria_bytes += BYTES_CUBO_POR_MES2 * meses * meses
+
+    return {
+        "meses": meses,
+        "operacoes": operacoes,
+        "trabalho": trabalho,
+        "segundos_estimados": round(operacoes * SEGUNDOS_POR_OPERACAO + trabalho * SEGUNDOS_POR_OPERACAO_MES, 3),
+        "memoria_mb_estimada": round(memoria_bytes / 1024 ** 2, 1),
+    }
+
+
+def combine_estimates(estimates: List[Dict]) -> Dict:
+    """Soma as estimativas de simulações executadas juntas (ex.: os fundos de /simulate/multi)"""
+    return {
+        "meses": max(e["meses"] for e in estimates),
+        "operacoes": sum(e["operacoes"] for e in estimates),
+        "trabalho": sum(e["trabalho"] for e in estimates),
+        "segundos_estimados": round(sum(e["segundos_estimados"] for e in estimates), 3),
+        "memoria_mb_estimada": round(sum(e["memoria_mb_estimada"] for e in estimates), 1),
+    }
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada pelo controle de admissão"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[int] = None,
+                 estimate: Optional[Dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.estimate = estimate
+
+
+class AdmissionController:
+    """Orçamento por requisição, limite por cliente e fila limitada de execução"""
+
+    def __init__(self, max_operations: int = 200_000, max_work: int = 60_000_000,
+                 max_memory_mb: float = 2048.0, async_above_seconds: float = 30.0,
+                 max_concurrent: Optional[int] = None, max_queue: int = 8,
+                 queue_timeout: float = 30.0, max_per_client: int = 2):
+        self.max_operations = max_operations
+        self.max_work = max_work
+        self.max_memory_mb = max_memory_mb
+        self.async_above_seconds = async_above_seconds
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_per_client = max_per_client
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._running = 0
+        self._queued = 0
+        self._running_seconds = 0.0
+        self._per_client: Dict[str, int] = {}
+        self._counters = {"admitted": 0, "rejected_budget": 0, "rejected_client": 0,
+                          "rejected_overload": 0, "sent_async": 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Cria o controlador a partir das variáveis de ambiente SIMULATE_*"""
+        env = os.environ.get
+        return cls(
+            max_operations=int(env("SIMULATE_MAX_OPERATIONS", 200_000)),
+            max_work=int(env("SIMULATE_MAX_WORK", 60_000_000)),
+            max_memory_mb=float(env("SIMULATE_MAX_MEMORY_MB", 2048)),
+            async_above_seconds=float(env("SIMULATE_ASYNC_ABOVE_SECONDS", 30)),
+            max_concurrent=int(env("SIMULATE_MAX_CONCURRENT", 0)) or None,
+            max_queue=int(env("SIMULATE_MAX_QUEUE", 8)),
+            queue_timeout=float(env("SIMULATE_QUEUE_TIMEOUT", 30)),
+            max_per_client=int(env("SIMULATE_MAX_PER_CLIENT", 2)),
+        )
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _retry_after(self, estimate: Dict) -> int:
+        """Estimativa de espera: trabalho em execução dividido pelos slots"""
+        with self._lock:
+            pendente = self._running_seconds + estimate["segundos_estimados"] * self._queued
+        return max(1, int(math.ceil(pendente / self.max_concurrent)))
+
+    def check_budget(self, estimate: Dict) -> str:
+        """
+        Verifica o orçamento da requisição.
+
+        Returns:
+            'sync' para executar na requisição ou 'async' para desviar para um job
+
+        Raises:
+            AdmissionRejected: 422 se a estimativa exceder qualquer limite
+        """
+        excedidos = []
+        if estimate["operacoes"] > self.max_operations:
+            excedidos.append(f"operações estimadas {estimate['operacoes']} > {self.max_operations}")
+        if estimate["trabalho"] > self.max_work:
+            excedidos.append(f"operações × meses {estimate['trabalho']} > {self.max_work}")
+        if estimate["memoria_mb_estimada"] > self.max_memory_mb:
+            excedidos.append(f"memória estimada {estimate['memoria_mb_estimada']} MB > {self.max_memory_mb} MB")
+        if excedidos:
+            self._count("rejected_budget")
+            raise AdmissionRejected(422, "Simulação acima do orçamento: " + "; ".join(excedidos),
+                                    estimate=estimate)
+
+        if estimate["segundos_estimados"] > self.async_above_seconds:
+            self._count("sent_async")
+            return "async"
+        return "sync"
+
+    @contextmanager
+    def client_slot(self, client_id: str, estimate: Dict):
+        """Limita o número de simulações simultâneas de um mesmo cliente"""
+        with self._lock:
+            em_uso = self._per_client.get(client_id, 0)
+            if em_uso >= self.max_per_client:
+                self._counters["rejected_client"] += 1
+                rejeitar = True
+            else:
+                self._per_client[client_id] = em_uso + 1
+                rejeitar = False
+        if rejeitar:
+            raise AdmissionRejected(429, "Muitas simulações simultâneas para este cliente.",
+                                    retry_after=max(1, int(math.ceil(estimate["segundos_estimados"]))),
+                                    estimate=estimate)
+        try:
+            yield
+        finally:
+            with self._lock:
+                restante = self._per_client.get(client_id, 1) - 1
+                if restante > 0:
+                    self._per_client[client_id] = restante
+                else:
+                    self._per_client.pop(client_id, None)
+
+    def _aguardar_slot(self, cancel=None) -> bool:
+        """Espera um slot por até queue_timeout; com cancel, desiste assim que ele for sinalizado"""
+        if cancel is None:
+            return self._slots.acquire(timeout=self.queue_timeout)
+        limite = time.monotonic() + self.queue_timeout
+        while not cancel.is_set():
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return False
+            if self._slots.acquire(timeout=min(restante, INTERVALO_CANCELAMENTO)):
+                return True
+        raise SimulationCancelled(0)
+
+    @contextmanager
+    def worker_slot(self, estimate: Dict, cancel=None):
+        """
+        Ocupa um slot de execução, aguardando na fila por até queue_timeout.
+
+        cancel (threading.Event) interrompe a espera na fila com SimulationCancelled(0).
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                fila_cheia = self._queued >= self.max_queue
+                if not fila_cheia:
+                    self._queued += 1
+            if fila_cheia:
+                self._count("rejected_overload")
+                raise AdmissionRejected(503, "Servidor sobrecarregado: fila de simulações cheia.",
+                                        retry_after=self._retry_after(estimate), estimate=estimate)
+            try:
+                obtido = self._aguardar_slot(cancel)
+            finally:
+                with self._lock:
+                    self._queued -= 1
+            if not obtido:
+                self._count("rejected_overload")
+                raise AdmissionRejected(503, "Tempo de espera na fila de simulações esgotado.",
+                                        retry_after=self._retry_after(estimate), estimate=estimate)
+
+        with self._lock:
+            self._running += 1
+            self._running_seconds += estimate["segundos_estimados"]
+            self._counters["admitted"] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._running_seconds -= estimate["segundos_estimados"]
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """Estado atual e contadores do controle de admissão"""
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._queued,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "clients_active": len(self._per_client),
+                **self._counters,
+            }
@@ -0,0 +1,321 @@
+"""
+Calibração de parâmetros da simulação contra valores observados.
+
+Procura taxas de inadimplência por porte e taxa de recuperação (os
+parâmetros de DEFAULT_BOUNDS, dentro desses limites) que aproximem os KPIs finais e/ou as séries mensais
+simuladas (indice_sgc, taxa_inadimplencia_valor, ...) de valores-alvo.
+
+- Otimizador sem derivadas: Nelder-Mead com limites (projeção nos limites),
+  implementado em NumPy.
+- Números aleatórios comuns: todos os candidatos são avaliados com as mesmas
+  sementes, de modo que a diferença entre candidatos reflete os parâmetros e
+  não o ruído da amostragem.
+- As avaliações (candidato × semente) rodam em um pool de processos; em cada
+  iteração os pontos de reflexão, expansão e contrações são avaliados juntos.
+- Pontos já avaliados ficam em cache; a busca para cedo quando o objetivo
+  atinge a tolerância, o simplex converge ou não há melhora por várias
+  iterações.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.multi_fund import derivar_sementes
+from services.simulation import build_resumo, get_default_params, run_simulation
+from utils.processes import process_context
+
+
+# Parâmetros calibráveis e seus limites (padrão e máximos permitidos); só as taxas
+# são calibradas, pois não alteram o custo da simulação
+DEFAULT_BOUNDS = {
+    "taxa_inadimplencia_MEI": (0.0, 1.0),
+    "taxa_inadimplencia_ME": (0.0, 1.0),
+    "taxa_inadimplencia_EPP": (0.0, 1.0),
+    "taxa_recuperacao": (0.0, 1.0),
+}
+
+# Coeficientes padrão do Nelder-Mead (reflexão, expansão, contração, encolhimento)
+ALPHA, GAMMA, RHO, SIGMA = 1.0, 2.0, 0.5, 0.5
+
+# Casas decimais usadas na chave do cache de pontos avaliados
+CACHE_DECIMALS = 6
+
+
+def _avaliar_replica(args) -> Dict:
+    """Executa uma simulação (em um processo do pool) e devolve só KPIs e séries pedidas"""
+    params, series = args
+    df_carteira, df_fundo, _ = run_simulation(params)
+    desconhecidas = [nome for nome in series if nome not in df_carteira.columns]
+    if desconhecidas:
+        raise ValueError(f"Séries desconhecidas em df_carteira: {', '.join(desconhecidas)}")
+    return {
+        "resumo": build_resumo(df_carteira, df_fundo),
+        "series": {nome: df_carteira[nome].to_numpy(dtype=np.float64) for nome in series},
+    }
+
+
+def _erro_relativo(simulado, alvo) -> float:
+    escala = max(abs(float(alvo)), 1e-9)
+    return ((float(simulado) - float(alvo)) / escala) ** 2
+
+
+class Calibrator:
+    """
+    Calibra parâmetros da simulação minimizando o erro relativo quadrático
+    ponderado entre KPIs/séries simulados (média das réplicas) e os alvos.
+
+    targets: {"kpis": {"indice_sgc": 0.04, ...},
+              "series": {"indice_sgc": [valores mensais ou null], ...},
+              "pesos": {"indice_sgc": 2.0, ...}}
+    """
+
+    def __init__(self, targets: Dict, base_params: Optional[Dict] = None,
+                 bounds: Optional[Dict[str, Sequence[float]]] = None,
+                 replicas: int = 3, master_seed: int = 42, max_workers: Optional[int] = None):
+        self.kpis = dict(targets.get("kpis") or {})
+        self.series = {nome: np.asarray([np.nan if v is None else v for v in valores], dtype=np.float64)
+                       for nome, valores in (targets.get("series") or {}).items()}
+        if not self.kpis and not self.series:
+            raise ValueError("Informe ao menos um alvo em 'kpis' ou 'series'.")
+        self.pesos = dict(targets.get("pesos") or {})
+
+        self.base_params = get_default_params()
+        self.base_params.update(base_params or {})
+
+        bounds = bounds or DEFAULT_BOUNDS
+        self.nomes = list(bounds)
+        if not self.nomes:
+            raise ValueError("Informe ao menos um parâmetro a calibrar.")
+        desconhecidos = [n for n in self.nomes if n not in DEFAULT_BOUNDS]
+        if desconhecidos:
+            raise ValueError(f"Parâmetros não calibráveis: {', '.join(desconhecidos)}. "
+                             f"Use {', '.join(DEFAULT_BOUNDS)}.")
+        self.lower = np.array([float(bounds[n][0]) for n in self.nomes])
+        self.upper = np.array([float(bounds[n][1]) for n in self.nomes])
+        if not (self.lower < self.upper).all():
+            raise ValueError("Cada limite inferior deve ser menor que o superior.")
+        permitidos_min = np.array([DEFAULT_BOUNDS[n][0] for n in self.nomes])
+        permitidos_max = np.array([DEFAULT_BOUNDS[n][1] for n in self.nomes])
+        if not ((self.lower >= permitidos_min) & (self.upper <= permitidos_max)).all():
+            raise ValueError("Limites de calibração devem ficar dentro de " + ", ".join(
+                f"{n} {list(DEFAULT_BOUNDS[n])}" for n in self.nomes) + ".")
+
+        # Números aleatórios comuns: as mesmas sementes para todos os candidatos
+        self.seeds = derivar_sementes(master_seed, max(1, int(replicas)))
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+        self.cache: Dict[tuple, Dict] = {}
+        self.cache_hits = 0
+        self.simulacoes = 0
+
+    def _clip(self, x: np.ndarray) -> np.ndarray:
+        return np.clip(x, self.lower, self.upper)
+
+    def _key(self, x: np.ndarray) -> tuple:
+        return tuple(np.round(x, CACHE_DECIMALS).tolist())
+
+    def params_for(self, x: np.ndarray) -> Dict:
+        params = dict(self.base_params)
+        params.update({nome: float(v) for nome, v in zip(self.nomes, x)})
+        return params
+
+    def corner_params(self) -> List[Dict]:
+        """Parâmetros-base com todos os calibrados no limite inferior e no superior"""
+        return [self.params_for(self.lower), self.params_for(self.upper)]
+
+    def objective(self, resumo: Dict, series: Dict[str, np.ndarray]) -> float:
+        """Erro relativo quadrático ponderado dos KPIs e séries (médias das réplicas)"""
+        total = 0.0
+        for nome, alvo in self.kpis.items():
+            total += self.pesos.get(nome, 1.0) * _erro_relativo(resumo[nome], alvo)
+        for nome, alvo in self.series.items():
+            simulada = series[nome]
+            n = min(len(simulada), len(alvo))
+            validos = ~np.isnan(alvo[:n])
+            if not validos.any():
+                continue
+            escala = max(float(np.nanmean(np.abs(alvo[:n]))), 1e-9)
+            erro = np.mean(((simulada[:n][validos] - alvo[:n][validos]) / escala) ** 2)
+            total += self.pesos.get(nome, 1.0) * float(erro)
+        return total
+
+    def evaluate_many(self, pontos: List[np.ndarray], executor=None) -> List[Dict]:
+        """Avalia vários candidatos (com cache), distribuindo candidato × semente no pool"""
+        pontos = [self._clip(np.asarray(x, dtype=np.float64)) for x in pontos]
+        novos = []
+        for x in pontos:
+            chave = self._key(x)
+            if chave in self.cache or chave in [self._key(n) for n in novos]:
+                self.cache_hits += 1
+            else:
+                novos.append(x)
+
+        if novos:
+            tarefas = []
+            for x in novos:
+                for seed in self.seeds:
+                    params = self.params_for(x)
+                    params["random_seed"] = seed
+                    tarefas.append((params, list(self.series)))
+            if executor is None:
+                resultados = [_avaliar_replica(t) for t in tarefas]
+            else:
+                resultados = list(executor.map(_avaliar_replica, tarefas))
+            self.simulacoes += len(tarefas)
+
+            desconhecidos = [nome for nome in self.kpis if nome not in resultados[0]["resumo"]]
+            if desconhecidos:
+                raise ValueError(f"KPIs desconhecidos no resumo: {', '.join(desconhecidos)}")
+
+            r = len(self.seeds)
+            for i, x in enumerate(novos):
+                replicas = resultados[i * r:(i + 1) * r]
+                resumo = {nome: float(np.mean([rep["resumo"][nome] for rep in replicas]))
+                          for nome in replicas[0]["resumo"]}
+                series = {nome: np.mean([rep["series"][nome] for rep in replicas], axis=0)
+                          for nome in self.series}
+                self.cache[self._key(x)] = {
+                    "x": x,
+                    "objetivo": self.objective(resumo, series),
+                    "resumo": resumo,
+                    "series": series,
+                }
+        return [self.cache[self._key(x)] for x in pontos]
+
+    def run(self, x0: Optional[Sequence[float]] = None, max_iter: int = 60, max_evaluations: int = 200,
+            ftol: float = 1e-4, xtol: float = 1e-4, target_objective: float = 0.0, patience: int = 15,
+            initial_step: float = 0.1, report: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Executa a busca Nelder-Mead.
+
+        Args:
+            x0: Ponto inicial (padrão: valores de base_params, limitados)
+            max_iter / max_evaluations: Limites de iterações e de pontos avaliados
+            ftol / xtol: Convergência do simplex (espalhamento do objetivo e tamanho)
+            target_objective: Para quando o melhor objetivo for menor ou igual
+            patience: Iterações sem melhora relevante antes de parar
+            initial_step: Passo inicial relativo à largura de cada limite
+            report: Função chamada a cada iteração com o progresso e o traço
+
+        Returns:
+            Melhor ponto, KPIs e séries simulados, motivo de parada e traço de convergência
+        """
+        inicio = time.perf_counter()
+        n = len(self.nomes)
+        if x0 is None:
+            x0 = [self.base_params.get(nome, (lo + hi) / 2)
+                  for nome, lo, hi in zip(self.nomes, self.lower, self.upper)]
+        x0 = self._clip(np.asarray(x0, dtype=np.float64))
+
+        # Simplex inicial: passo em cada eixo (para dentro dos limites)
+        largura = self.upper - self.lower
+        simplex = [x0]
+        for i in range(n):
+            x = x0.copy()
+            passo = initial_step * largura[i]
+            x[i] = x[i] + passo if x[i] + passo <= self.upper[i] else x[i] - passo
+            simplex.append(x)
+
+        trace = []
+        motivo = "max_iter"
+        melhor_anterior = np.inf
+        sem_melhora = 0
+
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=process_context()) if self.max_workers > 1 else None
+        try:
+            valores = [r["objetivo"] for r in self.evaluate_many(simplex, executor)]
+            for iteracao in range(1, max_iter + 1):
+                ordem = np.argsort(valores)
+                simplex = [simplex[i] for i in ordem]
+                valores = [valores[i] for i in ordem]
+
+                melhor = valores[0]
+                trace.append({
+                    "iteracao": iteracao,
+                    "melhor_objetivo": melhor,
+                    "melhor_params": dict(zip(self.nomes, simplex[0].tolist())),
+                    "espalhamento": valores[-1] - valores[0],
+                    "avaliacoes": len(self.cache),
+                    "simulacoes": self.simulacoes,
+                    "cache_hits": self.cache_hits,
+                    "segundos": round(time.perf_counter() - inicio, 3),
+                })
+                if report is not None:
+                    report({"fracao": iteracao / max_iter, "iteracao": iteracao, "max_iter": max_iter,
+                            "melhor_objetivo": melhor, "trace": trace})
+
+                # Critérios de parada antecipada
+                if melhor <= target_objective:
+                    motivo = "objetivo_atingido"
+                    break
+                tamanho = max(np.max(np.abs(x - simplex[0]) / largura) for x in simplex[1:])
+                if valores[-1] - valores[0] <= ftol and tamanho <= xtol:
+                    motivo = "convergiu"
+                    break
+                if melhor < melhor_anterior - ftol:
+                    melhor_anterior, sem_melhora = melhor, 0
+                else:
+                    sem_melhora += 1
+                    if sem_melhora >= patience:
+                        motivo = "sem_melhora"
+                        break
+                if len(self.cache) >= max_evaluations:
+                    motivo = "max_avaliacoes"
+                    break
+
+                centroide = np.mean(simplex[:-1], axis=0)
+                pior = simplex[-1]
+                candidatos = [
+                    centroide + ALPHA * (centroide - pior),           # reflexão
+                    centroide + GAMMA * (centroide - pior),           # expansão
+                    centroide + RHO * ALPHA * (centroide - pior),     # contração externa
+                    centroide - RHO * (centroide - pior),             # contração interna
+                ]
+                # Avaliação especulativa: os quatro candidatos de uma vez no pool
+                fr, fe, fc_ext, fc_int = [r["objetivo"] for r in self.evaluate_many(candidatos, executor)]
+                reflexao, expansao, contr_ext, contr_int = [self._clip(c) for c in candidatos]
+
+                if fr < valores[0]:
+                    simplex[-1], valores[-1] = (expansao, fe) if fe < fr else (reflexao, fr)
+                elif fr < valores[-2]:
+                    simplex[-1], valores[-1] = reflexao, fr
+                elif fr < valores[-1] and fc_ext <= fr:
+                    simplex[-1], valores[-1] = contr_ext, fc_ext
+                elif fr >= valores[-1] and fc_int < valores[-1]:
+                    simplex[-1], valores[-1] = contr_int, fc_int
+                else:
+                    # Encolhimento em direção ao melhor ponto
+                    simplex = [simplex[0]] + [simplex[0] + SIGMA * (x - simplex[0]) for x in simplex[1:]]
+                    valores = [valores[0]] + [r["objetivo"] for r in self.evaluate_many(simplex[1:], executor)]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        idx = int(np.argmin(valores))
+        melhor = self.cache[self._key(simplex[idx])]
+        return {
+            "params": dict(zip(self.nomes, melhor["x"].tolist())),
+            "objetivo": melhor["objetivo"],
+            "kpis_simulados": {nome: melhor["resumo"][nome] for nome in self.kpis},
+            "kpis_alvo": self.kpis,
+            "series_simuladas": {nome: serie.tolist() for nome, serie in melhor["series"].items()},
+            "motivo_parada": motivo,
+            "iteracoes": len(trace),
+            "avaliacoes": len(self.cache),
+            "simulacoes": self.simulacoes,
+            "cache_hits": self.cache_hits,
+            "replicas": len(self.seeds),
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "trace": trace,
+        }
+
+
+def calibrate(targets: Dict, base_params: Optional[Dict] = None, bounds: Optional[Dict] = None,
+              replicas: int = 3, master_seed: int = 42, max_workers: Optional[int] = None,
+              report: Optional[Callable[[Dict], None]] = None, **opcoes) -> Dict:
+    """Atalho: cria o Calibrator e executa a busca (opcoes vão para Calibrator.run)"""
+    calibrador = Calibrator(targets, base_params, bounds, replicas, master_seed, max_workers)
+    return calibrador.run(report=report, **opcoes)
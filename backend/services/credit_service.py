@@ -1,15 +1,107 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services.credit_store import CreditStore
+from services.eligibility import EligibilityEngine
+from services.simulation import calcular_parcelas_lote, juros_anual_para_mensal
+from utils.db import sqlite_path_from_url
+
+
 class CreditService:
-    def __init__(self):
-        pass
+    def __init__(self, store=None):
+        self._store = store
+        self._store_lock = threading.Lock()
+
+    @property
+    def store(self):
+        # Abre o banco no primeiro uso (DATABASE_URL, padrão sqlite:///credit_operations.db)
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    url = os.environ.get("DATABASE_URL", "sqlite:///credit_operations.db")
+                    self._store = CreditStore(sqlite_path_from_url(url))
+        return self._store
+
+    def create_credit(self, credit):
+        return self.store.create(credit.amount, credit.interest_rate)
+
+    def get_credit(self, credit_id):
+        return self.store.get(credit_id)
+
+    def update_credit(self, credit_id, credit):
+        return self.store.update(credit_id, credit.amount, credit.interest_rate)
+
+    def delete_credit(self, credit_id):
+        return self.store.delete(credit_id)
+
+    def list_credits(self, after_id=0, limit=100, **filters):
+        return self.store.list_page(after_id=after_id, limit=limit, **filters)
+
+    def create_credits_bulk(self, credits):
+        first_id, last_id = self.store.create_many((c.amount, c.interest_rate) for c in credits)
+        return {"created": len(credits), "first_id": first_id, "last_id": last_id}
+
+    def get_credits_bulk(self, credit_ids):
+        return self.store.get_many(credit_ids)
+
+    def process_application(self, application_data, fund_state=None, rules=None):
+        """Avalia uma única solicitação e retorna decisão, score e motivos"""
+        result = self.calculate_eligibility([application_data], fund_state, rules)
+        row = result.iloc[0].to_dict()
+        row["motivos"] = [m for m in row["motivos"].split(";") if m]
+        return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+
+    def calculate_eligibility(self, applicant_data, fund_state=None, rules=None):
+        """
+        Avalia um lote de solicitações (DataFrame, lista de dicts ou dict de colunas).
+
+        fund_state ({"limite_operacional", "valor_garantido"}) habilita a regra
+        de folga de alavancagem do fundo; rules sobrescreve as regras padrão.
+        """
+        if not isinstance(applicant_data, pd.DataFrame):
+            applicant_data = pd.DataFrame(applicant_data)
+        return EligibilityEngine(rules, fund_state).score(applicant_data)
+
+    def calculate_payments(self, amount, interest_rate, term, system="PRICE",
+                           include_schedule=False, nominal_rate=False):
+        """
+        Calcula parcelas, total pago e total de juros de um ou vários créditos.
 
-    def process_application(self, application_data):
-        # Logic to process credit application
-        pass
+        amount, interest_rate e term aceitam escalares ou arrays (mesmo tamanho).
+        interest_rate é a taxa anual em percentual (18 = 18% a.a.), a mesma
+        unidade de Credit.interest_rate e do cadastro de créditos. Ela é
+        convertida aqui para a taxa mensal em decimal usada por
+        calcular_parcelas_lote: efetiva, como na simulação, ou nominal
+        (anual / 12 / 100, como Credit.calculate_monthly_payment) quando
+        nominal_rate=True. term é o prazo em meses e system é "PRICE", "SAC"
+        ou um array com o sistema de cada crédito.
+        """
+        annual_rate = np.asarray(interest_rate, dtype=np.float64)
+        if not (np.isfinite(annual_rate) & (annual_rate >= 0)).all():
+            raise ValueError("Interest rate must be a finite, non-negative number.")
+        amounts = np.asarray(amount, dtype=np.float64)
+        if not (np.isfinite(amounts) & (amounts > 0)).all():
+            raise ValueError("Credit amount must be greater than zero.")
+        systems = np.asarray(system, dtype=object)
+        if not np.isin(systems, ("PRICE", "SAC")).all():
+            raise ValueError("Amortization system must be 'PRICE' or 'SAC'.")
 
-    def calculate_eligibility(self, applicant_data):
-        # Logic to calculate eligibility for credit
-        pass
+        if nominal_rate:
+            monthly_rate = annual_rate / 12 / 100
+        else:
+            monthly_rate = juros_anual_para_mensal(annual_rate / 100)
 
-    def calculate_payments(self, amount, interest_rate, term):
-        # Logic to calculate payment amounts
-        pass
\ No newline at end of file
+        result = calcular_parcelas_lote(amounts, monthly_rate, term, systems, include_schedule)
+        quotes = {
+            "first_installment": result["primeira_parcela"],
+            "last_installment": result["ultima_parcela"],
+            "total_payment": result["total_pago"],
+            "total_interest": result["total_juros"],
+        }
+        if include_schedule:
+            quotes["installments"] = result["parcelas"]
+            quotes["balances"] = result["saldos"]
+        return quotes
@@ -0,0 +1,149 @@
+"""
+Armazenamento persistente de créditos em SQLite.
+
+Tabela 'credits' com chave primária inteira (id) e índices em amount e
+interest_rate. Inserções em lote usam uma única transação (executemany) e
+leituras grandes são paginadas por keyset (id > último id retornado), que
+mantém o custo constante por página independentemente da posição.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.db import SQLitePool
+
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS credits ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " amount REAL NOT NULL,"
+    " interest_rate REAL NOT NULL,"
+    " created_at REAL NOT NULL,"
+    " updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_credits_amount ON credits (amount)",
+    "CREATE INDEX IF NOT EXISTS idx_credits_interest_rate ON credits (interest_rate)",
+]
+
+COLUMNS = "id, amount, interest_rate, created_at, updated_at"
+
+# Limite de parâmetros por consulta do SQLite (SQLITE_MAX_VARIABLE_NUMBER antigo)
+MAX_SQL_PARAMS = 900
+
+MAX_PAGE_SIZE = 10_000
+
+
+def _row_to_dict(row) -> Dict:
+    return {
+        "id": row["id"],
+        "amount": row["amount"],
+        "interest_rate": row["interest_rate"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+class CreditStore:
+    """Repositório de créditos sobre um pool de conexões SQLite"""
+
+    def __init__(self, path: str, pool_size: int = 5):
+        self.pool = SQLitePool(path, size=pool_size)
+        with self.pool.transaction() as conn:
+            for ddl in SCHEMA:
+                conn.execute(ddl)
+
+    def create(self, amount: float, interest_rate: float) -> Dict:
+        now = time.time()
+        with self.pool.transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO credits (amount, interest_rate, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (float(amount), float(interest_rate), now, now),
+            )
+            credit_id = cur.lastrowid
+        return {"id": credit_id, "amount": float(amount), "interest_rate": float(interest_rate),
+                "created_at": now, "updated_at": now}
+
+    def create_many(self, items: Iterable[Tuple[float, float]]) -> Tuple[int, int]:
+        """
+        Insere vários créditos em uma única transação.
+
+        Returns:
+            Tupla (primeiro_id, ultimo_id) do intervalo inserido, ou (0, 0) se vazio
+        """
+        now = time.time()
+        linhas = [(float(amount), float(rate), now, now) for amount, rate in items]
+        if not linhas:
+            return 0, 0
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO credits (amount, interest_rate, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                linhas,
+            )
+            ultimo = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        # BEGIN IMMEDIATE impede escritas concorrentes: os ids do lote são contíguos
+        return ultimo - len(linhas) + 1, ultimo
+
+    def get(self, credit_id: int) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(f"SELECT {COLUMNS} FROM credits WHERE id = ?", (credit_id,)).fetchone()
+        return _row_to_dict(row) if row is not None else None
+
+    def get_many(self, ids: Sequence[int]) -> List[Dict]:
+        """Busca vários créditos por id (em blocos), na ordem dos ids existentes"""
+        encontrados = {}
+        with self.pool.connection() as conn:
+            for inicio in range(0, len(ids), MAX_SQL_PARAMS):
+                bloco = [int(i) for i in ids[inicio:inicio + MAX_SQL_PARAMS]]
+                marcadores = ",".join("?" * len(bloco))
+                for row in conn.execute(f"SELECT {COLUMNS} FROM credits WHERE id IN ({marcadores})", bloco):
+                    encontrados[row["id"]] = _row_to_dict(row)
+        return [encontrados[int(i)] for i in ids if int(i) in encontrados]
+
+    def update(self, credit_id: int, amount: float, interest_rate: float) -> Optional[Dict]:
+        now = time.time()
+        with self.pool.transaction() as conn:
+            cur = conn.execute(
+                "UPDATE credits SET amount = ?, interest_rate = ?, updated_at = ? WHERE id = ?",
+                (float(amount), float(interest_rate), now, credit_id),
+            )
+            if cur.rowcount == 0:
+                return None
+            row = conn.execute(f"SELECT {COLUMNS} FROM credits WHERE id = ?", (credit_id,)).fetchone()
+        return _row_to_dict(row)
+
+    def delete(self, credit_id: int) -> bool:
+        with self.pool.transaction() as conn:
+            cur = conn.execute("DELETE FROM credits WHERE id = ?", (credit_id,))
+        return cur.rowcount > 0
+
+    def list_page(self, after_id: int = 0, limit: int = 100,
+                  min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                  min_rate: Optional[float] = None, max_rate: Optional[float] = None) -> Dict:
+        """
+        Página de créditos ordenada por id (keyset pagination).
+
+        Returns:
+            {'items': [...], 'next_after_id': id para a próxima página ou None}
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        condicoes = ["id > ?"]
+        valores: List = [int(after_id)]
+        for coluna, operador, valor in (("amount", ">=", min_amount), ("amount", "<=", max_amount),
+                                        ("interest_rate", ">=", min_rate), ("interest_rate", "<=", max_rate)):
+            if valor is not None:
+                condicoes.append(f"{coluna} {operador} ?")
+                valores.append(float(valor))
+        valores.append(limit + 1)
+
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {COLUMNS} FROM credits WHERE {' AND '.join(condicoes)} ORDER BY id LIMIT ?",
+                valores,
+            ).fetchall()
+
+        items = [_row_to_dict(row) for row in rows[:limit]]
+        next_after_id = items[-1]["id"] if len(rows) > limit else None
+        return {"items": items, "next_after_id": next_after_id}
+
+    def count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM credits").fetchone()[0]
@@ -0,0 +1,200 @@
+"""
+Cubo agregado de resultados da simulação: porte × safra × mês × medida.
+
+Preenchido pelo próprio run_simulation (argumento cubo=), permite curvas de
+inadimplência, honra e recuperação por porte ou por safra (mês de
+contratação) sem exportar nem percorrer a tabela de operações.
+
+Medidas de fluxo (contratações, desembolso, inadimplências, honras...) somam
+os eventos do mês; medidas de estoque (saldo devedor, valor garantido,
+operações ativas, com a mesma definição de operacoes_ativas de df_carteira)
+são a posição no fim do mês. Na agregação ao longo do tempo, fluxos são
+somados e estoques assumem a posição do último mês do recorte (no eixo de
+idade, a da última idade observada de cada safra).
+
+O array é denso (3 × meses × meses × medidas em float64, cerca de 86 MB com
+600 meses); estimate_cost inclui esse tamanho na memória estimada.
+"""
+
+import io
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+PORTES = ("MEI", "ME", "EPP")
+
+# (nome, tipo) na ordem do último eixo do cubo
+MEDIDAS = (
+    ("operacoes_contratadas", "fluxo"),
+    ("desembolso", "fluxo"),
+    ("avais_concedidos", "fluxo"),
+    ("operacoes_ativas", "estoque"),
+    ("saldo_devedor", "estoque"),
+    ("valor_garantido", "estoque"),
+    ("inadimplencias", "fluxo"),
+    ("saldo_inadimplido", "fluxo"),
+    ("honras", "fluxo"),
+    ("recuperacoes", "fluxo"),
+)
+NOMES_MEDIDAS = tuple(nome for nome, _ in MEDIDAS)
+IDX = {nome: i for i, nome in enumerate(NOMES_MEDIDAS)}
+ESTOQUES = frozenset(nome for nome, tipo in MEDIDAS if tipo == "estoque")
+
+EIXOS = ("porte", "safra", "mes")
+
+
+class ResultCube:
+    """
+    Array denso (porte, safra, mes, medida) em float64.
+
+    safra e mes são índices 0..meses-1 (mês 1 da simulação = índice 0).
+    Durante a simulação, cada operação é identificada pelo índice plano
+    porte * meses + safra (ver indice()).
+    """
+
+    def __init__(self, meses: int, data: Optional[np.ndarray] = None):
+        self.meses = int(meses)
+        forma = (len(PORTES), self.meses, self.meses, len(MEDIDAS))
+        self.data = np.zeros(forma) if data is None else np.asarray(data, dtype=np.float64).reshape(forma)
+        # Visão (porte * safra, mes, medida) usada no preenchimento
+        self._plano = self.data.reshape(len(PORTES) * self.meses, self.meses, len(MEDIDAS))
+
+    # -- preenchimento (usado por run_simulation) --------------------------
+
+    def indice(self, porte: str, mes_contratacao: int) -> int:
+        return PORTES.index(porte) * self.meses + (mes_contratacao - 1)
+
+    def adicionar(self, idx: int, mes: int, medida: str, valor: float = 1.0):
+        """Soma um evento de fluxo da operação idx no mês (1..meses)"""
+        self._plano[idx, mes - 1, IDX[medida]] += valor
+
+    def acumulador(self) -> List[float]:
+        """Lista zerada (uma posição por porte × safra) para estoques do mês"""
+        return [0.0] * (len(PORTES) * self.meses)
+
+    def definir_estoque(self, mes: int, medida: str, valores: Sequence[float]):
+        """Grava a posição de fim de mês de uma medida de estoque"""
+        self._plano[:, mes - 1, IDX[medida]] = valores
+
+    # -- consulta ----------------------------------------------------------
+
+    def query(self, medidas: Optional[Iterable[str]] = None, portes: Optional[Iterable[str]] = None,
+              safras: Tuple[Optional[int], Optional[int]] = (None, None),
+              meses: Tuple[Optional[int], Optional[int]] = (None, None),
+              agrupar: Iterable[str] = ("mes",), eixo_tempo: str = "mes") -> Dict:
+        """
+        Recorte e agregação do cubo.
+
+        Args:
+            medidas: Medidas retornadas (padrão: todas)
+            portes: Portes incluídos (padrão: todos)
+            safras / meses: Intervalos fechados (1-based) de safra e de mês
+                (ou de idade, com eixo_tempo="idade")
+            agrupar: Eixos mantidos no resultado (porte, safra, mes); os demais são agregados
+            eixo_tempo: "mes" (calendário) ou "idade" (meses desde a contratação, 1 = mês da safra),
+                para curvas por safra alinhadas
+
+        Returns:
+            {"eixos": [...], "coords": {eixo: [...]}, "valores": {medida: ndarray}}
+        """
+        medidas = list(medidas or NOMES_MEDIDAS)
+        desconhecidas = [m for m in medidas if m not in IDX]
+        if desconhecidas:
+            raise ValueError(f"Medidas desconhecidas: {', '.join(desconhecidas)}. Use {', '.join(NOMES_MEDIDAS)}.")
+        agrupar = set(agrupar)
+        if agrupar - set(EIXOS):
+            raise ValueError(f"Eixos de agrupamento válidos: {', '.join(EIXOS)}.")
+        agrupar = [e for e in EIXOS if e in agrupar]
+        if eixo_tempo not in ("mes", "idade"):
+            raise ValueError("eixo_tempo deve ser 'mes' ou 'idade'.")
+
+        portes = list(portes or PORTES)
+        if any(p not in PORTES for p in portes):
+            raise ValueError(f"Portes válidos: {', '.join(PORTES)}.")
+        idx_portes = [PORTES.index(p) for p in portes]
+
+        cubo = self.data[idx_portes][..., [IDX[m] for m in medidas]]
+        if eixo_tempo == "idade":
+            cubo = self._por_idade(cubo)
+
+        s0, s1 = self._intervalo(safras)
+        t0, t1 = self._intervalo(meses)
+        cubo = cubo[:, s0:s1, t0:t1, :]
+
+        # Estoques agregados no tempo assumem a posição do último mês do recorte
+        if "mes" not in agrupar and cubo.shape[2] > 0:
+            estoque = np.array([m in ESTOQUES for m in medidas])
+            fluxo_total = cubo.sum(axis=2)
+            if eixo_tempo == "idade":
+                posicao = self._ultima_idade_observada(cubo, s0, t0, t1)
+            else:
+                posicao = cubo[:, :, -1, :]
+            cubo = np.where(estoque, posicao, fluxo_total)[:, :, np.newaxis, :]
+        eixos_somados = tuple(i for i, e in enumerate(EIXOS) if e not in agrupar)
+        agregado = cubo.sum(axis=eixos_somados)
+
+        coords = {
+            "porte": portes,
+            "safra": list(range(s0 + 1, s0 + 1 + cubo.shape[1])),
+            "mes": list(range(t0 + 1, t0 + 1 + (cubo.shape[2] if "mes" in agrupar else 0))),
+        }
+        nome_tempo = "idade" if eixo_tempo == "idade" else "mes"
+        return {
+            "eixos": [nome_tempo if e == "mes" else e for e in agrupar],
+            "coords": {(nome_tempo if e == "mes" else e): coords[e] for e in agrupar},
+            "valores": {m: (float(agregado[..., i]) if not agrupar else np.ascontiguousarray(agregado[..., i]))
+                        for i, m in enumerate(medidas)},
+        }
+
+    def _intervalo(self, intervalo) -> Tuple[int, int]:
+        inicio, fim = intervalo
+        inicio = 0 if inicio is None else max(0, int(inicio) - 1)
+        fim = self.meses if fim is None else min(self.meses, int(fim))
+        return inicio, max(inicio, fim)
+
+    def _ultima_idade_observada(self, cubo: np.ndarray, s0: int, t0: int, t1: int) -> np.ndarray:
+        """
+        Posição (porte, safra, medida) na última idade de cada safra dentro do recorte.
+
+        Uma safra só é observada até o fim do horizonte (idade meses - safra); as
+        idades posteriores são o preenchimento com zero de _por_idade.
+        """
+        safras = np.arange(s0, s0 + cubo.shape[1])
+        ultima = np.minimum(t1, self.meses - safras) - 1 - t0
+        observada = ultima >= 0
+        posicao = cubo[:, np.arange(cubo.shape[1]), np.maximum(ultima, 0), :]
+        posicao[:, ~observada, :] = 0.0
+        return posicao
+
+    def _por_idade(self, cubo: np.ndarray) -> np.ndarray:
+        """Reindexa o eixo de tempo para idade (mes - safra), preenchendo com zero fora do horizonte"""
+        safra = np.arange(self.meses)[:, np.newaxis]
+        idade = np.arange(self.meses)[np.newaxis, :]
+        mes = safra + idade
+        validos = mes < self.meses
+        resultado = cubo[:, safra, np.minimum(mes, self.meses - 1), :]
+        resultado[:, ~validos, :] = 0.0
+        return resultado
+
+    # -- persistência ------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.save(buffer, self.data, allow_pickle=False)
+        return zlib.compress(buffer.getvalue(), 6)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "ResultCube":
+        data = np.load(io.BytesIO(zlib.decompress(blob)), allow_pickle=False)
+        return cls(data.shape[1], data)
+
+    def info(self) -> Dict:
+        return {
+            "forma": list(self.data.shape),
+            "eixos": list(EIXOS) + ["medida"],
+            "portes": list(PORTES),
+            "medidas": [{"nome": nome, "tipo": tipo} for nome, tipo in MEDIDAS],
+            "meses": self.meses,
+        }
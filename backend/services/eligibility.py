@@ -0,0 +1,294 @@
+"""
+Motor de elegibilidade de crédito baseado em regras, avaliado em lote.
+
+As regras (limites por porte, faixas de ticket, comprometimento de renda e
+folga de alavancagem do fundo) são compiladas uma única vez em predicados
+vetorizados sobre arrays NumPy. Um DataFrame inteiro (ou uma sequência de
+blocos, no modo streaming) é avaliado de uma vez, retornando decisão,
+score e motivos por solicitação.
+
+Colunas de entrada:
+  porte, valor_solicitado, prazo (meses), faturamento_mensal
+  opcionais: id, dividas_mensais, taxa_juros_anual, percentual_garantia,
+             sistema_amortizacao
+"""
+
+import copy
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.simulation import calcular_parcelas_lote, get_default_params, juros_anual_para_mensal
+
+
+PORTES = ("MEI", "ME", "EPP")
+
+APROVADO = "APROVADO"
+ANALISE = "ANALISE"
+REPROVADO = "REPROVADO"
+
+
+def default_rules() -> Dict:
+    """Regras padrão, com tickets, juros e garantias dos parâmetros da simulação"""
+    params = get_default_params()
+    return {
+        "ticket_minimo": 500.0,
+        "ticket_maximo": {"MEI": 60_000.0, "ME": 240_000.0, "EPP": 450_000.0},
+        # Limites de faturamento anual do Simples Nacional, em base mensal
+        "faturamento_mensal_maximo": {"MEI": 81_000 / 12, "ME": 360_000 / 12, "EPP": 4_800_000 / 12},
+        "ticket_medio": {p: float(params[f"ticket_medio_{p}"]) for p in PORTES},
+        "multiplo_ticket_alerta": 2.0,
+        "prazo_maximo": 60,
+        "comprometimento_alerta": 0.30,
+        "comprometimento_maximo": 0.50,
+        "taxa_juros_anual": {p: float(params[f"taxa_juros_media_anual_{p}"]) for p in PORTES},
+        "percentual_garantia": {p: float(params[f"percentual_garantia_{p}"]) for p in PORTES},
+        "taxa_concessao": float(params["taxa_concessao"]),
+        "score_aprovacao": 70.0,
+        "penalidades": {
+            "TICKET_ACIMA_FAIXA": 20.0,
+            "COMPROMETIMENTO_ALTO": 25.0,
+            "PRAZO_LONGO": 10.0,
+        },
+    }
+
+
+def merge_rules(overrides: Optional[Dict] = None) -> Dict:
+    """Mescla sobrescritas com as regras padrão (dicts por porte são mesclados por chave)"""
+    regras = default_rules()
+    for chave, valor in (overrides or {}).items():
+        if isinstance(valor, dict) and isinstance(regras.get(chave), dict):
+            regras[chave] = {**regras[chave], **valor}
+        else:
+            regras[chave] = valor
+    return regras
+
+
+def fund_state_from_carteira(df_carteira: pd.DataFrame) -> Dict:
+    """Estado atual do fundo (último mês) a partir de df_carteira da simulação"""
+    ultimo = df_carteira.iloc[-1]
+    return {
+        "limite_operacional": float(ultimo["limite_operacional"]),
+        "valor_garantido": float(ultimo["valor_garantido_mes"]),
+    }
+
+
+class Rule:
+    """Regra compilada: predicado vetorizado que marca as solicitações reprovadas"""
+
+    def __init__(self, code: str, message: str, predicate: Callable[[Dict], np.ndarray],
+                 hard: bool = True, penalty: float = 0.0):
+        self.code = code
+        self.message = message
+        self.predicate = predicate
+        self.hard = hard
+        self.penalty = penalty
+
+
+def _por_porte(valores: Dict, padrao: float = np.nan) -> np.ndarray:
+    """Tabela indexada pelo código do porte; o último item cobre porte inválido (-1)"""
+    return np.array([float(valores.get(p, padrao)) for p in PORTES] + [padrao])
+
+
+class EligibilityEngine:
+    """Avalia solicitações de crédito em lote com regras compiladas"""
+
+    def __init__(self, rules: Optional[Dict] = None, fund_state: Optional[Dict] = None):
+        self.rules = merge_rules(rules)
+        self.fund_state = copy.deepcopy(fund_state) if fund_state else None
+        self._compiled = self._compile(self.rules)
+        self.reset()
+
+    def reset(self):
+        """Restaura a folga de alavancagem do fundo e a numeração das linhas (início de um novo lote)"""
+        self._linhas = 0
+        if self.fund_state is None:
+            self._folga = np.inf
+        else:
+            self._folga = max(0.0, float(self.fund_state["limite_operacional"]) -
+                              float(self.fund_state.get("valor_garantido", 0.0)))
+
+    @staticmethod
+    def _compile(regras: Dict) -> List[Rule]:
+        ticket_min = float(regras["ticket_minimo"])
+        ticket_max = _por_porte(regras["ticket_maximo"])
+        faturamento_max = _por_porte(regras["faturamento_mensal_maximo"])
+        ticket_alerta = _por_porte(regras["ticket_medio"]) * float(regras["multiplo_ticket_alerta"])
+        prazo_max = int(regras["prazo_maximo"])
+        comprometimento_alerta = float(regras["comprometimento_alerta"])
+        comprometimento_max = float(regras["comprometimento_maximo"])
+        penalidades = regras["penalidades"]
+
+        return [
+            Rule("PORTE_INVALIDO", "Porte deve ser MEI, ME ou EPP",
+                 lambda c: c["porte_idx"] < 0),
+            Rule("TICKET_FORA_LIMITE", "Valor fora dos limites do porte",
+                 lambda c: ~((c["valor_solicitado"] >= ticket_min) &
+                             (c["valor_solicitado"] <= ticket_max[c["porte_idx"]]))),
+            Rule("FATURAMENTO_INCOMPATIVEL", "Faturamento incompatível com o porte",
+                 lambda c: ~((c["faturamento_mensal"] > 0) &
+                             (c["faturamento_mensal"] <= faturamento_max[c["porte_idx"]]))),
+            Rule("PRAZO_INVALIDO", "Prazo fora do intervalo permitido",
+                 lambda c: ~((c["prazo"] >= 1) & (c["prazo"] <= prazo_max))),
+            Rule("COMPROMETIMENTO_EXCESSIVO", "Parcelas comprometem renda acima do máximo",
+                 lambda c: ~(c["comprometimento"] <= comprometimento_max)),
+            Rule("TICKET_ACIMA_FAIXA", "Valor acima da faixa usual do porte",
+                 lambda c: c["valor_solicitado"] > ticket_alerta[c["porte_idx"]],
+                 hard=False, penalty=float(penalidades.get("TICKET_ACIMA_FAIXA", 0.0))),
+            Rule("COMPROMETIMENTO_ALTO", "Comprometimento de renda acima do recomendado",
+                 lambda c: c["comprometimento"] > comprometimento_alerta,
+                 hard=False, penalty=float(penalidades.get("COMPROMETIMENTO_ALTO", 0.0))),
+            Rule("PRAZO_LONGO", "Prazo acima de 2/3 do máximo",
+                 lambda c: c["prazo"] > prazo_max * 2 / 3,
+                 hard=False, penalty=float(penalidades.get("PRAZO_LONGO", 0.0))),
+        ]
+
+    def _prepare(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Extrai as colunas como arrays e calcula parcela, comprometimento e garantia"""
+        n = len(df)
+        regras = self.rules
+
+        porte = df["porte"].astype(str).str.upper().to_numpy() if "porte" in df else np.full(n, "")
+        porte_idx = np.full(n, -1, dtype=np.int64)
+        for k, p in enumerate(PORTES):
+            porte_idx[porte == p] = k
+
+        def numerica(nome, padrao=np.nan):
+            if nome not in df:
+                return np.full(n, padrao, dtype=np.float64)
+            return pd.to_numeric(df[nome], errors="coerce").to_numpy(dtype=np.float64)
+
+        valor = numerica("valor_solicitado")
+        prazo = numerica("prazo")
+        faturamento = numerica("faturamento_mensal")
+        dividas = np.nan_to_num(numerica("dividas_mensais", 0.0), nan=0.0)
+
+        taxa_anual = numerica("taxa_juros_anual")
+        taxa_anual = np.where(np.isnan(taxa_anual), _por_porte(regras["taxa_juros_anual"])[porte_idx], taxa_anual)
+        garantia_pct = numerica("percentual_garantia")
+        garantia_pct = np.where(np.isnan(garantia_pct), _por_porte(regras["percentual_garantia"])[porte_idx], garantia_pct)
+
+        sistema = (df["sistema_amortizacao"].astype(str).str.upper().to_numpy()
+                   if "sistema_amortizacao" in df else np.full(n, "PRICE"))
+        sistema = np.where(sistema == "SAC", "SAC", "PRICE")
+
+        valor_financiado = valor * (1 + float(regras["taxa_concessao"]))
+
+        # Parcela máxima (1ª no SAC, constante no PRICE) só para linhas com dados válidos
+        parcela = np.full(n, np.nan)
+        calculavel = (valor_financiado > 0) & (prazo >= 1) & np.isfinite(taxa_anual) & (taxa_anual >= 0)
+        if calculavel.any():
+            parcelas = calcular_parcelas_lote(
+                valor_financiado[calculavel],
+                juros_anual_para_mensal(taxa_anual[calculavel]),
+                np.round(prazo[calculavel]).astype(np.int64),
+                sistema[calculavel],
+            )
+            parcela[calculavel] = parcelas["primeira_parcela"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            comprometimento = np.where(faturamento > 0, (parcela + dividas) / faturamento, np.inf)
+
+        return {
+            "porte_idx": porte_idx,
+            "valor_solicitado": valor,
+            "prazo": prazo,
+            "faturamento_mensal": faturamento,
+            "parcela": parcela,
+            "comprometimento": comprometimento,
+            "garantia": valor_financiado * garantia_pct,
+        }
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Avalia um bloco de solicitações.
+
+        A folga de alavancagem do fundo é consumida em ordem pelas solicitações
+        aprovadas e, assim como a numeração das linhas sem id, persiste entre
+        chamadas (use reset() para um novo lote).
+
+        Returns:
+            DataFrame com id, decisao, score, motivos, parcela,
+            comprometimento_renda e garantia
+        """
+        n = len(df)
+        cols = self._prepare(df)
+
+        reprovado = np.zeros(n, dtype=bool)
+        score = np.full(n, 100.0)
+        motivos = np.full(n, "", dtype=object)
+
+        for regra in self._compiled:
+            falha = np.asarray(regra.predicate(cols), dtype=bool)
+            if not falha.any():
+                continue
+            motivos[falha] += regra.code + ";"
+            if regra.hard:
+                reprovado |= falha
+            else:
+                score[falha] -= regra.penalty
+
+        # Folga de alavancagem: garantias das aprovadas, em ordem, até o limite do fundo
+        if np.isfinite(self._folga):
+            sem_folga = self._consumir_folga(cols["garantia"], ~reprovado)
+            if sem_folga.any():
+                motivos[sem_folga] += "SEM_FOLGA_ALAVANCAGEM;"
+                reprovado |= sem_folga
+
+        score = np.clip(score, 0.0, 100.0)
+        score[reprovado] = 0.0
+        decisao = np.where(reprovado, REPROVADO,
+                           np.where(score >= float(self.rules["score_aprovacao"]), APROVADO, ANALISE))
+
+        # Sem coluna id, numera as linhas continuando do bloco anterior
+        ids = df["id"].to_numpy() if "id" in df else np.arange(self._linhas, self._linhas + n)
+        self._linhas += n
+        return pd.DataFrame({
+            "id": ids,
+            "decisao": decisao,
+            "score": score,
+            "motivos": [m.rstrip(";") for m in motivos],
+            "parcela": np.round(cols["parcela"], 2),
+            "comprometimento_renda": np.round(np.where(np.isfinite(cols["comprometimento"]),
+                                                       cols["comprometimento"], np.nan), 4),
+            "garantia": np.round(cols["garantia"], 2),
+        })
+
+    def _consumir_folga(self, garantia: np.ndarray, candidatos: np.ndarray) -> np.ndarray:
+        """
+        Consome a folga com as garantias dos candidatos, uma solicitação por vez.
+
+        Uma solicitação que não cabe na folga restante é reprovada e não consome
+        nada, de modo que as seguintes (menores) ainda podem caber; o resultado
+        não depende da divisão em blocos. Retorna a máscara das reprovadas.
+        """
+        sem_folga = np.zeros(len(garantia), dtype=bool)
+        indices = np.flatnonzero(candidatos)
+        folga = self._folga
+        # Subtração na mesma ordem em qualquer divisão em blocos (uma soma vetorizada
+        # arredondaria de forma diferente conforme o tamanho do bloco)
+        for idx, valor in zip(indices.tolist(), garantia[indices].tolist()):
+            if valor <= folga:
+                folga -= valor
+            else:
+                sem_folga[idx] = True
+        self._folga = max(0.0, folga)
+        return sem_folga
+
+    def score_stream(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Avalia uma sequência de blocos, compartilhando a folga do fundo entre eles"""
+        for chunk in chunks:
+            yield self.score(chunk)
+
+    @property
+    def folga_restante(self) -> float:
+        """Folga de alavancagem ainda disponível no fundo"""
+        return float(self._folga)
+
+    def describe(self) -> List[Dict]:
+        """Lista das regras compiladas (código, mensagem, tipo e penalidade)"""
+        return [{"code": r.code, "message": r.message, "hard": r.hard, "penalty": r.penalty}
+                for r in self._compiled] + [{"code": "SEM_FOLGA_ALAVANCAGEM",
+                                              "message": "Garantia excede a folga de alavancagem do fundo",
+                                              "hard": True, "penalty": 0.0}]
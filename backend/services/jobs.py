@@ -0,0 +1,104 @@
+"""
+Execução assíncrona de tarefas longas (simulações pesadas, calibrações).
+
+O cliente recebe um id de job (202 Accepted) e consulta o status até o
+resultado ficar pronto. Os jobs concluídos são mantidos em memória por um
+tempo limitado e, além disso, limitados em quantidade e em bytes de
+resultado: os mais antigos são descartados primeiro.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+class JobRegistry:
+    """Fila de jobs em memória executados por um pool de threads dedicado"""
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 16, ttl_seconds: float = 3600.0,
+                 max_finished: int = 64, max_result_bytes: int = 256 * 1024 * 1024):
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        self.max_result_bytes = max_result_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict] = {}
+
+    def _purge(self, now: float):
+        concluidos = sorted((job for job in self._jobs.values() if job["finished_at"] is not None),
+                            key=lambda job: job["finished_at"])
+        total_bytes = sum(job["result_bytes"] for job in concluidos)
+        for i, job in enumerate(concluidos):
+            restantes = len(concluidos) - i
+            if (now - job["finished_at"] <= self.ttl_seconds and restantes <= self.max_finished
+                    and total_bytes <= self.max_result_bytes):
+                break
+            # Expirado, ou acima dos limites: descarta do mais antigo para o mais novo
+            total_bytes -= job["result_bytes"]
+            del self._jobs[job["id"]]
+
+    def pending_count(self) -> int:
+        """Número de jobs aguardando ou em execução"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def submit(self, fn: Callable[[Callable[[Dict], None]], object], kind: str = "job") -> Optional[str]:
+        """
+        Agenda fn para execução assíncrona.
+
+        fn recebe uma função report(progress: dict) para publicar progresso.
+
+        Returns:
+            Id do job, ou None se o limite de jobs pendentes foi atingido
+        """
+        with self._lock:
+            now = time.time()
+            self._purge(now)
+            pendentes = sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+            if pendentes >= self.max_pending:
+                return None
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "created_at": now,
+                "finished_at": None,
+                "progress": {},
+                "result": None,
+                "result_bytes": 0,
+                "error": None,
+            }
+
+        def report(progress: Dict):
+            with self._lock:
+                self._jobs[job_id]["progress"] = dict(progress)
+
+        def run():
+            with self._lock:
+                self._jobs[job_id]["status"] = "running"
+            try:
+                result = fn(report)
+            except Exception as e:
+                with self._lock:
+                    self._jobs[job_id].update(status="error", error=str(e), finished_at=time.time())
+                    self._purge(time.time())
+            else:
+                # Corpos serializados (simulações) contam no limite de bytes
+                tamanho = len(result) if isinstance(result, (bytes, bytearray)) else 0
+                with self._lock:
+                    self._jobs[job_id].update(status="done", result=result, result_bytes=tamanho,
+                                              finished_at=time.time())
+                    self._purge(time.time())
+
+        self._executor.submit(run)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Retorna uma cópia do estado do job (ou None se não existir)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
@@ -0,0 +1,255 @@
+"""
+Sessões de recálculo ao vivo para a edição do formulário.
+
+O cliente abre uma sessão com os parâmetros iniciais, acompanha os
+resultados por Server-Sent Events e envia apenas os parâmetros alterados
+(deltas). Cada sessão tem uma única simulação em andamento:
+
+  - um delta novo cancela a simulação em andamento (no próximo limite de mês,
+    via o argumento cancel de run_simulation) antes de agendar a nova
+  - deltas que chegam em sequência rápida são agrupados (debounce): só a
+    versão mais recente é calculada
+  - um delta que não muda os parâmetros efetivos da simulação em andamento
+    não a reinicia
+
+O cálculo em si (cache de resultados, admissão, serialização) fica a cargo
+da função compute recebida pelo gerenciador.
+"""
+
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.simulation import SimulationCancelled
+
+
+# (evento, versão, dados): dados são bytes JSON (resultado) ou dict
+Evento = Tuple[str, int, object]
+
+
+class LiveSession:
+    """Estado de uma sessão: últimos parâmetros, versão, simulação em andamento e eventos pendentes"""
+
+    def __init__(self, session_id: str, params: Dict, manager: "LiveSessionManager"):
+        self.id = session_id
+        self.params = params
+        self.version = 0
+        self.last_active = time.time()
+        self._manager = manager
+        self._cond = threading.Condition()
+        self._pending: Optional[Tuple[int, Dict, str]] = None  # (versão, params, chave)
+        self._pending_at = 0.0
+        self._running: Optional[Tuple[int, str, threading.Event]] = None  # (versão, chave, cancel)
+        self._events: List[Evento] = []
+        self._listener = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"submetidas": 0, "calculadas": 0, "canceladas": 0, "reaproveitadas": 0, "erros": 0}
+
+    # -- entrada ------------------------------------------------------------
+
+    def submit(self, params: Dict) -> int:
+        """Agenda o cálculo de params (já mesclados e validados); retorna a versão"""
+        key = self._manager.key_fn(params)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Sessão encerrada")
+            self.version += 1
+            self.params = params
+            self.last_active = time.time()
+            self.stats["submetidas"] += 1
+
+            if self._running is not None and self._running[1] == key and not self._running[2].is_set():
+                # A simulação em andamento (e não cancelada) já calcula estes parâmetros
+                self._pending = None
+                self.stats["reaproveitadas"] += 1
+            else:
+                if self._running is not None:
+                    self._running[2].set()
+                self._pending = (self.version, params, key)
+                self._pending_at = time.monotonic()
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"live-{self.id[:8]}", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return self.version
+
+    def submit_delta(self, delta: Dict, validate: Callable[[Dict], List]) -> Tuple[Optional[int], List]:
+        """
+        Mescla delta aos últimos parâmetros da sessão, valida e agenda o cálculo.
+
+        A mescla acontece sob o lock da sessão, de modo que deltas simultâneos
+        se acumulam em vez de um sobrescrever o outro. Retorna (versão, []) ou
+        (None, erros de validate) sem alterar a sessão.
+        """
+        with self._cond:  # Condition sobre RLock: submit pode readquirir
+            params = {**self.params, **delta}
+            errors = validate(params)
+            if errors:
+                return None, errors
+            return self.submit(params), []
+
+    def cancel(self) -> bool:
+        """Cancela a simulação em andamento e a agendada; retorna se havia algo a cancelar"""
+        with self._cond:
+            havia = self._pending is not None or self._running is not None
+            self._pending = None
+            if self._running is not None:
+                self._running[2].set()
+            self._cond.notify_all()
+            return havia
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            if self._running is not None:
+                self._running[2].set()
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # -- execução -----------------------------------------------------------
+
+    def _run(self):
+        """Thread da sessão: espera o debounce, calcula a versão mais recente e publica o resultado"""
+        debounce = self._manager.debounce_seconds
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    if self._pending is None:
+                        self._cond.wait()
+                        continue
+                    restante = self._pending_at + debounce - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._cond.wait(restante)
+                version, params, key = self._pending
+                self._pending = None
+                cancel = threading.Event()
+                self._running = (version, key, cancel)
+
+            self._publish("executando", version, {"versao": version})
+            desfecho = "erros"
+            try:
+                body = self._manager.compute(params, cancel)
+            except SimulationCancelled as e:
+                desfecho = "canceladas"
+                self._publish("cancelado", version, {"versao": version, "mes": e.mes})
+            except Exception as e:
+                self._publish("erro", version, {"versao": version, "error": str(e)})
+            else:
+                desfecho = "calculadas"
+                self._publish("resultado", version, body)
+            finally:
+                with self._cond:
+                    self._running = None
+                    self.stats[desfecho] += 1
+
+    # -- saída --------------------------------------------------------------
+
+    def _publish(self, evento: str, version: int, dados):
+        with self._cond:
+            if evento == "resultado":
+                # Só o resultado mais recente interessa a um cliente que ainda não leu os anteriores
+                self._events = [e for e in self._events if e[0] != "resultado"]
+            self._events.append((evento, version, dados))
+            self._cond.notify_all()
+
+    def listen(self, heartbeat_seconds: float = 15.0) -> Iterator[Optional[Evento]]:
+        """
+        Eventos da sessão para um único ouvinte (uma nova conexão encerra a anterior).
+
+        Produz None a cada heartbeat_seconds sem eventos, para manter a conexão aberta.
+        """
+        with self._cond:
+            self._listener += 1
+            ouvinte = self._listener
+            self._cond.notify_all()
+        while True:
+            with self._cond:
+                if not self._events and not self._closed and self._listener == ouvinte:
+                    self._cond.wait(heartbeat_seconds)
+                if self._closed or self._listener != ouvinte:
+                    return
+                eventos, self._events = self._events, []
+                self.last_active = time.time()
+            if not eventos:
+                yield None
+            for evento in eventos:
+                yield evento
+
+    def info(self) -> Dict:
+        with self._cond:
+            return {
+                "session_id": self.id,
+                "versao": self.version,
+                "executando": self._running[0] if self._running is not None else None,
+                "agendada": self._pending[0] if self._pending is not None else None,
+                "stats": dict(self.stats),
+            }
+
+
+class LiveSessionManager:
+    """Sessões ao vivo em memória, com limite de sessões e expiração por inatividade"""
+
+    def __init__(self, compute: Callable[[Dict, threading.Event], bytes], key_fn: Callable[[Dict], str],
+                 debounce_seconds: float = 0.25, max_sessions: int = 32, ttl_seconds: float = 900.0):
+        self.compute = compute
+        self.key_fn = key_fn
+        self.debounce_seconds = debounce_seconds
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, LiveSession] = {}
+        # Contadores acumulados das sessões já encerradas
+        self._encerradas = {"submetidas": 0, "calculadas": 0, "canceladas": 0, "reaproveitadas": 0, "erros": 0}
+
+    def _encerrar(self, session: LiveSession):
+        session.close()
+        for nome, valor in session.info()["stats"].items():
+            self._encerradas[nome] += valor
+
+    def _purge(self, now: float):
+        expiradas = [s for s in self._sessions.values() if now - s.last_active > self.ttl_seconds]
+        for session in expiradas:
+            self._encerrar(session)
+            del self._sessions[session.id]
+
+    def create(self, params: Dict) -> Optional[LiveSession]:
+        """Abre uma sessão (None se o limite de sessões foi atingido)"""
+        with self._lock:
+            self._purge(time.time())
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            session = LiveSession(uuid.uuid4().hex, params, self)
+            self._sessions[session.id] = session
+            return session
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._encerrar(session)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sessoes = list(self._sessions.values())
+            totais = dict(self._encerradas)
+        for session in sessoes:
+            for nome, valor in session.info()["stats"].items():
+                totais[nome] += valor
+        return {"sessoes": len(sessoes), "max_sessions": self.max_sessions,
+                "debounce_seconds": self.debounce_seconds, **totais}
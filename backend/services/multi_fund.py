@@ -0,0 +1,219 @@
+"""
+Simulação consolidada de vários fundos garantidores em uma única execução.
+
+Cada fundo roda em um processo separado com uma subsequência aleatória
+independente derivada de uma semente mestre. Apenas as séries mensais
+(carteira e fundo) voltam dos processos: a tabela de operações de cada fundo
+é descartada no próprio worker, e o consolidado é montado somando as colunas
+aditivas e recalculando os índices a partir delas.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.simulation import get_default_params, run_simulation, build_resumo
+from utils.processes import process_context
+
+
+# Colunas de df_carteira que podem ser somadas entre fundos mês a mês
+COLUNAS_ADITIVAS_CARTEIRA = [
+    "operacoes_ativas",
+    "operacoes_inadimplentes_novas",
+    "operacoes_realizadas_acum",
+    "desembolso_mes",
+    "desembolso_acum",
+    "saldo_devedor_carteira",
+    "valor_garantido_mes",
+    "valor_garantido_acum",
+    "valor_honrado_mes",
+    "valor_recuperado_mes",
+    "honras_acumuladas",
+    "recuperacoes_acumuladas",
+    "avais_concedidos_mes",
+    "avais_concedidos_janela_60m",
+    "operacoes_novas_mes",
+    "quitadas_mes",
+    "parcelas_recebidas_mes",
+    "saldo_fundo_antes_honra",
+    "saldo_fundo_depois_honra",
+    "limite_operacional",
+]
+
+# Colunas de df_fundo que podem ser somadas entre fundos mês a mês
+COLUNAS_ADITIVAS_FUNDO = [
+    "aporte",
+    "rendimento",
+    "pagamentos_honra",
+    "recuperacoes",
+    "saldo_final",
+    "saldo_garantido",
+    "limite_operacional",
+]
+
+JANELA_SGC_MESES = 60
+
+# Limite de fundos por execução (cada fundo é uma simulação completa)
+MAX_FUNDOS = 16
+
+
+def derivar_sementes(master_seed: int, n_fundos: int) -> List[int]:
+    """
+    Deriva uma semente independente por fundo a partir da semente mestre.
+
+    Usa SeedSequence.spawn, que garante subsequências estatisticamente
+    independentes e reprodutíveis para a mesma semente mestre.
+    """
+    filhos = np.random.SeedSequence(int(master_seed)).spawn(n_fundos)
+    return [int(filho.generate_state(1)[0]) for filho in filhos]
+
+
+def montar_params_fundos(fundos: List[Dict], parametros_comuns: Optional[Dict] = None,
+                         master_seed: int = 42) -> List[Dict]:
+    """
+    Mescla padrões, parâmetros comuns e parâmetros de cada fundo.
+
+    Todos os fundos precisam compartilhar o mesmo horizonte e ano inicial,
+    pois o consolidado é montado mês a mês.
+    """
+    if not fundos:
+        raise ValueError("Informe ao menos um fundo em 'fundos'.")
+    if len(fundos) > MAX_FUNDOS:
+        raise ValueError(f"No máximo {MAX_FUNDOS} fundos por simulação.")
+
+    sementes = derivar_sementes(master_seed, len(fundos))
+    params_fundos = []
+    for idx, (fundo, semente) in enumerate(zip(fundos, sementes)):
+        params = get_default_params()
+        params.update(parametros_comuns or {})
+        params.update({k: v for k, v in fundo.items() if k != "nome"})
+        params["random_seed"] = semente
+        params["nome"] = str(fundo.get("nome") or f"Fundo {idx + 1}")
+        params_fundos.append(params)
+
+    horizontes = {(int(p["simulation_months"]), int(p.get("start_year", 2026))) for p in params_fundos}
+    if len(horizontes) > 1:
+        raise ValueError("Todos os fundos devem usar o mesmo 'simulation_months' e 'start_year'.")
+
+    return params_fundos
+
+
+def _simular_fundo(params: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Executa a simulação de um fundo no worker e devolve só as séries mensais"""
+    df_carteira, df_fundo, df_operacoes = run_simulation(params)
+    # A tabela de operações não sai do processo: o consolidado não precisa dela
+    del df_operacoes
+    return df_carteira, df_fundo
+
+
+def consolidar_carteiras(carteiras: List[pd.DataFrame]) -> pd.DataFrame:
+    """Soma as carteiras mensais dos fundos e recalcula os índices derivados"""
+    base = carteiras[0]
+    consolidado = pd.DataFrame({"mes": base["mes"].to_numpy()})
+    for col in COLUNAS_ADITIVAS_CARTEIRA:
+        consolidado[col] = np.sum([df[col].to_numpy() for df in carteiras], axis=0)
+
+    novas = consolidado["operacoes_novas_mes"].to_numpy()
+    desembolso_mes = consolidado["desembolso_mes"].to_numpy()
+    desembolso_acum = consolidado["desembolso_acum"].to_numpy()
+    realizadas_acum = consolidado["operacoes_realizadas_acum"].to_numpy()
+    saldo_devedor = consolidado["saldo_devedor_carteira"].to_numpy()
+    valor_garantido = consolidado["valor_garantido_mes"].to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ticket_medio_mes = np.where(novas > 0, desembolso_mes / np.maximum(novas, 1), 0.0)
+
+        # Inadimplência por quantidade: inadimplências materializadas / operações contratadas
+        inad_acum = consolidado["operacoes_inadimplentes_novas"].cumsum().to_numpy()
+        taxa_qtd = np.where(realizadas_acum > 0, inad_acum / np.maximum(realizadas_acum, 1), 0.0)
+
+        # Inadimplência por valor: média das taxas dos fundos ponderada pelo valor contratado
+        saldo_inad = np.sum([df["taxa_inadimplencia_valor"].to_numpy() * df["desembolso_acum"].to_numpy()
+                             for df in carteiras], axis=0)
+        taxa_valor = np.where(desembolso_acum > 0, saldo_inad / np.where(desembolso_acum > 0, desembolso_acum, 1), 0.0)
+
+        # Índice SGC: (honras - recuperações) / avais concedidos na janela de 60 meses
+        honras_janela = consolidado["valor_honrado_mes"].rolling(JANELA_SGC_MESES, min_periods=1).sum().to_numpy()
+        recuperacoes_janela = consolidado["valor_recuperado_mes"].rolling(JANELA_SGC_MESES, min_periods=1).sum().to_numpy()
+        avais_janela = consolidado["avais_concedidos_janela_60m"].to_numpy()
+        indice_sgc = np.where(avais_janela > 0, (honras_janela - recuperacoes_janela) / np.where(avais_janela > 0, avais_janela, 1), 0.0)
+
+        percentual_garantia_real = np.where(saldo_devedor > 0, valor_garantido / np.where(saldo_devedor > 0, saldo_devedor, 1), 0.0)
+
+    consolidado["ticket_medio_mes"] = np.round(ticket_medio_mes, 2)
+    consolidado["taxa_inadimplencia_qtd"] = np.round(taxa_qtd, 4)
+    consolidado["taxa_inadimplencia_valor"] = np.round(taxa_valor, 4)
+    consolidado["indice_sgc"] = np.round(indice_sgc, 4)
+    consolidado["percentual_garantia_real"] = np.round(percentual_garantia_real, 4)
+    consolidado["paused"] = np.any([df["paused"].to_numpy() for df in carteiras], axis=0)
+
+    # Mantém a mesma ordem de colunas das carteiras individuais
+    return consolidado[list(base.columns)]
+
+
+def consolidar_fundos(fundos: List[pd.DataFrame]) -> pd.DataFrame:
+    """Soma os fluxos e saldos mensais dos fundos e recalcula a alavancagem"""
+    base = fundos[0]
+    consolidado = pd.DataFrame({"mes": base["mes"].to_numpy()})
+    for col in COLUNAS_ADITIVAS_FUNDO:
+        consolidado[col] = np.round(np.sum([df[col].to_numpy() for df in fundos], axis=0), 2)
+
+    saldo_final = consolidado["saldo_final"].to_numpy()
+    saldo_garantido = consolidado["saldo_garantido"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alavancagem = np.where(saldo_final > 0, saldo_garantido / np.where(saldo_final > 0, saldo_final, 1), 0.0)
+    consolidado["alavancagem_real"] = np.round(alavancagem, 4)
+
+    return consolidado[list(base.columns)]
+
+
+def run_multi_fund_simulation(fundos: List[Dict], parametros_comuns: Optional[Dict] = None,
+                              master_seed: int = 42, max_workers: Optional[int] = None) -> Dict:
+    """
+    Executa a simulação de vários fundos em paralelo e consolida os resultados.
+
+    Args:
+        fundos: Lista de parâmetros por fundo (cada item pode ter um 'nome')
+        parametros_comuns: Parâmetros aplicados a todos os fundos antes dos específicos
+        master_seed: Semente mestre da qual derivam as sementes de cada fundo
+        max_workers: Número máximo de processos (padrão e teto: min(fundos, CPUs))
+
+    Returns:
+        Dicionário com 'fundos' (nome, params, carteira, fundo, resumo por fundo)
+        e 'consolidado' (carteira, fundo e resumo do grupo)
+    """
+    params_fundos = montar_params_fundos(fundos, parametros_comuns, master_seed)
+
+    teto = min(len(params_fundos), os.cpu_count() or 1)
+    max_workers = teto if max_workers is None else max(1, min(int(max_workers), teto))
+
+    if max_workers == 1 or len(params_fundos) == 1:
+        resultados = [_simular_fundo(params) for params in params_fundos]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=process_context()) as executor:
+            resultados = list(executor.map(_simular_fundo, params_fundos))
+
+    por_fundo = []
+    for params, (df_carteira, df_fundo) in zip(params_fundos, resultados):
+        por_fundo.append({
+            "nome": params["nome"],
+            "random_seed": params["random_seed"],
+            "carteira": df_carteira,
+            "fundo": df_fundo,
+            "resumo": build_resumo(df_carteira, df_fundo),
+        })
+
+    df_carteira_grupo = consolidar_carteiras([r["carteira"] for r in por_fundo])
+    df_fundo_grupo = consolidar_fundos([r["fundo"] for r in por_fundo])
+
+    return {
+        "fundos": por_fundo,
+        "consolidado": {
+            "carteira": df_carteira_grupo,
+            "fundo": df_fundo_grupo,
+            "resumo": build_resumo(df_carteira_grupo, df_fundo_grupo),
+        },
+    }
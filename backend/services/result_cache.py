@@ -0,0 +1,124 @@
+"""
+Cache em memória (LRU, limitado por bytes) dos resultados de simulação já
+serializados, indexado pela chave canônica dos parâmetros.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ResultCache:
+    """LRU de respostas serializadas com limite total em bytes"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retorna {'body', 'created_at'} ou None, marcando a entrada como recente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: str, body: bytes) -> Dict:
+        """Armazena o corpo serializado, descartando as entradas mais antigas se preciso"""
+        entry = {"body": body, "created_at": time.time()}
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            anterior = self._entries.pop(key, None)
+            if anterior is not None:
+                self._bytes -= len(anterior["body"])
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and self._entries:
+                _, removida = self._entries.popitem(last=False)
+                self._bytes -= len(removida["body"])
+        return entry
+
+    def stats(self) -> Dict:
+        """Ocupação e taxa de acerto do cache"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+def _tamanho_tabela(tabela: Dict) -> int:
+    """Estimativa de memória de uma tabela colunar (arrays NumPy ou listas)"""
+    total = 0
+    for coluna in tabela["data"].values():
+        nbytes = getattr(coluna, "nbytes", None)
+        # Listas de objetos Python: ~64 bytes por valor (ponteiro + objeto pequeno)
+        total += nbytes if nbytes is not None else 64 * len(coluna)
+    return total
+
+
+class TableCache:
+    """
+    LRU das tabelas colunares de resultados recentes, limitado por bytes.
+
+    Permite servir páginas de tabelas grandes (operações) sob demanda, em vez
+    de enviá-las inteiras na resposta da simulação.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._bytes = 0
+
+    def put(self, key: str, nome: str, tabela: Dict):
+        """Armazena a tabela colunar (saída de dataframe_to_columns) do resultado key"""
+        tamanho = _tamanho_tabela(tabela)
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entries.pop((key, nome), None)
+            if anterior is not None:
+                self._bytes -= anterior["bytes"]
+            self._entries[(key, nome)] = {"tabela": tabela, "bytes": tamanho}
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes and self._entries:
+                _, removida = self._entries.popitem(last=False)
+                self._bytes -= removida["bytes"]
+
+    def contains(self, key: str, nome: str) -> bool:
+        with self._lock:
+            return (key, nome) in self._entries
+
+    def page(self, key: str, nome: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Dict]:
+        """Fatia [offset, offset + limit) da tabela (None se não estiver em cache)"""
+        with self._lock:
+            entry = self._entries.get((key, nome))
+            if entry is None:
+                return None
+            self._entries.move_to_end((key, nome))
+        tabela = entry["tabela"]
+        inicio = max(0, int(offset))
+        fim = tabela["length"] if limit is None else min(tabela["length"], inicio + max(0, int(limit)))
+        return {
+            "columns": tabela["columns"],
+            "length": tabela["length"],
+            "offset": inicio,
+            "data": {col: valores[inicio:fim] for col, valores in tabela["data"].items()},
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,292 @@
+"""
+Histórico persistente de simulações em SQLite.
+
+Cada execução de /simulate é gravada com o hash canônico dos parâmetros, os
+parâmetros, os KPIs do resumo (em colunas indexadas) e as séries mensais de
+carteira e fundo em formato colunar comprimido, além do cubo porte × safra ×
+mês (services.cube). Séries e cubos ficam em tabelas separadas, de modo que
+consultas por KPI percorrem apenas linhas pequenas e nunca leem os blobs.
+
+Parâmetros idênticos (mesmo hash) atualizam a execução existente em vez de
+duplicá-la. Políticas de retenção (quantidade, idade e tamanho) e a
+compactação incremental mantêm o arquivo limitado.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from services.cube import ResultCube
+from services.serialization import dataframe_to_columns, dumps, loads
+from utils.db import SQLitePool
+
+
+# KPIs de build_resumo gravados como colunas (ordem e filtros permitidos)
+KPI_COLUMNS = {
+    "saldo_final_fundo": "REAL",
+    "total_operacoes": "INTEGER",
+    "honras_acumuladas": "REAL",
+    "recuperacoes_acumuladas": "REAL",
+    "desembolso_acumulado": "REAL",
+    "ticket_medio": "REAL",
+    "meses_restricoes_operacionais": "INTEGER",
+    "indice_sgc": "REAL",
+    "taxa_inadimplencia_qtd": "REAL",
+    "taxa_inadimplencia_valor": "REAL",
+    "operacoes_inadimplentes": "INTEGER",
+}
+
+# KPIs mais usados em filtros e ordenações ganham índice próprio
+INDEXED_KPIS = ("saldo_final_fundo", "indice_sgc", "taxa_inadimplencia_valor",
+                "total_operacoes", "desembolso_acumulado")
+
+ORDER_COLUMNS = ("id", "created_at", "last_run_at") + tuple(KPI_COLUMNS)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " params_hash TEXT NOT NULL UNIQUE,"
+    " created_at REAL NOT NULL,"
+    " last_run_at REAL NOT NULL,"
+    " run_count INTEGER NOT NULL DEFAULT 1,"
+    " series_bytes INTEGER NOT NULL,"
+    " params TEXT NOT NULL,"
+    + "".join(f" {nome} {tipo}," for nome, tipo in KPI_COLUMNS.items()) +
+    " resumo TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS run_series ("
+    " run_id INTEGER PRIMARY KEY,"
+    " carteira BLOB NOT NULL,"
+    " fundo BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS run_cubes ("
+    " run_id INTEGER PRIMARY KEY,"
+    " data BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_last_run_at ON runs (last_run_at)",
+] + [f"CREATE INDEX IF NOT EXISTS idx_runs_{kpi} ON runs ({kpi})" for kpi in INDEXED_KPIS]
+
+SUMMARY_COLUMNS = "id, params_hash, created_at, last_run_at, run_count, " + ", ".join(KPI_COLUMNS)
+
+MAX_PAGE_SIZE = 1_000
+
+
+def _compress(df: pd.DataFrame) -> bytes:
+    return zlib.compress(dumps(dataframe_to_columns(df)), 6)
+
+
+def _summary(row) -> Dict:
+    return {chave: row[chave] for chave in row.keys()}
+
+
+class RunStore:
+    """Repositório do histórico de simulações sobre um pool SQLite"""
+
+    def __init__(self, path: str, max_runs: int = 5_000, max_age_days: float = 90.0,
+                 max_mb: float = 500.0, retention_every: int = 20, pool_size: int = 4):
+        self.path = path
+        self.max_runs = int(max_runs)
+        self.max_age_days = float(max_age_days)
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        self.retention_every = max(1, int(retention_every))
+        self.pool = SQLitePool(path, size=pool_size)
+        self._saves = 0
+        self._lock = threading.Lock()
+        with self.pool.connection() as conn:
+            # Em bancos novos, liga o auto_vacuum incremental (só vale após um VACUUM):
+            # permite devolver páginas livres ao sistema sem reescrever o arquivo
+            novo = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'runs'").fetchone() is None
+            if novo and conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+        with self.pool.transaction() as conn:
+            for ddl in SCHEMA:
+                conn.execute(ddl)
+
+    @classmethod
+    def from_env(cls) -> Optional["RunStore"]:
+        """Cria o repositório a partir de RUN_STORE_* (opcional: sem RUN_STORE_DB não há histórico)"""
+        path = os.environ.get("RUN_STORE_DB", "")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_runs=int(os.environ.get("RUN_STORE_MAX_RUNS", 5_000)),
+            max_age_days=float(os.environ.get("RUN_STORE_MAX_AGE_DAYS", 90)),
+            max_mb=float(os.environ.get("RUN_STORE_MAX_MB", 500)),
+        )
+
+    def save(self, params_hash: str, params: Dict, resumo: Dict,
+             df_carteira: pd.DataFrame, df_fundo: pd.DataFrame,
+             cubo: Optional[ResultCube] = None) -> int:
+        """Grava (ou atualiza, se o hash já existir) uma execução e retorna seu id"""
+        now = time.time()
+        carteira = _compress(df_carteira)
+        fundo = _compress(df_fundo)
+        cubo_blob = cubo.to_bytes() if cubo is not None else None
+        kpis = [resumo.get(nome) for nome in KPI_COLUMNS]
+        colunas = ", ".join(KPI_COLUMNS)
+        marcadores = ", ".join("?" * len(KPI_COLUMNS))
+        atualizacao = ", ".join(f"{nome} = excluded.{nome}" for nome in KPI_COLUMNS)
+
+        with self.pool.transaction() as conn:
+            conn.execute(
+                f"INSERT INTO runs (params_hash, created_at, last_run_at, series_bytes, params, resumo, {colunas})"
+                f" VALUES (?, ?, ?, ?, ?, ?, {marcadores})"
+                " ON CONFLICT (params_hash) DO UPDATE SET"
+                " last_run_at = excluded.last_run_at, run_count = run_count + 1,"
+                f" series_bytes = excluded.series_bytes, resumo = excluded.resumo, {atualizacao}",
+                [params_hash, now, now, len(carteira) + len(fundo) + len(cubo_blob or b""),
+                 json.dumps(params, sort_keys=True, default=str), json.dumps(resumo)] + kpis,
+            )
+            run_id = conn.execute("SELECT id FROM runs WHERE params_hash = ?", (params_hash,)).fetchone()[0]
+            conn.execute("INSERT OR REPLACE INTO run_series (run_id, carteira, fundo) VALUES (?, ?, ?)",
+                         (run_id, carteira, fundo))
+            if cubo_blob is not None:
+                conn.execute("INSERT OR REPLACE INTO run_cubes (run_id, data) VALUES (?, ?)", (run_id, cubo_blob))
+            else:
+                conn.execute("DELETE FROM run_cubes WHERE run_id = ?", (run_id,))
+
+        with self._lock:
+            self._saves += 1
+            aplicar = self._saves % self.retention_every == 0
+        if aplicar:
+            self.apply_retention()
+        return run_id
+
+    def query(self, order_by: str = "created_at", descending: bool = True, limit: int = 20,
+              filters: Optional[List[tuple]] = None, include_params: bool = False) -> List[Dict]:
+        """
+        Consulta execuções pelos KPIs, sem ler as séries.
+
+        filters: [(coluna, operador, valor), ...] com operador em <, <=, >, >=, =;
+        colunas aceitas: KPIs, id, created_at, last_run_at e params_hash (só '=').
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Ordenação inválida: {order_by!r}. Use uma de {', '.join(ORDER_COLUMNS)}.")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        condicoes, valores = [], []
+        for coluna, operador, valor in filters or []:
+            if coluna == "params_hash" and operador == "=":
+                condicoes.append("params_hash = ?")
+                valores.append(str(valor))
+                continue
+            if coluna not in ORDER_COLUMNS or operador not in ("<", "<=", ">", ">=", "="):
+                raise ValueError(f"Filtro inválido: {coluna} {operador}.")
+            condicoes.append(f"{coluna} {operador} ?")
+            valores.append(float(valor))
+
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        colunas = SUMMARY_COLUMNS + (", params" if include_params else "")
+        sql = (f"SELECT {colunas} FROM runs {onde} "
+               f"ORDER BY {order_by} {'DESC' if descending else 'ASC'}, id DESC LIMIT ?")
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, valores + [limit]).fetchall()
+
+        items = [_summary(row) for row in rows]
+        if include_params:
+            for item in items:
+                item["params"] = json.loads(item["params"])
+        return items
+
+    def get(self, run_id: int, include_series: bool = True) -> Optional[Dict]:
+        """Execução completa: parâmetros, resumo e (opcionalmente) séries colunares"""
+        with self.pool.connection() as conn:
+            row = conn.execute(f"SELECT {SUMMARY_COLUMNS}, params, resumo FROM runs WHERE id = ?",
+                               (int(run_id),)).fetchone()
+            if row is None:
+                return None
+            series = None
+            if include_series:
+                series = conn.execute("SELECT carteira, fundo FROM run_series WHERE run_id = ?",
+                                      (int(run_id),)).fetchone()
+
+        run = _summary(row)
+        run["params"] = json.loads(run["params"])
+        run["resumo"] = json.loads(run["resumo"])
+        if series is not None:
+            run["carteira"] = loads(zlib.decompress(series["carteira"]))
+            run["fundo"] = loads(zlib.decompress(series["fundo"]))
+        return run
+
+    def get_cube(self, run_id: int) -> Optional[ResultCube]:
+        """Cubo porte × safra × mês da execução (None se não houver)"""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM run_cubes WHERE run_id = ?", (int(run_id),)).fetchone()
+        return ResultCube.from_bytes(row["data"]) if row is not None else None
+
+    def delete(self, run_id: int) -> bool:
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM run_series WHERE run_id = ?", (int(run_id),))
+            conn.execute("DELETE FROM run_cubes WHERE run_id = ?", (int(run_id),))
+            cur = conn.execute("DELETE FROM runs WHERE id = ?", (int(run_id),))
+        return cur.rowcount > 0
+
+    def _delete_where(self, conn, condicao: str, valores) -> int:
+        conn.execute(f"DELETE FROM run_series WHERE run_id IN (SELECT id FROM runs WHERE {condicao})", valores)
+        conn.execute(f"DELETE FROM run_cubes WHERE run_id IN (SELECT id FROM runs WHERE {condicao})", valores)
+        return conn.execute(f"DELETE FROM runs WHERE {condicao}", valores).rowcount
+
+    def apply_retention(self) -> Dict:
+        """
+        Remove as execuções mais antigas (por last_run_at) que excedem idade,
+        quantidade máxima ou tamanho total das séries.
+        """
+        removidas = {"idade": 0, "quantidade": 0, "tamanho": 0}
+        with self.pool.transaction() as conn:
+            if self.max_age_days > 0:
+                limite = time.time() - self.max_age_days * 86400
+                removidas["idade"] = self._delete_where(conn, "last_run_at < ?", (limite,))
+
+            if self.max_runs > 0:
+                removidas["quantidade"] = self._delete_where(
+                    conn, "id IN (SELECT id FROM runs ORDER BY last_run_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_runs,))
+
+            if self.max_bytes > 0:
+                total = conn.execute("SELECT COALESCE(SUM(series_bytes), 0) FROM runs").fetchone()[0]
+                if total > self.max_bytes:
+                    # Mantém as mais recentes cujo tamanho acumulado cabe no limite
+                    removidas["tamanho"] = self._delete_where(
+                        conn,
+                        "id IN (SELECT id FROM (SELECT id, SUM(series_bytes) OVER"
+                        " (ORDER BY last_run_at DESC, id DESC) AS acumulado FROM runs) WHERE acumulado > ?)",
+                        (self.max_bytes,))
+        return removidas
+
+    def compact(self, full: bool = False) -> Dict:
+        """
+        Aplica a retenção e devolve ao sistema as páginas livres do arquivo.
+
+        full=True executa VACUUM completo (reescreve o arquivo; bloqueia escritas).
+        """
+        removidas = self.apply_retention()
+        antes = self.file_size()
+        with self.pool.connection() as conn:
+            if full:
+                conn.execute("VACUUM")
+            else:
+                conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"removidas": removidas, "bytes_antes": antes, "bytes_depois": self.file_size()}
+
+    def file_size(self) -> int:
+        return sum(os.path.getsize(self.path + sufixo)
+                   for sufixo in ("", "-wal") if os.path.exists(self.path + sufixo))
+
+    def stats(self) -> Dict:
+        with self.pool.connection() as conn:
+            runs, series_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(series_bytes), 0) FROM runs").fetchone()
+        return {
+            "runs": runs,
+            "series_bytes": series_bytes,
+            "file_bytes": self.file_size(),
+            "max_runs": self.max_runs,
+            "max_age_days": self.max_age_days,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,76 @@
+"""
+Serialização JSON orientada a colunas para os resultados da simulação.
+
+Em vez de uma lista de dicts (uma por linha, repetindo os nomes das colunas),
+cada tabela vira {"columns": [...], "data": {coluna: [valores]}}, montada
+diretamente dos arrays NumPy do DataFrame. Com orjson instalado, os arrays
+numéricos são serializados nativamente, sem conversão para objetos Python;
+sem orjson, usa o módulo json da biblioteca padrão.
+"""
+
+import json
+import math
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+# Tipos que o orjson serializa nativamente com OPT_SERIALIZE_NUMPY
+_NUMPY_NATIVOS = ("f", "i", "u", "b")
+
+
+def _coluna(serie: pd.Series):
+    """Converte uma coluna para array NumPy (numérica) ou lista (demais tipos)"""
+    valores = serie.to_numpy()
+    if valores.dtype.kind in _NUMPY_NATIVOS:
+        if valores.dtype.kind == "f" and valores.dtype != np.float64:
+            valores = valores.astype(np.float64)
+        elif valores.dtype.kind in ("i", "u") and valores.dtype != np.int64:
+            valores = valores.astype(np.int64)
+        return np.ascontiguousarray(valores)
+    # Colunas de objetos (texto ou mistas): NaN vira None
+    return [None if isinstance(v, float) and math.isnan(v) else v for v in valores.tolist()]
+
+
+def dataframe_to_columns(df: pd.DataFrame) -> Dict:
+    """Monta a representação orientada a colunas de um DataFrame"""
+    colunas = [str(col) for col in df.columns]
+    return {
+        "columns": colunas,
+        "length": int(len(df)),
+        "data": {nome: _coluna(df[col]) for nome, col in zip(colunas, df.columns)},
+    }
+
+
+def _default_stdlib(obj):
+    """Conversão de arrays e escalares NumPy para o encoder da biblioteca padrão"""
+    if isinstance(obj, np.ndarray):
+        if obj.ndim > 1:
+            return [_default_stdlib(linha) for linha in obj]
+        if obj.dtype.kind == "f":
+            return [None if math.isnan(v) else v for v in obj.tolist()]
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def dumps(payload) -> bytes:
+    """Serializa o payload em bytes JSON (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default_stdlib, allow_nan=False,
+                      separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes):
+    """Desserializa bytes JSON (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
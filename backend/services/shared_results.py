@@ -0,0 +1,249 @@
+"""
+Entrega dos resultados de simulações executadas em processos separados por
+memória compartilhada (multiprocessing.shared_memory), sem pickle.
+
+No processo de trabalho, as tabelas já em formato colunar (saída de
+dataframe_to_columns) e os arrays auxiliares (cubo) são gravados em um único
+bloco de memória compartilhada; volta para o processo web apenas um
+descritor pequeno (nome do bloco, offsets, dtypes).
+
+No processo web, o bloco é mapeado e cada coluna numérica vira um array
+NumPy apontando direto para a memória compartilhada (sem cópia), que o
+encoder JSON serializa diretamente. Colunas de texto ou mistas são gravadas
+como JSON pelo worker e decodificadas no processo web.
+
+Limpeza por contagem de referências: o nome do bloco é removido logo após o
+mapeamento e, quando o último array que aponta para ela deixa de ser
+referenciado (resposta serializada, entrada do cache de tabelas descartada
+etc.), um finalizador fecha o SharedMemory explicitamente, liberando o
+mapeamento.
+
+Até ser mapeado, o bloco fica registrado no resource tracker do processo
+web (os workers iniciados com forkserver ou spawn usam o mesmo): se o
+processo web morrer antes de importá-lo, o tracker o remove. Um resultado
+que falha na importação ou cujo future foi abandonado é removido pelo nome.
+"""
+
+import threading
+import weakref
+from concurrent.futures import Executor, Future
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.cube import ResultCube
+from services.serialization import dataframe_to_columns, dumps, loads
+from services.simulation import run_simulation
+
+
+ALINHAMENTO = 64  # bytes; mantém os arrays alinhados para leitura direta
+
+_lock = threading.Lock()
+_estatisticas = {"blocos_ativos": 0, "bytes_ativos": 0, "blocos_importados": 0}
+
+
+def _alinhar(offset: int) -> int:
+    return -(-offset // ALINHAMENTO) * ALINHAMENTO
+
+
+def _remover(nome: str):
+    """Remove pelo nome um bloco que não será importado"""
+    try:
+        shm = shared_memory.SharedMemory(name=nome)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _descartar(futuro: Future):
+    """Callback de um future abandonado: remove o bloco quando o worker terminar de exportá-lo"""
+    if not futuro.cancelled() and futuro.exception() is None:
+        _remover(futuro.result()["nome"])
+
+
+def exportar_resultado(tabelas: Dict[str, Dict], arrays: Dict[str, np.ndarray]) -> Dict:
+    """
+    Grava tabelas colunares e arrays em um bloco de memória compartilhada (lado do worker).
+
+    Args:
+        tabelas: {nome: saída de dataframe_to_columns}
+        arrays: {nome: ndarray numérico}
+
+    Returns:
+        Descritor serializável do bloco, para ResultadoCompartilhado
+    """
+    partes = []  # (offset, array ou bytes)
+    offset = 0
+
+    def reservar(dados, nbytes):
+        nonlocal offset
+        inicio = offset
+        partes.append((inicio, dados))
+        offset = _alinhar(inicio + nbytes)
+        return inicio
+
+    descritor = {"tabelas": {}, "arrays": {}}
+    for nome, tabela in tabelas.items():
+        colunas = {}
+        for coluna, valores in tabela["data"].items():
+            if isinstance(valores, np.ndarray):
+                valores = np.ascontiguousarray(valores)
+                colunas[coluna] = {"tipo": "array", "dtype": valores.dtype.str, "shape": list(valores.shape),
+                                   "offset": reservar(valores, valores.nbytes)}
+            else:
+                # Texto ou valores mistos: JSON pronto
+                texto = dumps(valores)
+                colunas[coluna] = {"tipo": "json", "nbytes": len(texto),
+                                   "offset": reservar(texto, len(texto))}
+        descritor["tabelas"][nome] = {"columns": tabela["columns"], "length": tabela["length"],
+                                      "colunas": colunas}
+    for nome, valores in arrays.items():
+        valores = np.ascontiguousarray(valores)
+        descritor["arrays"][nome] = {"dtype": valores.dtype.str, "shape": list(valores.shape),
+                                     "offset": reservar(valores, valores.nbytes)}
+
+    # Registrado no resource tracker compartilhado com o processo web, que o desregistra ao importar
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    try:
+        for inicio, dados in partes:
+            if isinstance(dados, np.ndarray):
+                destino = np.ndarray(dados.shape, dtype=dados.dtype, buffer=shm.buf, offset=inicio)
+                destino[...] = dados
+                del destino
+            else:
+                shm.buf[inicio:inicio + len(dados)] = dados
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    descritor["nome"] = shm.name
+    descritor["tamanho"] = offset
+    shm.close()
+    return descritor
+
+
+def _fechar(shm: shared_memory.SharedMemory, tamanho: int):
+    """Fecha o mapeamento do bloco (nenhum array aponta mais para ele)"""
+    shm.close()
+    with _lock:
+        _estatisticas["blocos_ativos"] -= 1
+        _estatisticas["bytes_ativos"] -= tamanho
+
+
+class _Mapeamento:
+    """
+    Base comum dos arrays de um bloco importado.
+
+    Os arrays criados por view() referenciam este objeto (via
+    __array_interface__, com o endereço bruto do bloco) e o mantêm vivo;
+    quando o último deles é coletado, o finalizador chama shm.close()
+    explicitamente, em vez de depender do __del__ do SharedMemory.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, tamanho: int):
+        bytes_ = np.frombuffer(shm.buf, dtype=np.uint8, count=tamanho)
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": (tamanho,),
+            "typestr": "|u1",
+            "data": (bytes_.ctypes.data, False),
+        }
+        # Não mantém exportações do buffer (SharedMemory.close exige nenhuma ativa) nem
+        # arrays próprios: um ciclo objeto -> array -> objeto não seria coletado
+        del bytes_
+        # O finalizador (e não este objeto) guarda o SharedMemory: nada mais o fecha antes
+        self._finalizador = weakref.finalize(self, _fechar, shm, tamanho)
+
+    @property
+    def aberto(self) -> bool:
+        return self._finalizador.alive
+
+    def view(self, dtype: str, shape, offset: int) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        return np.asarray(self)[offset:offset + nbytes].view(dtype).reshape(shape)
+
+    def texto(self, offset: int, nbytes: int) -> bytes:
+        return np.asarray(self)[offset:offset + nbytes].tobytes()
+
+
+class ResultadoCompartilhado:
+    """Resultado importado de um bloco de memória compartilhada (lado do processo web)"""
+
+    def __init__(self, descritor: Dict):
+        self.descritor = descritor
+        shm = shared_memory.SharedMemory(name=descritor["nome"])
+        # O nome sai do sistema imediatamente: a memória vive só enquanto estiver mapeada
+        shm.unlink()
+        tamanho = max(int(descritor["tamanho"]), 1)
+        with _lock:
+            _estatisticas["blocos_ativos"] += 1
+            _estatisticas["bytes_ativos"] += tamanho
+            _estatisticas["blocos_importados"] += 1
+        self._mapa = _Mapeamento(shm, tamanho)
+
+    def tabela(self, nome: str) -> Dict:
+        """Tabela colunar (mesmo formato de dataframe_to_columns) com as colunas numéricas sem cópia"""
+        tabela = self.descritor["tabelas"][nome]
+        data = {}
+        for coluna, info in tabela["colunas"].items():
+            if info["tipo"] == "array":
+                data[coluna] = self._mapa.view(info["dtype"], info["shape"], info["offset"])
+            else:
+                data[coluna] = loads(self._mapa.texto(info["offset"], info["nbytes"]))
+        return {"columns": tabela["columns"], "length": tabela["length"], "data": data}
+
+    def dataframe(self, nome: str) -> pd.DataFrame:
+        """DataFrame (com cópia) de uma tabela; para as tabelas mensais, pequenas"""
+        tabela = self.tabela(nome)
+        return pd.DataFrame({coluna: np.array(valores) if isinstance(valores, np.ndarray) else valores
+                             for coluna, valores in tabela["data"].items()}, columns=tabela["columns"])
+
+    def array(self, nome: str) -> np.ndarray:
+        info = self.descritor["arrays"][nome]
+        return self._mapa.view(info["dtype"], info["shape"], info["offset"])
+
+
+def estatisticas() -> Dict:
+    """Blocos de memória compartilhada ainda mapeados neste processo"""
+    with _lock:
+        return dict(_estatisticas)
+
+
+def simular_e_exportar(params: Dict, com_cubo: bool = True) -> Dict:
+    """Executa a simulação no worker e devolve o descritor do bloco com carteira, fundo, operações e cubo"""
+    cubo = ResultCube(params["simulation_months"]) if com_cubo else None
+    df_carteira, df_fundo, df_operacoes = run_simulation(params, cubo=cubo)
+    return exportar_resultado(
+        {"carteira": dataframe_to_columns(df_carteira),
+         "fundo": dataframe_to_columns(df_fundo),
+         "operacoes": dataframe_to_columns(df_operacoes)},
+        {"cubo": cubo.data} if cubo is not None else {},
+    )
+
+
+def simular_em_processo(executor: Executor, params: Dict,
+                        com_cubo: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame, Dict, Optional[ResultCube]]:
+    """
+    Executa a simulação em um processo do executor e importa o resultado.
+
+    Returns:
+        (df_carteira, df_fundo, operações em formato colunar sem cópia, cubo ou None sem com_cubo)
+    """
+    futuro = executor.submit(simular_e_exportar, params, com_cubo)
+    try:
+        descritor = futuro.result()
+    except BaseException:
+        # Quem esperava desistiu: o bloco, se chegar a ser criado, não terá quem o importe
+        futuro.add_done_callback(_descartar)
+        raise
+    try:
+        resultado = ResultadoCompartilhado(descritor)
+    except BaseException:
+        _remover(descritor["nome"])
+        raise
+    cubo = ResultCube(params["simulation_months"], resultado.array("cubo")) if com_cubo else None
+    return resultado.dataframe("carteira"), resultado.dataframe("fundo"), resultado.tabela("operacoes"), cubo
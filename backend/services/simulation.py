@@ -5,6 +5,7 @@ Adaptado para Flask web application
 
 import pandas as pd
 import numpy as np
+import random
 import uuid
 import math
 import plotly.graph_objects as go
@@ -135,6 +136,76 @@ def amortizacao_sac(v: float, i_m: float, n: int):
     return parcelas, saldos
 
 
+def calcular_parcelas_lote(valores, taxas_mensais, prazos, sistemas="PRICE",
+                           incluir_cronograma: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Versão vetorizada de amortizacao_price/amortizacao_sac para vários créditos.
+
+    Args:
+        valores: Valores financiados (array ou escalar)
+        taxas_mensais: Taxas de juros mensais em decimal (array ou escalar)
+        prazos: Prazos em meses (array ou escalar)
+        sistemas: "PRICE", "SAC" ou array com o sistema de cada crédito
+        incluir_cronograma: Se True, inclui as matrizes 'parcelas' e 'saldos'
+            (uma linha por crédito, NaN após o fim do prazo)
+
+    Returns:
+        Dicionário de arrays: primeira_parcela, ultima_parcela, total_pago,
+        total_juros (e parcelas, saldos se incluir_cronograma)
+    """
+    v, i, n, sistema = np.broadcast_arrays(
+        np.asarray(valores, dtype=np.float64),
+        np.asarray(taxas_mensais, dtype=np.float64),
+        np.asarray(prazos, dtype=np.int64),
+        np.asarray(sistemas, dtype=object),
+    )
+    v, i, n = v.ravel(), i.ravel(), n.ravel()
+    is_sac = np.asarray(sistema.ravel() == "SAC", dtype=bool)
+    if n.size and (n <= 0).any():
+        raise ValueError("Todos os prazos devem ser maiores que zero.")
+
+    sem_juros = i == 0
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # PRICE: parcela constante
+        fator = (1 + i) ** n
+        parcela_price = np.where(sem_juros, v / n, v * (i * fator) / (fator - 1))
+        total_price = parcela_price * n
+
+        # SAC: amortização constante, juros sobre o saldo
+        amort_sac = v / n
+        primeira_sac = amort_sac + v * i
+        ultima_sac = amort_sac * (1 + i)
+        total_sac = v + i * v * (n + 1) / 2
+
+    total_pago = np.where(is_sac, total_sac, total_price)
+    resultado = {
+        "primeira_parcela": np.where(is_sac, primeira_sac, parcela_price),
+        "ultima_parcela": np.where(is_sac, ultima_sac, parcela_price),
+        "total_pago": total_pago,
+        "total_juros": total_pago - v,
+    }
+
+    if incluir_cronograma:
+        k = np.arange(1, int(n.max(initial=0)) + 1, dtype=np.float64)[None, :]
+        ativo = k <= n[:, None]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            crescimento = (1 + i)[:, None] ** k
+            acumulado = np.where(sem_juros[:, None], k,
+                                 (crescimento - 1) / np.where(sem_juros, 1.0, i)[:, None])
+            saldo_price = v[:, None] * crescimento - parcela_price[:, None] * acumulado
+            saldo_sac = v[:, None] - amort_sac[:, None] * k
+            saldos = np.maximum(0.0, np.where(is_sac[:, None], saldo_sac, saldo_price))
+
+            saldo_anterior = np.concatenate([v[:, None], saldos[:, :-1]], axis=1)
+            parcelas_sac = amort_sac[:, None] + saldo_anterior * i[:, None]
+            parcelas = np.where(is_sac[:, None], parcelas_sac, parcela_price[:, None])
+
+        resultado["parcelas"] = np.where(ativo, parcelas, np.nan)
+        resultado["saldos"] = np.where(ativo, saldos, np.nan)
+
+    return resultado
+
+
 def sigmoid_ramp(month: int, max_month: int, steepness: float = 0.9):
     """Rampa sigmoide para crescimento suave de operações"""
     mid = max_month * 0.6
@@ -147,15 +218,17 @@ def sigmoid_ramp(month: int, max_month: int, steepness: float = 0.9):
     return min(1.0, s / denom)
 
 
-def escolher_parcela_inadimplencia(prazo: int) -> int:
+def escolher_parcela_inadimplencia(prazo: int, rng=np.random) -> int:
     """
     Distribui a parcela da inadimplência segundo:
       - 33% na 1ª parcela (First Payment Default)
       - 33% nas parcelas 2 e 3 (66% acumulado até a 3ª)
       - 20% nas parcelas 4 a 12 (86% acumulado até o 12º mês)
       - 14% restante distribuído uniformemente do mês 13 até o fim do prazo
+
+    rng é o gerador da simulação (np.random.RandomState); o padrão usa o estado global.
     """
-    r = np.random.rand()
+    r = rng.rand()
     
     # 33% inadimplência na 1ª parcela (First Payment Default)
     if r < 0.33:
@@ -165,7 +238,7 @@ def escolher_parcela_inadimplencia(prazo: int) -> int:
     elif r < 0.66:
         max_parcela = min(3, prazo)
         if max_parcela >= 2:
-            return np.random.randint(2, max_parcela + 1)
+            return rng.randint(2, max_parcela + 1)
         else:
             return 1
     
@@ -173,20 +246,20 @@ def escolher_parcela_inadimplencia(prazo: int) -> int:
     elif r < 0.86:
         max_parcela = min(12, prazo)
         if max_parcela >= 4:
-            return np.random.randint(4, max_parcela + 1)
+            return rng.randint(4, max_parcela + 1)
         elif max_parcela >= 2:
-            return np.random.randint(2, max_parcela + 1)
+            return rng.randint(2, max_parcela + 1)
         else:
             return 1
     
     # 14% inadimplência do mês 13 em diante
     else:
         if prazo >= 13:
-            return np.random.randint(13, prazo + 1)
+            return rng.randint(13, prazo + 1)
         elif prazo >= 4:
-            return np.random.randint(4, prazo + 1)
+            return rng.randint(4, prazo + 1)
         elif prazo >= 2:
-            return np.random.randint(2, prazo + 1)
+            return rng.randint(2, prazo + 1)
         else:
             return 1
 
@@ -214,9 +287,91 @@ def calcular_ops_max_por_capital(aportes_acumulados: float, faixas: List[Dict])
     return int(faixas_ordenadas[-1]["max_ops_mensal"])
 
 
-def run_simulation(params: Dict):
-    """Executa a simulação completa"""
-    np.random.seed(params["random_seed"])
+def planejar_operacoes_mensais(params: Dict) -> List[int]:
+    """
+    Calcula o volume pretendido de operações em cada mês da simulação.
+
+    O alvo depende apenas dos parâmetros (aportes, faixas de capital, rampa e
+    multiplicador), não do estado do fundo; as restrições de capacidade são
+    aplicadas depois, durante a simulação.
+
+    Args:
+        params: Parâmetros da simulação
+
+    Returns:
+        Lista com o número pretendido de operações para os meses 1..simulation_months
+    """
+    months = params["simulation_months"]
+    faixas = params.get("faixas_operacoes", [])
+    multiplicador = params.get("multiplicador_volume_operacoes", 1.0)
+
+    # Controle de rampa dinâmica
+    max_ops_faixa_anterior = 0  # Máximo da faixa anterior
+    max_ops_faixa_atual = 0  # Máximo da faixa atual
+    mes_mudanca_faixa = 0  # Mês em que ocorreu a última mudança de faixa
+    meses_rampa = params.get("meses_rampa_crescimento", 6)
+
+    alvos = []
+    for mes in range(1, months + 1):
+        # Calcula aportes acumulados até este mês
+        aportes_acumulados = params["aporte_inicial_fundo"]
+        aportes_acumulados += params.get("aporte_mensal", 0.0) * mes
+        for ap in params.get("aportes_extra", []):
+            if int(ap["mes"]) <= mes:
+                aportes_acumulados += float(ap["valor"])
+
+        # Determina o teto máximo baseado no capital (stair step)
+        max_ops_faixa_nova = calcular_ops_max_por_capital(aportes_acumulados, faixas)
+
+        # Detecta mudança de faixa (novo aporte que eleva o teto)
+        if max_ops_faixa_nova > max_ops_faixa_atual:
+            max_ops_faixa_anterior = max_ops_faixa_atual
+            max_ops_faixa_atual = max_ops_faixa_nova
+            mes_mudanca_faixa = mes
+
+        # Calcula rampa de crescimento gradual
+        # Se mudou de faixa recentemente, cresce do nível anterior ao novo em 'meses_rampa' meses
+        if mes < mes_mudanca_faixa + meses_rampa:
+            meses_desde_mudanca = mes - mes_mudanca_faixa
+            progresso = meses_desde_mudanca / meses_rampa  # 0 a 1
+            # Interpolação linear entre faixa anterior e atual
+            target_ops_this_month = int(round(
+                max_ops_faixa_anterior + (max_ops_faixa_atual - max_ops_faixa_anterior) * progresso
+            ))
+        else:
+            # Após rampa completa, usa o teto da faixa atual
+            target_ops_this_month = max_ops_faixa_atual
+
+        # Aplica multiplicador de volume de operações
+        alvos.append(int(round(target_ops_this_month * multiplicador)))
+
+    return alvos
+
+
+class SimulationCancelled(Exception):
+    """Simulação interrompida pelo sinal de cancelamento (argumento cancel de run_simulation)"""
+
+    def __init__(self, mes: int):
+        super().__init__(f"Simulação cancelada no mês {mes}")
+        self.mes = mes
+
+
+def run_simulation(params: Dict, cubo=None, cancel=None):
+    """
+    Executa a simulação completa.
+
+    Se cubo (services.cube.ResultCube com o mesmo número de meses) for
+    informado, ele é preenchido durante a execução com os agregados por
+    porte × safra × mês.
+
+    Se cancel (threading.Event ou objeto com is_set()) for informado, ele é
+    verificado no início de cada mês; quando sinalizado, a simulação para e
+    levanta SimulationCancelled.
+    """
+    # Geradores locais: simulações simultâneas em threads não compartilham estado aleatório,
+    # e os mesmos parâmetros produzem sempre o mesmo resultado (inclusive os ids das operações)
+    rng = np.random.RandomState(params["random_seed"])
+    ids_rng = random.Random(params["random_seed"])
 
     months = params["simulation_months"]
     start_year = params.get("start_year", 2026)
@@ -229,6 +384,7 @@ def run_simulation(params: Dict):
     pointer_map = {}
     scheduled_honras = {}
     scheduled_recuperacoes = {}
+    cubo_idx = {}  # id da operação -> índice porte × safra no cubo
 
     # indicadores acumulados
     carteira_rows = []
@@ -254,8 +410,8 @@ def run_simulation(params: Dict):
         """Gera novas operações"""
         new_ids = []
         for _ in range(n_new):
-            opid = str(uuid.uuid4())
-            r = np.random.rand()
+            opid = str(uuid.UUID(int=ids_rng.getrandbits(128), version=4))
+            r = rng.rand()
             if r < params["prop_MEI"]:
                 porte = "MEI"
                 ticket_mean = params["ticket_medio_MEI"]
@@ -279,15 +435,15 @@ def run_simulation(params: Dict):
                 taxa_juros_media = params["taxa_juros_media_anual_EPP"]
 
             sigma = params["ticket_cv"] * ticket_mean
-            valor_solicitado = max(500.0, np.random.normal(ticket_mean, sigma))
+            valor_solicitado = max(500.0, rng.normal(ticket_mean, sigma))
             valor_financiado = valor_solicitado * (1 + params["taxa_concessao"])
-            prazo = max(1, int(round(np.random.normal(prazo_mean, max(1, prazo_mean * 0.1)))))
-            taxa_juros_anual = max(0.0, np.random.normal(taxa_juros_media, 
+            prazo = max(1, int(round(rng.normal(prazo_mean, max(1, prazo_mean * 0.1)))))
+            taxa_juros_anual = max(0.0, rng.normal(taxa_juros_media, 
                                                          params["taxa_juros_cv"] * taxa_juros_media))
             taxa_juros_mensal = juros_anual_para_mensal(taxa_juros_anual)
             
             # Escolhe sistema baseado nas proporções
-            r_sistema = np.random.rand()
+            r_sistema = rng.rand()
             if r_sistema < params.get("prop_PRICE", 0.5):
                 sistema = "PRICE"
             else:
@@ -298,7 +454,7 @@ def run_simulation(params: Dict):
             else:
                 parcelas, saldos = amortizacao_sac(valor_financiado, taxa_juros_mensal, prazo)
 
-            is_default = np.random.rand() < taxa_inad
+            is_default = rng.rand() < taxa_inad
             mes_inad = None
             parcela_inad = None
             saldo_devedor_inad = None
@@ -306,7 +462,7 @@ def run_simulation(params: Dict):
             status = "Ativa"
             
             if is_default:
-                parcela_inad = escolher_parcela_inadimplencia(prazo)
+                parcela_inad = escolher_parcela_inadimplencia(prazo, rng)
                 mes_inad = mes + parcela_inad - 1
                 
                 # Saldo devedor no momento da inadimplência (antes da parcela inadimplente)
@@ -345,6 +501,12 @@ def run_simulation(params: Dict):
             status_map[opid] = "Ativa" if status == "Ativa" else "Inadimplente"
             pointer_map[opid] = 0
 
+            if cubo is not None:
+                idx = cubo_idx[opid] = cubo.indice(porte, mes)
+                cubo.adicionar(idx, mes, "operacoes_contratadas")
+                cubo.adicionar(idx, mes, "desembolso", op["valor_financiado"])
+                cubo.adicionar(idx, mes, "avais_concedidos", op["valor_financiado"] * garantia_pct)
+
             if status == "Inadimplente" and mes_inad is not None:
                 mes_honra = mes_inad + params["prazo_honra"]
                 scheduled_honras.setdefault(mes_honra, []).append((opid, float(valor_honrado)))
@@ -352,8 +514,8 @@ def run_simulation(params: Dict):
             new_ids.append(opid)
         return new_ids
 
-    def compute_valor_garantido_mes(current_month):
-        """Calcula valor garantido total no mês"""
+    def compute_valor_garantido_mes(current_month, garantia_acc=None):
+        """Calcula valor garantido total no mês (e, opcionalmente, por célula do cubo)"""
         total_garantia = 0.0
         for op in ops:
             opid = op["id_operacao"]
@@ -369,6 +531,8 @@ def run_simulation(params: Dict):
             saldo = saldos[ptr]
             garantia = saldo * float(op["percentual_garantia"])
             total_garantia += garantia
+            if garantia_acc is not None:
+                garantia_acc[cubo_idx[opid]] += garantia
         return total_garantia
 
     # Pre-build map for extra aportes
@@ -379,14 +543,14 @@ def run_simulation(params: Dict):
         aportes_map.setdefault(m, 0.0)
         aportes_map[m] += v
 
-    # Controle de rampa dinâmica
-    max_ops_faixa_anterior = 0  # Máximo da faixa anterior
-    max_ops_faixa_atual = 0  # Máximo da faixa atual
-    mes_mudanca_faixa = 0  # Mês em que ocorreu a última mudança de faixa
-    meses_rampa = params.get("meses_rampa_crescimento", 6)
+    # Volume pretendido de operações por mês (stair step + rampa + multiplicador)
+    alvo_ops_mensal = planejar_operacoes_mensais(params)
 
     # simulate months
     for mes in range(1, months + 1):
+        if cancel is not None and cancel.is_set():
+            raise SimulationCancelled(mes)
+
         # dynamic SELIC for this month
         year = start_year + (mes - 1) // 12
         selic_key = f"Taxa_SELIC_{year}"
@@ -397,41 +561,7 @@ def run_simulation(params: Dict):
         percentual_rendimento = params.get("percentual_rendimento_selic", 0.95)
         selic_mensal_efetiva = selic_mensal * percentual_rendimento
 
-        # Calcula aportes acumulados até este mês
-        aportes_acumulados = params["aporte_inicial_fundo"]
-        aportes_acumulados += params.get("aporte_mensal", 0.0) * mes
-        for ap in params.get("aportes_extra", []):
-            if int(ap["mes"]) <= mes:
-                aportes_acumulados += float(ap["valor"])
-
-        # Determina o teto máximo baseado no capital (stair step)
-        max_ops_faixa_nova = calcular_ops_max_por_capital(
-            aportes_acumulados, 
-            params.get("faixas_operacoes", [])
-        )
-
-        # Detecta mudança de faixa (novo aporte que eleva o teto)
-        if max_ops_faixa_nova > max_ops_faixa_atual:
-            max_ops_faixa_anterior = max_ops_faixa_atual
-            max_ops_faixa_atual = max_ops_faixa_nova
-            mes_mudanca_faixa = mes
-
-        # Calcula rampa de crescimento gradual
-        # Se mudou de faixa recentemente, cresce do nível anterior ao novo em 'meses_rampa' meses
-        if mes < mes_mudanca_faixa + meses_rampa:
-            meses_desde_mudanca = mes - mes_mudanca_faixa
-            progresso = meses_desde_mudanca / meses_rampa  # 0 a 1
-            # Interpolação linear entre faixa anterior e atual
-            target_ops_this_month = int(round(
-                max_ops_faixa_anterior + (max_ops_faixa_atual - max_ops_faixa_anterior) * progresso
-            ))
-        else:
-            # Após rampa completa, usa o teto da faixa atual
-            target_ops_this_month = max_ops_faixa_atual
-        
-        # Aplica multiplicador de volume de operações
-        multiplicador = params.get("multiplicador_volume_operacoes", 1.0)
-        target_ops_this_month = int(round(target_ops_this_month * multiplicador))
+        target_ops_this_month = alvo_ops_mensal[mes - 1]
 
         limite_operacional = saldo_fundo * params["alavancagem_maxima"]
         valor_garantido_at_start = compute_valor_garantido_mes(mes)
@@ -480,10 +610,16 @@ def run_simulation(params: Dict):
             if mid == mes and op["id_operacao"] not in counted_defaults:
                 novas_inadimplencias_this_month += 1
                 counted_defaults.add(op["id_operacao"])
+                if cubo is not None:
+                    idx = cubo_idx[op["id_operacao"]]
+                    cubo.adicionar(idx, mes, "inadimplencias")
+                    cubo.adicionar(idx, mes, "saldo_inadimplido", op["_saldo_devedor_inad"])
 
         # process payments
         parcelas_recebidas = 0.0
         operacoes_ativas_count = 0
+        # Operações ativas por célula do cubo, com a mesma definição de operacoes_ativas da carteira
+        ativas_acc = cubo.acumulador() if cubo is not None else None
         for op in ops:
             opid = op["id_operacao"]
             contrat_mes = int(op["mes_contratacao"])
@@ -500,6 +636,8 @@ def run_simulation(params: Dict):
                 parcela_inad = op.get("_parcela_inad")
                 if parcela_inad is not None and payment_count >= parcela_inad:
                     operacoes_ativas_count += 1
+                    if ativas_acc is not None:
+                        ativas_acc[cubo_idx[opid]] += 1
                     continue
                 else:
                     parcela_val = parcelas[ptr] if ptr < len(parcelas) else 0.0
@@ -508,6 +646,8 @@ def run_simulation(params: Dict):
                     if pointer_map[opid] >= len(parcelas):
                         status_map[opid] = "Quitada"
                     operacoes_ativas_count += 1
+                    if ativas_acc is not None:
+                        ativas_acc[cubo_idx[opid]] += 1
                     continue
             else:
                 parcela_val = parcelas[ptr] if ptr < len(parcelas) else 0.0
@@ -516,6 +656,8 @@ def run_simulation(params: Dict):
                 if pointer_map[opid] >= len(parcelas):
                     status_map[opid] = "Quitada"
                 operacoes_ativas_count += 1
+                if ativas_acc is not None:
+                    ativas_acc[cubo_idx[opid]] += 1
 
         cumulative_inadimplentes += novas_inadimplencias_this_month
 
@@ -527,6 +669,8 @@ def run_simulation(params: Dict):
             status_map[opid] = "Honrada"
             pointer_map[opid] = 10**9
             cumulative_honras += valor_h
+            if cubo is not None:
+                cubo.adicionar(cubo_idx[opid], mes, "honras", valor_h)
             recuper_total = valor_h * params["taxa_recuperacao"]
             if recuper_total > 0:
                 start_rec = mes + params["prazo_recuperacao"]
@@ -540,6 +684,9 @@ def run_simulation(params: Dict):
         recuperacoes_total = sum([r[1] for r in recuperacoes_list]) if recuperacoes_list else 0.0
         recuperacoes_por_mes[mes] = recuperacoes_total  # Armazena para índice SGC
         cumulative_recuperacoes += recuperacoes_total
+        if cubo is not None:
+            for (opid, valor_r) in recuperacoes_list:
+                cubo.adicionar(cubo_idx[opid], mes, "recuperacoes", valor_r)
 
         # aporte(s) this month
         aporte = float(params.get("aporte_mensal", 0.0)) + float(aportes_map.get(mes, 0.0))
@@ -550,7 +697,11 @@ def run_simulation(params: Dict):
         saldo_fundo = max(0.0, saldo_antes - honras_total)
 
         # valor garantido atual
-        valor_garantido_mes = compute_valor_garantido_mes(mes)
+        if cubo is not None:
+            garantia_acc, saldo_acc = cubo.acumulador(), cubo.acumulador()
+            valor_garantido_mes = compute_valor_garantido_mes(mes, garantia_acc)
+        else:
+            valor_garantido_mes = compute_valor_garantido_mes(mes)
         limite_operacional = saldo_fundo * params["alavancagem_maxima"]
 
         # saldo devedor carteira
@@ -559,6 +710,13 @@ def run_simulation(params: Dict):
             saldos = amort_map.get(oid, [])
             if ptr < len(saldos):
                 soma_saldos += saldos[ptr]
+                if cubo is not None:
+                    saldo_acc[cubo_idx[oid]] += saldos[ptr]
+
+        if cubo is not None:
+            cubo.definir_estoque(mes, "valor_garantido", garantia_acc)
+            cubo.definir_estoque(mes, "operacoes_ativas", ativas_acc)
+            cubo.definir_estoque(mes, "saldo_devedor", saldo_acc)
         
         # Calcula taxa de inadimplência por quantidade e por valor
         qtd_ops_inadimplentes_materializadas = 0
@@ -679,6 +837,37 @@ def run_simulation(params: Dict):
     return df_carteira, df_fundo, df_operacoes
 
 
+def build_resumo(df_carteira: pd.DataFrame, df_fundo: pd.DataFrame) -> Dict:
+    """Monta o resumo (KPIs finais) a partir das séries mensais da simulação"""
+    ultimo_mes_carteira = df_carteira.iloc[-1]
+    ultimo_mes_fundo = df_fundo.iloc[-1]
+
+    # Conta meses com paused=True (restrições operacionais)
+    meses_com_restricoes = int(df_carteira["paused"].sum())
+
+    # Conta total de operações inadimplentes acumuladas
+    total_inadimplentes = int(df_carteira["operacoes_inadimplentes_novas"].sum())
+
+    # Calcula ticket médio das operações (desembolso acumulado / total de operações)
+    total_ops = int(ultimo_mes_carteira["operacoes_realizadas_acum"])
+    desembolso_total = float(ultimo_mes_carteira["desembolso_acum"])
+    ticket_medio = desembolso_total / total_ops if total_ops > 0 else 0.0
+
+    return {
+        "saldo_final_fundo": float(ultimo_mes_fundo["saldo_final"]),
+        "total_operacoes": total_ops,
+        "honras_acumuladas": float(ultimo_mes_carteira["honras_acumuladas"]),
+        "recuperacoes_acumuladas": float(ultimo_mes_carteira["recuperacoes_acumuladas"]),
+        "desembolso_acumulado": desembolso_total,
+        "ticket_medio": ticket_medio,
+        "meses_restricoes_operacionais": meses_com_restricoes,
+        "indice_sgc": float(ultimo_mes_carteira["indice_sgc"]),
+        "taxa_inadimplencia_qtd": float(ultimo_mes_carteira["taxa_inadimplencia_qtd"]),
+        "taxa_inadimplencia_valor": float(ultimo_mes_carteira["taxa_inadimplencia_valor"]),
+        "operacoes_inadimplentes": total_inadimplentes
+    }
+
+
 def generate_plotly_chart(df_carteira: pd.DataFrame, df_fundo: pd.DataFrame) -> dict:
     """Gera gráfico interativo com Plotly"""
     
@@ -0,0 +1,247 @@
+"""
+Coalescência de requisições idênticas (single-flight) para a simulação.
+
+Quando várias requisições com os mesmos parâmetros chegam ao mesmo tempo,
+apenas a primeira (líder) executa o cálculo; as demais aguardam e recebem os
+mesmos bytes de resposta já serializados.
+
+Duas implementações com a mesma interface (do / stats):
+  - SingleFlight: dentro do processo, com threading
+  - SQLiteSingleFlight: entre workers (ex.: gunicorn com vários processos),
+    coordenada por um arquivo SQLite local
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Callable, Dict, Tuple
+
+
+def canonical_params_key(params: Dict) -> str:
+    """Gera a chave canônica (sha256) de um conjunto de parâmetros já mesclado"""
+    canonico = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """Cálculo em andamento compartilhado pelos chamadores de uma mesma chave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Single-flight em memória: coalesce chamadas concorrentes no mesmo processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._computations = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """
+        Executa fn uma única vez por chave entre chamadas concorrentes.
+
+        Returns:
+            Tupla (resultado, compartilhado), onde compartilhado indica que o
+            resultado veio do cálculo de outra requisição
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._computations += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self) -> Dict:
+        """Métricas de coalescência deste processo"""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "computations": self._computations,
+                "coalesced": self._coalesced,
+                "computations_saved": self._coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class SQLiteSingleFlight:
+    """
+    Single-flight entre processos coordenado por um arquivo SQLite.
+
+    O líder registra a chave na tabela 'flights' (INSERT com chave primária) e,
+    ao terminar, grava os bytes da resposta. Os demais workers consultam a
+    linha até o status mudar. Resultados prontos ficam disponíveis por
+    'result_ttl' segundos para cobrir quem chegou durante a finalização.
+    Enquanto calcula, o líder renova 'updated_at' a cada 'heartbeat_interval'
+    segundos; uma linha 'running' sem renovação há mais de 'stale_after'
+    segundos indica um líder morto, e quem a aguardava calcula localmente.
+    Dentro de cada processo as chamadas também passam por um SingleFlight em
+    memória, para que apenas uma thread por processo faça polling no arquivo.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.05,
+                 result_ttl: float = 5.0, stale_after: float = 15.0, heartbeat_interval: float = 1.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval
+        self._local = SingleFlight()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        diretorio = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(diretorio, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flights ("
+                " key TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " body BLOB,"
+                " error TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flight_stats ("
+                " name TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO flight_stats VALUES ('computations', 0), ('coalesced', 0)")
+
+    def _incr(self, conn: sqlite3.Connection, name: str):
+        conn.execute("UPDATE flight_stats SET value = value + 1 WHERE name = ?", (name,))
+
+    def _purge(self, conn: sqlite3.Connection, now: float):
+        conn.execute(
+            "DELETE FROM flights WHERE (status != 'running' AND updated_at < ?)"
+            " OR (status = 'running' AND updated_at < ?)",
+            (now - self.result_ttl, now - self.stale_after),
+        )
+
+    def do(self, key: str, fn: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """Executa fn uma única vez por chave entre todos os workers"""
+        origem = {}
+
+        def cross_worker():
+            body, origem["shared"] = self._do_cross_worker(key, fn)
+            return body
+
+        body, shared = self._local.do(key, cross_worker)
+        return body, shared or origem.get("shared", False)
+
+    def _heartbeat(self, key: str, parar: threading.Event):
+        """Renova a linha do líder enquanto o cálculo está em andamento"""
+        with closing(self._connect()) as conn:
+            while not parar.wait(self.heartbeat_interval):
+                conn.execute("UPDATE flights SET updated_at = ? WHERE key = ? AND status = 'running'",
+                             (time.time(), key))
+
+    def _do_cross_worker(self, key: str, fn: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        conn = self._connect()
+        try:
+            now = time.time()
+            self._purge(conn, now)
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO flights (key, status, updated_at) VALUES (?, 'running', ?)",
+                (key, now),
+            )
+            if cur.rowcount == 1:
+                self._incr(conn, "computations")
+                parar = threading.Event()
+                heartbeat = threading.Thread(target=self._heartbeat, args=(key, parar), daemon=True)
+                heartbeat.start()
+                try:
+                    body = fn()
+                except Exception as e:
+                    conn.execute(
+                        "UPDATE flights SET status = 'error', error = ?, updated_at = ? WHERE key = ?",
+                        (str(e), time.time(), key),
+                    )
+                    raise
+                finally:
+                    parar.set()
+                    heartbeat.join()
+                conn.execute(
+                    "UPDATE flights SET status = 'done', body = ?, updated_at = ? WHERE key = ?",
+                    (sqlite3.Binary(body), time.time(), key),
+                )
+                return body, False
+
+            self._incr(conn, "coalesced")
+            while True:
+                row = conn.execute("SELECT status, body, error, updated_at FROM flights WHERE key = ?",
+                                   (key,)).fetchone()
+                if row is None:
+                    # O líder expirou ou o resultado já foi descartado: calcula localmente
+                    return fn(), False
+                status, body, error, updated_at = row
+                if status == "done":
+                    return bytes(body), True
+                if status == "error":
+                    raise RuntimeError(error)
+                if time.time() - updated_at > self.stale_after:
+                    # O líder parou de renovar a linha (worker encerrado): calcula localmente
+                    return fn(), False
+                time.sleep(self.poll_interval)
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict:
+        """Métricas de coalescência somadas de todos os workers"""
+        with closing(self._connect()) as conn:
+            valores = dict(conn.execute("SELECT name, value FROM flight_stats").fetchall())
+            in_flight = conn.execute("SELECT COUNT(*) FROM flights WHERE status = 'running'").fetchone()[0]
+        local = self._local.stats()
+        return {
+            "backend": "sqlite",
+            "computations": valores.get("computations", 0),
+            "coalesced": valores.get("coalesced", 0) + local["coalesced"],
+            "computations_saved": valores.get("coalesced", 0) + local["coalesced"],
+            "in_flight": in_flight,
+        }
+
+
+def create_single_flight():
+    """Cria o single-flight configurado por SIMULATE_SINGLE_FLIGHT (memory | sqlite)"""
+    backend = os.environ.get("SIMULATE_SINGLE_FLIGHT", "memory").lower()
+    if backend == "sqlite":
+        path = os.environ.get("SIMULATE_SINGLE_FLIGHT_DB", "single_flight.db")
+        return SQLiteSingleFlight(path)
+    return SingleFlight()
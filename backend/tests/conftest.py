@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Os testes não gravam o histórico de simulações em disco
+os.environ["RUN_STORE_DB"] = ""
+
+
+@pytest.fixture
+def small_params():
+    """Parâmetros padrão com horizonte curto, para simulações rápidas"""
+    from services.simulation import get_default_params
+
+    params = get_default_params()
+    params["simulation_months"] = 12
+    return params
+
+
+@pytest.fixture
+def client():
+    import app as app_module
+
+    app_module.app.config["TESTING"] = True
+    with app_module.app.test_client() as client:
+        yield client
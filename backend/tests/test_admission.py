@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected, estimate_cost
+
+
+def test_check_budget_recusa_acima_do_orcamento(small_params):
+    estimate = estimate_cost(small_params)
+    controller = AdmissionController(max_operations=estimate["operacoes"] - 1)
+    with pytest.raises(AdmissionRejected) as exc:
+        controller.check_budget(estimate)
+    assert exc.value.status_code == 422
+
+
+def test_check_budget_desvia_para_async(small_params):
+    estimate = estimate_cost(small_params)
+    assert AdmissionController(async_above_seconds=0).check_budget(estimate) == "async"
+    assert AdmissionController().check_budget(estimate) == "sync"
+
+
+def test_client_slot_limita_por_cliente(small_params):
+    estimate = estimate_cost(small_params)
+    controller = AdmissionController(max_per_client=1)
+    with controller.client_slot("a", estimate):
+        with pytest.raises(AdmissionRejected) as exc:
+            with controller.client_slot("a", estimate):
+                pass
+        assert exc.value.status_code == 429
+        with controller.client_slot("b", estimate):
+            pass
+    assert controller.stats()["clients_active"] == 0
+
+
+def test_worker_slot_recusa_com_fila_cheia(small_params):
+    estimate = estimate_cost(small_params)
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    with controller.worker_slot(estimate):
+        with pytest.raises(AdmissionRejected) as exc:
+            with controller.worker_slot(estimate):
+                pass
+    assert exc.value.status_code == 503
+    assert exc.value.retry_after >= 1
+
+
+def test_client_id_ignora_x_forwarded_for(client, monkeypatch):
+    import app as app_module
+
+    controller = AdmissionController(max_per_client=0)
+    monkeypatch.setattr(app_module, "admission", controller)
+
+    # Trocar o cabeçalho não cria uma identidade nova: o limite continua valendo
+    for ip in ("10.0.0.1", "10.0.0.2"):
+        response = client.post("/simulate", json={"simulation_months": 12},
+                               headers={"X-Forwarded-For": ip})
+        assert response.status_code == 429
+
+
+def test_jobs_assincronos_contam_no_limite_do_cliente(client, monkeypatch):
+    import app as app_module
+
+    controller = AdmissionController(max_per_client=1)
+    monkeypatch.setattr(app_module, "admission", controller)
+    liberar = threading.Event()
+    original = app_module.build_simulation_body
+
+    def build_lento(*args, **kwargs):
+        liberar.wait(5)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "build_simulation_body", build_lento)
+
+    primeiro = client.post("/simulate?async=1", json={"simulation_months": 12, "random_seed": 1})
+    assert primeiro.status_code == 202
+    segundo = client.post("/simulate?async=1", json={"simulation_months": 12, "random_seed": 2})
+    assert segundo.status_code == 429
+
+    liberar.set()
+    job_url = primeiro.headers["Location"]
+    for _ in range(100):
+        if client.get(job_url).status_code == 200:
+            break
+        threading.Event().wait(0.05)
+    assert controller.stats()["clients_active"] == 0
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from services.admission import AdmissionController, estimate_cost
+from services.calibration import DEFAULT_BOUNDS, Calibrator
+
+
+ALVOS = {"kpis": {"indice_sgc": 0.04}}
+
+
+def test_limites_padrao():
+    calibrador = Calibrator(ALVOS)
+    assert calibrador.nomes == list(DEFAULT_BOUNDS)
+    inferior, superior = calibrador.corner_params()
+    assert inferior["taxa_recuperacao"] == 0.0 and superior["taxa_recuperacao"] == 1.0
+
+
+@pytest.mark.parametrize("limites", [
+    {"multiplicador_volume_operacoes": [0.1, 10_000]},
+    {"simulation_months": [12.5, 600]},
+    {"prop_MEI": [0, 1]},
+])
+def test_recusa_parametros_nao_calibraveis(limites):
+    with pytest.raises(ValueError, match="não calibráveis"):
+        Calibrator(ALVOS, bounds=limites)
+
+
+@pytest.mark.parametrize("limites", [
+    {"taxa_inadimplencia_MEI": [-0.5, 0.5]},
+    {"taxa_recuperacao": [0.0, 2.0]},
+    {"taxa_recuperacao": [0.0, float("nan")]},
+])
+def test_recusa_limites_fora_do_intervalo(limites):
+    with pytest.raises(ValueError):
+        Calibrator(ALVOS, bounds=limites)
+
+
+def test_sementes_comuns_e_cache(small_params):
+    calibrador = Calibrator(ALVOS, base_params=small_params, bounds={"taxa_recuperacao": [0.2, 0.8]},
+                            replicas=2, max_workers=1)
+    ponto = np.array([0.5])
+    primeiro = calibrador.evaluate_many([ponto, ponto])
+    assert primeiro[0]["objetivo"] == primeiro[1]["objetivo"]
+    assert calibrador.simulacoes == 2
+
+
+def test_rota_recusa_parametro_fora_da_lista(client):
+    corpo = {"alvos": ALVOS, "parametros": {"simulation_months": 12},
+             "limites": {"multiplicador_volume_operacoes": [0.1, 10_000]}}
+    response = client.post("/calibrate", json=corpo)
+    assert response.status_code == 400
+    assert "não calibráveis" in response.get_json()["error"]
+
+
+def test_rota_orca_o_pior_canto(client, monkeypatch, small_params):
+    import app as app_module
+
+    limite = estimate_cost(small_params)["operacoes"] - 1
+    monkeypatch.setattr(app_module, "admission", AdmissionController(max_operations=limite))
+    corpo = {"alvos": ALVOS, "parametros": {"simulation_months": 12}}
+    assert client.post("/calibrate", json=corpo).status_code == 422
@@ -0,0 +1,56 @@
+import pytest
+
+from routes import credit_routes
+from services.credit_service import CreditService
+from services.credit_store import CreditStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = CreditStore(str(tmp_path / "credits.db"))
+    monkeypatch.setattr(credit_routes, "credit_service", CreditService(store=store))
+    return store
+
+
+def test_create_e_update_validos(client, store):
+    response = client.post("/api/credits/", json={"amount": 1000, "interest_rate": 12.5})
+    assert response.status_code == 201
+    credit_id = response.get_json()["id"]
+
+    response = client.put(f"/api/credits/{credit_id}", json={"amount": 2000, "interest_rate": 10})
+    assert response.status_code == 200
+    assert store.get(credit_id)["amount"] == 2000
+
+
+@pytest.mark.parametrize("corpo, campo, codigo", [
+    ({"amount": -5, "interest_rate": 1}, "amount", "below_min"),
+    ({"amount": 0, "interest_rate": 1}, "amount", "below_min"),
+    ({"amount": "abc", "interest_rate": 1}, "amount", "not_numeric"),
+    ({"amount": 1000, "interest_rate": -1}, "interest_rate", "below_min"),
+    ({"amount": 1000}, "interest_rate", "missing"),
+])
+def test_create_usa_as_regras_do_lote(client, store, corpo, campo, codigo):
+    response = client.post("/api/credits/", json=corpo)
+    assert response.status_code == 400
+    errors = response.get_json()["errors"]
+    assert (campo, codigo) in list(zip(errors["field"], errors["code"]))
+    assert store.list_page()["items"] == []
+
+
+def test_update_invalido_nao_altera(client, store):
+    credit_id = store.create(1000, 5)["id"]
+    response = client.put(f"/api/credits/{credit_id}", json={"amount": True, "interest_rate": 5})
+    assert response.status_code == 400
+    assert store.get(credit_id)["amount"] == 1000
+
+
+def test_create_sem_objeto(client, store):
+    response = client.post("/api/credits/", json=[1, 2])
+    assert response.status_code == 400
+
+
+def test_bulk_devolve_todos_os_erros(client, store):
+    itens = [{"amount": 100, "interest_rate": 1}, {"amount": -1, "interest_rate": -1}]
+    response = client.post("/api/credits/bulk", json=itens)
+    assert response.status_code == 400
+    assert response.get_json()["errors"]["row"] == [1, 1]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from models.credit import Credit
+from services.credit_service import CreditService
+from services.simulation import amortizacao_price, amortizacao_sac, juros_anual_para_mensal
+
+
+def test_taxa_nominal_em_percentual_igual_ao_modelo():
+    quotes = CreditService().calculate_payments(10_000, 12.0, 36, nominal_rate=True)
+    esperado = Credit(10_000, 12.0).calculate_monthly_payment(3)
+    assert quotes["first_installment"][0] == pytest.approx(esperado)
+
+
+def test_taxa_efetiva_em_percentual_igual_a_simulacao():
+    service = CreditService()
+    mensal = juros_anual_para_mensal(0.18)
+    price = service.calculate_payments(5_000, 18.0, 24, include_schedule=True)
+    parcelas, saldos = amortizacao_price(5_000, mensal, 24)
+    np.testing.assert_allclose(price["installments"][0], parcelas)
+    np.testing.assert_allclose(price["balances"][0], saldos, atol=1e-6)
+
+    sac = service.calculate_payments(5_000, 18.0, 24, system="SAC")
+    parcelas_sac, _ = amortizacao_sac(5_000, mensal, 24)
+    assert sac["first_installment"][0] == pytest.approx(parcelas_sac[0])
+    assert sac["last_installment"][0] == pytest.approx(parcelas_sac[-1])
+
+
+def test_taxa_zero():
+    quotes = CreditService().calculate_payments([1_200], [0.0], [12])
+    assert quotes["first_installment"][0] == pytest.approx(100.0)
+    assert quotes["total_interest"][0] == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize("taxa", [-1.0, np.nan, np.inf])
+def test_rejeita_taxa_invalida(taxa):
+    with pytest.raises(ValueError):
+        CreditService().calculate_payments([1_000, 1_000], [10.0, taxa], [12, 12])
+
+
+@pytest.mark.parametrize("valor", [0.0, -10.0, np.nan])
+def test_rejeita_valor_invalido(valor):
+    with pytest.raises(ValueError):
+        CreditService().calculate_payments([valor], [10.0], [12])
+
+
+def test_rota_quotes_recusa_taxa_nula(client):
+    corpo = {"amounts": [1000, 1000], "annual_rates": [12, None], "terms": [12, 12]}
+    response = client.post("/api/credits/quotes", json=corpo)
+    assert response.status_code == 400
@@ -0,0 +1,48 @@
+import pytest
+
+from services import credit_store
+from services.credit_store import CreditStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CreditStore(str(tmp_path / "credits.db"))
+
+
+def test_crud(store):
+    criado = store.create(1000, 2.5)
+    assert store.get(criado["id"])["amount"] == 1000.0
+
+    atualizado = store.update(criado["id"], 2000, 3.0)
+    assert (atualizado["amount"], atualizado["interest_rate"]) == (2000.0, 3.0)
+    assert store.update(999, 1, 1) is None
+
+    assert store.delete(criado["id"]) is True
+    assert store.delete(criado["id"]) is False
+    assert store.get(criado["id"]) is None
+
+
+def test_lote_com_ids_contiguos(store, monkeypatch):
+    assert store.create_many([]) == (0, 0)
+    primeiro, ultimo = store.create_many((float(i), 1.0) for i in range(1, 51))
+    assert ultimo - primeiro == 49
+    assert store.count() == 50
+
+    # Busca em blocos menores que a lista de ids, preservando a ordem pedida
+    monkeypatch.setattr(credit_store, "MAX_SQL_PARAMS", 7)
+    ids = [ultimo, primeiro, 10_000, primeiro + 1]
+    assert [c["id"] for c in store.get_many(ids)] == [ultimo, primeiro, primeiro + 1]
+
+
+def test_paginacao_por_keyset_com_filtros(store):
+    store.create_many((float(i), float(i % 5)) for i in range(1, 26))
+
+    vistos = []
+    after_id = 0
+    while after_id is not None:
+        pagina = store.list_page(after_id=after_id, limit=4, min_amount=5, max_rate=2)
+        vistos.extend(c["amount"] for c in pagina["items"])
+        after_id = pagina["next_after_id"]
+    assert vistos == [float(i) for i in range(5, 26) if i % 5 <= 2]
+
+    assert store.list_page(limit=0)["items"][0]["amount"] == 1.0
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from services.admission import estimate_cost
+from services.cube import IDX, ResultCube
+from services.simulation import run_simulation
+
+
+@pytest.fixture(scope="module")
+def simulado():
+    from services.simulation import get_default_params
+
+    params = get_default_params()
+    params["simulation_months"] = 24
+    cubo = ResultCube(24)
+    df_carteira, _, _ = run_simulation(params, cubo=cubo)
+    return cubo, df_carteira
+
+
+def test_operacoes_ativas_iguais_a_carteira(simulado):
+    cubo, df_carteira = simulado
+    por_mes = cubo.query(["operacoes_ativas", "saldo_devedor"], agrupar=["mes"])["valores"]
+    np.testing.assert_array_equal(por_mes["operacoes_ativas"], df_carteira["operacoes_ativas"].to_numpy())
+    np.testing.assert_allclose(por_mes["saldo_devedor"], df_carteira["saldo_devedor_carteira"].to_numpy(),
+                               atol=0.01)
+
+
+def test_estoque_por_idade_usa_ultima_idade_de_cada_safra(simulado):
+    cubo, _ = simulado
+    por_idade = cubo.query(["saldo_devedor", "honras"], agrupar=["safra"], eixo_tempo="idade")["valores"]
+    calendario = cubo.query(["saldo_devedor", "honras"], agrupar=["safra"])["valores"]
+
+    # No horizonte completo, a última idade observada de cada safra é o último mês da simulação
+    np.testing.assert_allclose(por_idade["saldo_devedor"], calendario["saldo_devedor"])
+    np.testing.assert_allclose(por_idade["honras"], calendario["honras"])
+    assert (por_idade["saldo_devedor"][1:] > 0).any()
+
+
+def test_estoque_por_idade_em_recorte(simulado):
+    cubo, _ = simulado
+    saldo = cubo.data[..., IDX["saldo_devedor"]].sum(axis=0)  # (safra, mes)
+    valores = cubo.query(["saldo_devedor"], agrupar=["safra"], meses=(1, 6),
+                         eixo_tempo="idade")["valores"]["saldo_devedor"]
+    for safra in range(cubo.meses):
+        idade = min(6, cubo.meses - safra) - 1
+        assert valores[safra] == pytest.approx(saldo[safra, safra + idade])
+
+    # Safras sem nenhuma idade observada no recorte ficam zeradas
+    tardio = cubo.query(["saldo_devedor"], agrupar=["safra"], meses=(20, 24),
+                        eixo_tempo="idade")["valores"]["saldo_devedor"]
+    assert (tardio[cubo.meses - 19:] == 0).all()
+
+
+def test_fluxos_somados_no_total(simulado):
+    cubo, df_carteira = simulado
+    total = cubo.query(["operacoes_contratadas"], agrupar=[])["valores"]["operacoes_contratadas"]
+    assert total == df_carteira["operacoes_novas_mes"].sum()
+
+
+def test_persistencia(simulado):
+    cubo, _ = simulado
+    np.testing.assert_array_equal(ResultCube.from_bytes(cubo.to_bytes()).data, cubo.data)
+
+
+def test_memoria_estimada_inclui_cubo():
+    from services.simulation import get_default_params
+
+    params = get_default_params()
+    params["simulation_months"] = 600
+    diferenca = estimate_cost(params, com_cubo=True)["memoria_mb_estimada"] - estimate_cost(params)["memoria_mb_estimada"]
+    assert diferenca == pytest.approx(ResultCube(600).data.nbytes / 1024 ** 2, abs=0.2)
+
+
+def test_cubo_so_e_montado_com_historico(client, monkeypatch, tmp_path):
+    import app as app_module
+    from services.run_store import RunStore
+
+    montados = []
+
+    class CuboContado(ResultCube):
+        def __init__(self, *args, **kwargs):
+            montados.append(1)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "ResultCube", CuboContado)
+    monkeypatch.setattr(app_module, "result_cache", app_module.ResultCache())
+    corpo = {"simulation_months": 600}
+
+    # Sem histórico o cubo não teria onde ser consultado
+    monkeypatch.setattr(app_module, "run_store", None)
+    sem = client.post("/simulate/estimate", json=corpo).get_json()["estimate"]
+    client.post("/simulate", json={"simulation_months": 12, "random_seed": 31})
+    assert montados == []
+
+    monkeypatch.setattr(app_module, "run_store", RunStore(str(tmp_path / "runs.db")))
+    com = client.post("/simulate/estimate", json=corpo).get_json()["estimate"]
+    assert com["memoria_mb_estimada"] > sem["memoria_mb_estimada"]
+    run_id = client.post("/simulate", json={"simulation_months": 12, "random_seed": 32}).get_json()["run_id"]
+    assert montados == [1]
+    assert client.get(f"/runs/{run_id}/cube").status_code == 200
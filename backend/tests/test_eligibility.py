@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.eligibility import APROVADO, REPROVADO, EligibilityEngine
+
+
+def _solicitacoes(valores, porte="EPP"):
+    return pd.DataFrame({
+        "porte": porte,
+        "valor_solicitado": valores,
+        "prazo": 24,
+        "faturamento_mensal": 300_000.0,
+        "percentual_garantia": 1.0,
+    })
+
+
+def _sem_concessao():
+    return {"taxa_concessao": 0.0, "multiplo_ticket_alerta": 100.0}
+
+
+def _em_blocos(engine, df, tamanho):
+    blocos = (df.iloc[i:i + tamanho] for i in range(0, len(df), tamanho))
+    return pd.concat(engine.score_stream(blocos), ignore_index=True)
+
+
+def test_reprovada_por_folga_nao_consome_folga():
+    fundo = {"limite_operacional": 100_000.0, "valor_garantido": 0.0}
+    engine = EligibilityEngine(_sem_concessao(), fundo)
+    resultado = engine.score(_solicitacoes([60_000.0, 50_000.0, 30_000.0]))
+
+    assert list(resultado["decisao"]) == [APROVADO, REPROVADO, APROVADO]
+    assert resultado["motivos"][1] == "SEM_FOLGA_ALAVANCAGEM"
+    assert engine.folga_restante == pytest.approx(10_000.0)
+
+
+@pytest.mark.parametrize("tamanho", [1, 2, 7, 50])
+def test_decisoes_nao_dependem_dos_blocos(tamanho):
+    rng = np.random.default_rng(0)
+    df = _solicitacoes(rng.uniform(1_000, 200_000, 200).round(2))
+    df.loc[::11, "porte"] = "XYZ"  # reprovações por regra no meio do lote
+    fundo = {"limite_operacional": 5_000_000.0, "valor_garantido": 1_000_000.0}
+
+    inteiro_engine = EligibilityEngine(_sem_concessao(), fundo)
+    inteiro = inteiro_engine.score(df)
+    blocos_engine = EligibilityEngine(_sem_concessao(), fundo)
+    em_blocos = _em_blocos(blocos_engine, df, tamanho)
+
+    pd.testing.assert_frame_equal(inteiro, em_blocos)
+    assert blocos_engine.folga_restante == inteiro_engine.folga_restante
+    assert (inteiro["decisao"] == REPROVADO).any() and (inteiro["decisao"] == APROVADO).any()
+
+
+def test_ids_continuam_entre_blocos():
+    engine = EligibilityEngine()
+    resultado = _em_blocos(engine, _solicitacoes([10_000.0] * 5), 2)
+    assert list(resultado["id"]) == [0, 1, 2, 3, 4]
+
+    engine.reset()
+    assert list(engine.score(_solicitacoes([10_000.0]))["id"]) == [0]
+
+
+def test_regras_rigidas_reprovam():
+    df = _solicitacoes([100.0, 10_000.0])
+    df.loc[1, "prazo"] = 600
+    resultado = EligibilityEngine().score(df)
+    assert list(resultado["decisao"]) == [REPROVADO, REPROVADO]
+    assert "TICKET_FORA_LIMITE" in resultado["motivos"][0]
+    assert "PRAZO_INVALIDO" in resultado["motivos"][1]
@@ -0,0 +1,129 @@
+import gzip
+import os
+
+import orjson
+from flask import Flask
+
+from services.result_cache import ResultCache
+from utils.http import MIN_COMPRESS_SIZE, StaticVersioner, init_http_optimizations, source_version
+
+
+def _app(tmp_path):
+    (tmp_path / "app.js").write_text("console.log(1);\n" * 200)
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path="/static")
+    init_http_optimizations(app)
+
+    @app.route("/grande")
+    def grande():
+        return app.response_class(b"[" + b"1," * MIN_COMPRESS_SIZE + b"1]", mimetype="application/json")
+
+    @app.route("/pequeno")
+    def pequeno():
+        return app.response_class(b"[1]", mimetype="application/json")
+
+    return app
+
+
+def test_compressao_gzip_negociada(tmp_path):
+    client = _app(tmp_path).test_client()
+
+    resposta = client.get("/grande", headers={"Accept-Encoding": "gzip"})
+    assert resposta.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resposta.headers["Vary"]
+    assert orjson.loads(gzip.decompress(resposta.data))[-1] == 1
+
+    assert "Content-Encoding" not in client.get("/grande").headers
+    assert "Content-Encoding" not in client.get("/pequeno", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_estaticos_versionados_pelo_conteudo(tmp_path):
+    app = _app(tmp_path)
+    with app.test_request_context():
+        from flask import url_for
+        url = url_for("static", filename="app.js")
+    assert "?v=" in url
+
+    client = app.test_client()
+    resposta = client.get(url)
+    assert resposta.cache_control.immutable
+    assert resposta.cache_control.max_age > 0
+    resposta.close()
+    resposta = client.get("/static/app.js")
+    assert resposta.cache_control.no_cache
+    resposta.close()
+
+
+def test_versao_muda_com_o_arquivo(tmp_path):
+    arquivo = tmp_path / "a.css"
+    arquivo.write_text("a{}")
+    versioner = StaticVersioner(str(tmp_path))
+    antes = versioner.version("a.css")
+
+    arquivo.write_text("b{}")
+    os.utime(arquivo, (1, 1))
+    assert versioner.version("a.css") != antes
+    assert versioner.version("inexistente.css") == ""
+
+
+def test_result_cache_lru_por_bytes():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a")["body"] == b"12345"
+
+    # "b" é a menos recente e sai para abrir espaço
+    cache.put("c", b"123")
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    # Corpos maiores que o limite não são guardados
+    cache.put("d", b"x" * 11)
+    assert cache.get("d") is None
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 8
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_simulate_responde_304_para_o_mesmo_etag(client):
+    params = {"simulation_months": 12, "random_seed": 11}
+    primeira = client.post("/simulate", json=params)
+    assert primeira.status_code == 200
+    etag = primeira.headers["ETag"]
+
+    condicional = client.post("/simulate", json=params, headers={"If-None-Match": etag})
+    assert condicional.status_code == 304
+    assert condicional.data == b""
+
+    repetida = client.post("/simulate", json=params)
+    assert repetida.headers["X-Simulation-Cache"] == "hit"
+    assert repetida.data == primeira.data
+
+    outra = client.post("/simulate", json={**params, "random_seed": 12}, headers={"If-None-Match": etag})
+    assert outra.status_code == 200
+
+
+def test_versao_do_codigo_ignora_testes(tmp_path):
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "app.py").write_text("x = 1\n")
+    (tmp_path / "tests" / "test_app.py").write_text("y = 1\n")
+    versao = source_version(str(tmp_path))
+
+    (tmp_path / "tests" / "test_app.py").write_text("y = 2\n")
+    assert source_version(str(tmp_path)) == versao
+    (tmp_path / "app.py").write_text("x = 2\n")
+    assert source_version(str(tmp_path)) != versao
+
+
+def test_etag_de_simulate_muda_com_a_versao(client, monkeypatch):
+    import app as app_module
+
+    params = {"simulation_months": 12, "random_seed": 13}
+    etag = client.post("/simulate", json=params).headers["ETag"]
+    assert app_module.VERSAO_RESULTADOS in etag
+
+    # Depois de um deploy, o ETag antigo não valida mais o resultado
+    monkeypatch.setattr(app_module, "VERSAO_RESULTADOS", "outra")
+    resposta = client.post("/simulate", json=params, headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import orjson
+
+from services.jobs import JobRegistry
+
+
+def _aguardar(registry, job_id, timeout=10):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        job = registry.get(job_id)
+        if job["status"] in ("done", "error"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job não terminou")
+
+
+def _esperar_todos(registry, ids, timeout=10):
+    # Jobs já descartados também contam como terminados
+    limite = time.time() + timeout
+    while registry.pending_count() and time.time() < limite:
+        time.sleep(0.01)
+    assert registry.pending_count() == 0
+
+
+def test_job_concluido_com_progresso():
+    registry = JobRegistry()
+
+    def tarefa(report):
+        report({"etapa": 1})
+        return "ok"
+
+    job_id = registry.submit(tarefa, kind="teste")
+    job = _aguardar(registry, job_id)
+    assert job["status"] == "done"
+    assert job["result"] == "ok"
+    assert job["kind"] == "teste"
+    assert job["progress"] == {"etapa": 1}
+    assert registry.pending_count() == 0
+
+
+def test_erro_do_job_fica_registrado():
+    registry = JobRegistry()
+
+    def falhar(report):
+        raise ValueError("boom")
+
+    job = _aguardar(registry, registry.submit(falhar))
+    assert job["status"] == "error"
+    assert job["error"] == "boom"
+
+
+def test_limite_de_pendentes():
+    registry = JobRegistry(max_workers=1, max_pending=2)
+    liberar = threading.Event()
+    ids = [registry.submit(lambda report: liberar.wait(5)) for _ in range(2)]
+
+    assert registry.submit(lambda report: None) is None
+    assert registry.pending_count() == 2
+    liberar.set()
+    for job_id in ids:
+        _aguardar(registry, job_id)
+    assert registry.submit(lambda report: None) is not None
+
+
+def test_jobs_expirados_sao_descartados():
+    registry = JobRegistry(ttl_seconds=0.2)
+    job_id = registry.submit(lambda report: 1)
+    _aguardar(registry, job_id)
+    time.sleep(0.25)
+
+    registry.submit(lambda report: 2)
+    assert registry.get(job_id) is None
+    assert registry.get("inexistente") is None
+
+
+def test_concluidos_limitados_em_quantidade():
+    registry = JobRegistry(max_finished=2)
+    ids = [registry.submit(lambda report, i=i: i) for i in range(4)]
+    _esperar_todos(registry, ids)
+
+    assert [registry.get(job_id) is not None for job_id in ids] == [False, False, True, True]
+
+
+def test_concluidos_limitados_em_bytes():
+    registry = JobRegistry(max_result_bytes=25)
+    ids = [registry.submit(lambda report: b"x" * 10) for _ in range(3)]
+    _esperar_todos(registry, ids)
+
+    assert [registry.get(job_id) is not None for job_id in ids] == [False, True, True]
+    # Resultados que não são bytes (calibração) não contam no limite
+    outro = registry.submit(lambda report: {"resultado": 1})
+    _esperar_todos(registry, [outro])
+    assert registry.get(ids[1]) is not None and registry.get(outro) is not None
+
+
+def test_rota_de_status_devolve_o_resultado(client):
+    resposta = client.post("/simulate?async=1", json={"simulation_months": 12, "random_seed": 7})
+    assert resposta.status_code == 202
+    status_url = resposta.get_json()["status_url"]
+    assert resposta.headers["Location"] == status_url
+
+    limite = time.time() + 30
+    while True:
+        status = client.get(status_url)
+        if status.status_code != 202 or time.time() > limite:
+            break
+        assert status.headers["Retry-After"] == "1"
+        time.sleep(0.05)
+    assert status.status_code == 200
+    assert orjson.loads(status.data)["success"] is True
+
+    assert client.get("/simulate/jobs/inexistente").status_code == 404
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from services.admission import AdmissionController, estimate_cost
+from services.live import LiveSessionManager
+from services.simulation import SimulationCancelled
+from services.single_flight import canonical_params_key
+
+
+def _esperar(condicao, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            raise AssertionError("condição não atingida")
+        time.sleep(0.01)
+
+
+def _eventos(session, quantidade, timeout=5.0):
+    recebidos = []
+    limite = time.monotonic() + timeout
+    for evento in session.listen(heartbeat_seconds=0.05):
+        if evento is not None:
+            recebidos.append(evento)
+        if len(recebidos) >= quantidade:
+            return recebidos
+        if time.monotonic() > limite:
+            raise AssertionError(f"eventos recebidos: {[e[0] for e in recebidos]}")
+
+
+def test_deltas_simultaneos_nao_se_perdem():
+    manager = LiveSessionManager(lambda params, cancel: b"{}", canonical_params_key, debounce_seconds=0.01)
+    session = manager.create({"base": 0})
+    barreira = threading.Barrier(16)
+
+    def patch(i):
+        barreira.wait()
+        session.submit_delta({f"campo_{i}": i}, lambda params: [])
+
+    threads = [threading.Thread(target=patch, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert session.params == {"base": 0, **{f"campo_{i}": i for i in range(16)}}
+    assert session.version == 16
+    manager.close(session.id)
+
+
+def test_delta_invalido_nao_altera_sessao():
+    manager = LiveSessionManager(lambda params, cancel: b"{}", canonical_params_key)
+    session = manager.create({"a": 1})
+    versao, errors = session.submit_delta({"a": -1}, lambda p: [{"field": "a", "code": "below_min"}] if p["a"] < 0 else [])
+    assert versao is None and errors
+    assert session.params == {"a": 1} and session.version == 0
+    manager.close(session.id)
+
+
+def test_debounce_agrupa_deltas():
+    calculados = []
+
+    def compute(params, cancel):
+        calculados.append(params["v"])
+        return b"{}"
+
+    manager = LiveSessionManager(compute, canonical_params_key, debounce_seconds=0.2)
+    session = manager.create({"v": 0})
+    for v in range(1, 6):
+        session.submit_delta({"v": v}, lambda p: [])
+    _esperar(lambda: session.info()["stats"]["calculadas"] == 1)
+    assert calculados == [5]
+    manager.close(session.id)
+
+
+def test_delta_novo_cancela_simulacao_em_andamento():
+    iniciou = threading.Event()
+
+    def compute(params, cancel):
+        if params["v"] == 1:
+            iniciou.set()
+            if cancel.wait(5):
+                raise SimulationCancelled(3)
+        return b"{}"
+
+    manager = LiveSessionManager(compute, canonical_params_key, debounce_seconds=0.0)
+    session = manager.create({"v": 0})
+    session.submit({"v": 1})
+    assert iniciou.wait(5)
+    session.submit({"v": 2})
+    eventos = _eventos(session, 4)
+    assert [e[0] for e in eventos] == ["executando", "cancelado", "executando", "resultado"]
+    manager.close(session.id)
+
+
+def test_voltar_aos_parametros_cancelados_agenda_novo_calculo():
+    iniciou = threading.Event()
+    liberar = threading.Event()
+    chamadas = []
+
+    def compute(params, cancel):
+        chamadas.append(params["v"])
+        if len(chamadas) == 1:
+            iniciou.set()
+            # Continua "em andamento" após o cancelamento até o teste reenviar A
+            cancel.wait(5)
+            liberar.wait(5)
+            raise SimulationCancelled(1)
+        return b"{}"
+
+    manager = LiveSessionManager(compute, canonical_params_key, debounce_seconds=0.0)
+    session = manager.create({"v": 0})
+    session.submit({"v": "A"})
+    assert iniciou.wait(5)
+    session.submit({"v": "B"})
+    versao = session.submit({"v": "A"})
+    liberar.set()
+
+    eventos = _eventos(session, 4)
+    assert [e[0] for e in eventos] == ["executando", "cancelado", "executando", "resultado"]
+    assert eventos[-1][1] == versao
+    assert chamadas == ["A", "A"]
+    assert session.info()["stats"]["reaproveitadas"] == 0
+    manager.close(session.id)
+
+
+def test_cancelamento_interrompe_espera_na_fila(small_params):
+    estimate = estimate_cost(small_params)
+    controller = AdmissionController(max_concurrent=1, queue_timeout=30)
+    cancel = threading.Event()
+    resultado = {}
+
+    def aguardar():
+        inicio = time.monotonic()
+        try:
+            with controller.worker_slot(estimate, cancel):
+                resultado["executou"] = True
+        except SimulationCancelled:
+            resultado["cancelada_em"] = time.monotonic() - inicio
+
+    with controller.worker_slot(estimate):
+        t = threading.Thread(target=aguardar)
+        t.start()
+        _esperar(lambda: controller.stats()["queued"] == 1)
+        cancel.set()
+        t.join(5)
+
+    assert "executou" not in resultado
+    assert resultado["cancelada_em"] < 2
+    assert controller.stats()["queued"] == 0
+    # O slot ocupado continua livre para a próxima simulação
+    with controller.worker_slot(estimate):
+        pass
+
+
+def test_patch_pela_rota_valida_sobre_os_ultimos_parametros(client):
+    response = client.post("/live/sessions", json={"simulation_months": 12})
+    assert response.status_code == 201
+    params_url = response.get_json()["params_url"]
+
+    assert client.patch(params_url, json={"prop_MEI": 0.9}).status_code == 400
+    response = client.patch(params_url, json={"multiplicador_volume_operacoes": 1.2})
+    assert response.status_code == 202 and response.get_json()["versao"] == 2
+    client.delete(params_url.rsplit("/", 1)[0])
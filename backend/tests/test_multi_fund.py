@@ -0,0 +1,104 @@
+import pytest
+
+from services import multi_fund
+from services.admission import AdmissionController, combine_estimates, estimate_cost
+from services.multi_fund import MAX_FUNDOS, montar_params_fundos, run_multi_fund_simulation
+
+
+class _ExecutorSerial:
+    """Substitui o ProcessPoolExecutor registrando o número de processos pedido"""
+
+    pedidos = []
+
+    def __init__(self, max_workers=None, **kwargs):
+        self.pedidos.append(max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, itens):
+        return map(fn, itens)
+
+
+def test_montar_params_fundos_limita_numero_de_fundos():
+    with pytest.raises(ValueError):
+        montar_params_fundos([{}] * (MAX_FUNDOS + 1))
+
+
+def test_sementes_dos_fundos_sao_independentes_e_reprodutiveis():
+    a = montar_params_fundos([{}, {}], master_seed=7)
+    b = montar_params_fundos([{}, {}], master_seed=7)
+    assert [p["random_seed"] for p in a] == [p["random_seed"] for p in b]
+    assert a[0]["random_seed"] != a[1]["random_seed"]
+
+
+def test_max_workers_do_cliente_limitado_as_cpus(monkeypatch):
+    monkeypatch.setattr(multi_fund.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(multi_fund, "ProcessPoolExecutor", _ExecutorSerial)
+    _ExecutorSerial.pedidos = []
+
+    resultado = run_multi_fund_simulation([{}, {}, {}], {"simulation_months": 6}, max_workers=500)
+
+    assert _ExecutorSerial.pedidos == [2]
+    assert len(resultado["fundos"]) == 3
+
+
+def test_combine_estimates_soma_os_fundos(small_params):
+    params = montar_params_fundos([{}, {}], small_params)
+    individual = estimate_cost(params[0])
+    total = combine_estimates([estimate_cost(p) for p in params])
+    assert total["operacoes"] == 2 * individual["operacoes"]
+    assert total["meses"] == individual["meses"]
+
+
+def test_rota_recusa_fundos_demais(client):
+    response = client.post("/simulate/multi", json={"fundos": [{}] * (MAX_FUNDOS + 1)})
+    assert response.status_code == 400
+    assert response.get_json()["errors"][0]["code"] == "too_many"
+
+
+def test_rota_passa_pela_admissao_com_custo_somado(client, monkeypatch):
+    import app as app_module
+
+    # Um fundo cabe no orçamento, dois não
+    por_fundo = estimate_cost(montar_params_fundos([{}], {"simulation_months": 12})[0])["operacoes"]
+    controller = AdmissionController(max_operations=por_fundo + 1)
+    monkeypatch.setattr(app_module, "admission", controller)
+
+    corpo = {"fundos": [{}, {}], "parametros_comuns": {"simulation_months": 12}}
+    response = client.post("/simulate/multi", json=corpo)
+
+    assert response.status_code == 422
+    assert response.get_json()["estimate"]["operacoes"] > por_fundo
+    assert controller.stats()["rejected_budget"] == 1
+
+
+def test_rota_respeita_limite_por_cliente(client, monkeypatch):
+    import app as app_module
+
+    controller = AdmissionController(max_per_client=0)
+    monkeypatch.setattr(app_module, "admission", controller)
+
+    response = client.post("/simulate/multi", json={"fundos": [{}], "parametros_comuns": {"simulation_months": 12}})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_rota_admite_e_consolida(client, monkeypatch):
+    import app as app_module
+
+    controller = AdmissionController()
+    monkeypatch.setattr(app_module, "admission", controller)
+
+    corpo = {"fundos": [{"nome": "A"}, {"nome": "B"}], "parametros_comuns": {"simulation_months": 12},
+             "max_workers": 1}
+    response = client.post("/simulate/multi", json=corpo)
+
+    assert response.status_code == 200
+    assert [f["nome"] for f in response.get_json()["fundos"]] == ["A", "B"]
+    assert controller.stats()["admitted"] == 1
+    assert controller.stats()["running"] == 0
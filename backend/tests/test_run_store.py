@@ -0,0 +1,64 @@
+import os
+import threading
+
+import pytest
+
+from services.run_store import RunStore
+from services.simulation import build_resumo, run_simulation
+from services.single_flight import canonical_params_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RunStore(str(tmp_path / "runs.db"))
+
+
+@pytest.fixture
+def app_store(store, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "run_store", store)
+    monkeypatch.setattr(app_module, "result_cache", app_module.ResultCache())
+    return store
+
+
+def test_desativado_sem_configuracao(monkeypatch, tmp_path):
+    monkeypatch.delenv("RUN_STORE_DB", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert RunStore.from_env() is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_get_query(store, small_params):
+    df_carteira, df_fundo, _ = run_simulation(small_params)
+    resumo = build_resumo(df_carteira, df_fundo)
+    key = canonical_params_key(small_params)
+
+    run_id = store.save(key, small_params, resumo, df_carteira, df_fundo)
+    # Mesmos parâmetros atualizam a mesma execução
+    assert store.save(key, small_params, resumo, df_carteira, df_fundo) == run_id
+
+    run = store.get(run_id)
+    assert run["params_hash"] == key
+    assert run["carteira"]["length"] == len(df_carteira)
+    assert [r["id"] for r in store.query(filters=[("params_hash", "=", key)])] == [run_id]
+    assert store.delete(run_id) and store.get(run_id) is None
+
+
+def test_simulate_grava_execucao(client, app_store):
+    body = client.post("/simulate", json={"simulation_months": 12}).get_json()
+    assert body["run_id"] is not None
+    assert app_store.stats()["runs"] == 1
+
+
+def test_recalculo_ao_vivo_nao_grava(client, app_store):
+    import app as app_module
+
+    params = app_module.merge_params({"simulation_months": 12, "random_seed": 5})
+    app_module.compute_live_body(params, threading.Event())
+    assert app_store.stats()["runs"] == 0
+
+    # A submissão dos mesmos parâmetros não reaproveita o resultado ao vivo e grava a execução
+    body = client.post("/simulate?tabelas=paginadas", json=params).get_json()
+    assert body["run_id"] is not None
+    assert app_store.stats()["runs"] == 1
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import serialization
+from services.serialization import dataframe_to_columns, dumps, loads
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "inteiro": np.arange(3, dtype=np.int32),
+        "real": np.array([0.5, np.nan, 2.0], dtype=np.float32),
+        "flag": [True, False, True],
+        "texto": ["a", None, "c"],
+        "misto": ["x", np.nan, 1],
+    })
+
+
+def test_colunas_numericas_viram_arrays_largos(df):
+    tabela = dataframe_to_columns(df)
+
+    assert tabela["columns"] == ["inteiro", "real", "flag", "texto", "misto"]
+    assert tabela["length"] == 3
+    assert tabela["data"]["inteiro"].dtype == np.int64
+    assert tabela["data"]["real"].dtype == np.float64
+    assert tabela["data"]["flag"].dtype == np.bool_
+    assert tabela["data"]["texto"] == ["a", None, "c"]
+    assert tabela["data"]["misto"] == ["x", None, 1]
+
+
+def _esperado():
+    return {
+        "columns": ["inteiro", "real", "flag", "texto", "misto"],
+        "length": 3,
+        "data": {
+            "inteiro": [0, 1, 2],
+            "real": [0.5, None, 2.0],
+            "flag": [True, False, True],
+            "texto": ["a", None, "c"],
+            "misto": ["x", None, 1],
+        },
+    }
+
+
+def test_ida_e_volta_com_nan_como_null(df):
+    corpo = dumps({"tabela": dataframe_to_columns(df), "escalar": np.float64(1.5)})
+
+    assert isinstance(corpo, bytes)
+    assert loads(corpo) == {"tabela": _esperado(), "escalar": 1.5}
+
+
+def test_fallback_da_biblioteca_padrao(df, monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    payload = {"tabela": dataframe_to_columns(df), "matriz": np.eye(2), "escalar": np.int64(3)}
+
+    corpo = dumps(payload)
+    assert json.loads(corpo) == {"tabela": _esperado(), "matriz": [[1.0, 0.0], [0.0, 1.0]], "escalar": 3}
+    assert loads(corpo) == json.loads(corpo)
+
+    with pytest.raises(TypeError):
+        dumps({"objeto": object()})
@@ -0,0 +1,111 @@
+import gc
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import shared_results
+from services.cube import ResultCube
+from services.serialization import dataframe_to_columns
+from services.simulation import run_simulation
+from utils.processes import process_context
+
+
+def _exportar():
+    df = pd.DataFrame({"a": np.arange(5, dtype=np.int64), "b": np.linspace(0, 1, 5), "c": list("vwxyz")})
+    cubo = np.arange(24, dtype=np.float64).reshape(2, 3, 4)
+    return df, cubo, shared_results.exportar_resultado({"t": dataframe_to_columns(df)}, {"cubo": cubo})
+
+
+def test_ida_e_volta_sem_copia():
+    df, cubo, descritor = _exportar()
+    resultado = shared_results.ResultadoCompartilhado(descritor)
+
+    pd.testing.assert_frame_equal(resultado.dataframe("t"), df)
+    np.testing.assert_array_equal(resultado.array("cubo"), cubo)
+    assert resultado.tabela("t")["data"]["c"] == list("vwxyz")
+
+
+def test_bloco_fechado_quando_o_ultimo_array_sai():
+    _, cubo, descritor = _exportar()
+    antes = shared_results.estatisticas()["blocos_ativos"]
+
+    resultado = shared_results.ResultadoCompartilhado(descritor)
+    mapa = weakref.ref(resultado._mapa)
+    array = resultado.array("cubo")
+    del resultado
+    gc.collect()
+
+    # O array ainda aponta para o bloco: o mapeamento continua aberto
+    assert mapa() is not None and mapa().aberto
+    assert shared_results.estatisticas()["blocos_ativos"] == antes + 1
+    np.testing.assert_array_equal(array, cubo)
+
+    del array
+    gc.collect()
+    assert mapa() is None
+    assert shared_results.estatisticas()["blocos_ativos"] == antes
+
+
+def test_nome_removido_apos_importar():
+
+    _, _, descritor = _exportar()
+    resultado = shared_results.ResultadoCompartilhado(descritor)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=descritor["nome"])
+    del resultado
+
+
+def test_simulacao_em_processo_igual_a_local(small_params):
+    cubo_local = ResultCube(small_params["simulation_months"])
+    df_carteira, df_fundo, df_operacoes = run_simulation(small_params, cubo=cubo_local)
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=process_context()) as executor:
+        carteira, fundo, operacoes, cubo = shared_results.simular_em_processo(executor, small_params)
+        sem_cubo = shared_results.simular_em_processo(executor, small_params, com_cubo=False)
+
+    pd.testing.assert_frame_equal(carteira, df_carteira)
+    pd.testing.assert_frame_equal(fundo, df_fundo)
+    assert operacoes["length"] == len(df_operacoes)
+    np.testing.assert_array_equal(operacoes["data"]["valor_financiado"], df_operacoes["valor_financiado"].to_numpy())
+    np.testing.assert_array_equal(cubo.data, cubo_local.data)
+    assert sem_cubo[3] is None
+    pd.testing.assert_frame_equal(sem_cubo[0], df_carteira)
+
+
+def _existe(nome):
+    try:
+        shared_memory.SharedMemory(name=nome).close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def test_falha_na_importacao_remove_o_bloco(small_params, monkeypatch):
+    nomes = []
+
+    def importar(descritor):
+        nomes.append(descritor["nome"])
+        raise MemoryError
+
+    monkeypatch.setattr(shared_results, "ResultadoCompartilhado", importar)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(MemoryError):
+            shared_results.simular_em_processo(executor, small_params, com_cubo=False)
+    assert not _existe(nomes[0])
+
+
+def test_resultado_abandonado_e_removido():
+    _, _, descritor = _exportar()
+    futuro = Future()
+    futuro.add_done_callback(shared_results._descartar)
+    assert _existe(descritor["nome"])
+    futuro.set_result(descritor)
+    assert not _existe(descritor["nome"])
+
+
+def test_pools_nao_usam_fork():
+    assert process_context().get_start_method() in ("forkserver", "spawn")
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.simulation import SimulationCancelled, escolher_parcela_inadimplencia, run_simulation
+
+
+def _simular(params):
+    return run_simulation(params)
+
+
+def test_mesma_semente_mesmo_resultado(small_params):
+    a = run_simulation(small_params)
+    b = run_simulation(small_params)
+    for x, y in zip(a, b):
+        pd.testing.assert_frame_equal(x, y)
+
+
+def test_resultado_deterministico_em_threads(small_params):
+    sementes = [1, 2, 3, 4] * 3
+    lista = [dict(small_params, random_seed=s) for s in sementes]
+    serial = [_simular(p) for p in lista]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        paralelo = list(executor.map(_simular, lista))
+
+    for esperado, obtido in zip(serial, paralelo):
+        for x, y in zip(esperado, obtido):
+            pd.testing.assert_frame_equal(x, y)
+
+
+def test_simulacao_nao_altera_estado_global(small_params):
+    np.random.seed(123)
+    esperado = np.random.rand()
+    np.random.seed(123)
+    run_simulation(small_params)
+    assert np.random.rand() == esperado
+
+
+def test_parcela_inadimplencia_dentro_do_prazo():
+    rng = np.random.RandomState(0)
+    for prazo in (1, 2, 3, 12, 36):
+        parcelas = [escolher_parcela_inadimplencia(prazo, rng) for _ in range(200)]
+        assert min(parcelas) >= 1 and max(parcelas) <= prazo
+
+
+def test_cancelamento_no_limite_do_mes(small_params):
+    class CancelaNoMes:
+        def __init__(self):
+            self.verificacoes = 0
+
+        def is_set(self):
+            self.verificacoes += 1
+            return self.verificacoes > 3
+
+    with pytest.raises(SimulationCancelled) as exc:
+        run_simulation(small_params, cancel=CancelaNoMes())
+    assert exc.value.mes == 4
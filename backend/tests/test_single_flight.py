@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from services.single_flight import (
+    SingleFlight,
+    SQLiteSingleFlight,
+    canonical_params_key,
+    create_single_flight,
+)
+
+
+def test_chave_canonica_independe_da_ordem():
+    assert canonical_params_key({"a": 1, "b": [1, 2]}) == canonical_params_key({"b": [1, 2], "a": 1})
+    assert canonical_params_key({"a": 1}) != canonical_params_key({"a": 2})
+
+
+def _concorrentes(flight, n=4):
+    """Dispara n chamadas da mesma chave enquanto o líder está bloqueado"""
+    liberar = threading.Event()
+    chamadas = []
+    resultados = []
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(5)
+        return b"corpo"
+
+    def chamar():
+        resultados.append(flight.do("k", calcular))
+
+    threads = [threading.Thread(target=chamar) for _ in range(n)]
+    for t in threads:
+        t.start()
+    # Espera todos entrarem (um líder e n-1 aguardando) antes de liberar o cálculo
+    for _ in range(500):
+        if flight.stats()["coalesced"] == n - 1:
+            break
+        threading.Event().wait(0.01)
+    liberar.set()
+    for t in threads:
+        t.join(5)
+    return chamadas, resultados
+
+
+@pytest.mark.parametrize("criar", [SingleFlight, None])
+def test_chamadas_concorrentes_calculam_uma_vez(tmp_path, criar):
+    flight = criar() if criar else SQLiteSingleFlight(str(tmp_path / "sf.db"), poll_interval=0.01)
+    chamadas, resultados = _concorrentes(flight)
+
+    assert len(chamadas) == 1
+    assert sorted(r[1] for r in resultados) == [False, True, True, True]
+    assert all(r[0] == b"corpo" for r in resultados)
+    stats = flight.stats()
+    assert stats["computations"] == 1
+    assert stats["computations_saved"] == 3
+    assert stats["in_flight"] == 0
+
+
+def test_erro_propaga_e_libera_a_chave():
+    flight = SingleFlight()
+
+    def falhar():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", falhar)
+    assert flight.do("k", lambda: b"ok") == (b"ok", False)
+
+
+def test_sqlite_compartilha_resultado_entre_instancias(tmp_path):
+    caminho = str(tmp_path / "sf.db")
+    primeiro = SQLiteSingleFlight(caminho)
+    segundo = SQLiteSingleFlight(caminho)
+
+    assert primeiro.do("k", lambda: b"um") == (b"um", False)
+    # Dentro de result_ttl o outro "worker" recebe o resultado pronto
+    assert segundo.do("k", lambda: b"dois") == (b"um", True)
+
+
+def test_sqlite_lider_morto_nao_trava_quem_aguarda(tmp_path):
+    caminho = str(tmp_path / "sf.db")
+    flight = SQLiteSingleFlight(caminho, poll_interval=0.01, stale_after=0.2)
+    # Linha 'running' de um líder que morreu sem terminar (não renova updated_at)
+    with sqlite3.connect(caminho) as conn:
+        conn.execute("INSERT INTO flights (key, status, updated_at) VALUES ('k', 'running', ?)", (time.time(),))
+
+    inicio = time.monotonic()
+    assert flight.do("k", lambda: b"local") == (b"local", False)
+    assert time.monotonic() - inicio < 5
+
+
+def test_sqlite_heartbeat_mantem_o_lider_vivo(tmp_path):
+    caminho = str(tmp_path / "sf.db")
+    opcoes = {"poll_interval": 0.01, "stale_after": 0.2, "heartbeat_interval": 0.02}
+    lider = SQLiteSingleFlight(caminho, **opcoes)
+    seguidor = SQLiteSingleFlight(caminho, **opcoes)
+    iniciou = threading.Event()
+    resultados = {}
+
+    def calcular():
+        iniciou.set()
+        # Bem mais longo que stale_after: só a renovação evita que o seguidor desista
+        time.sleep(0.6)
+        return b"lider"
+
+    t = threading.Thread(target=lambda: resultados.setdefault("lider", lider.do("k", calcular)))
+    t.start()
+    assert iniciou.wait(5)
+    assert seguidor.do("k", lambda: b"seguidor") == (b"lider", True)
+    t.join(5)
+    assert resultados["lider"] == (b"lider", False)
+
+
+def test_create_single_flight(monkeypatch, tmp_path):
+    monkeypatch.delenv("SIMULATE_SINGLE_FLIGHT", raising=False)
+    assert isinstance(create_single_flight(), SingleFlight)
+
+    monkeypatch.setenv("SIMULATE_SINGLE_FLIGHT", "sqlite")
+    monkeypatch.setenv("SIMULATE_SINGLE_FLIGHT_DB", str(tmp_path / "sf.db"))
+    assert isinstance(create_single_flight(), SQLiteSingleFlight)
@@ -0,0 +1,61 @@
+import numpy as np
+import orjson
+import pandas as pd
+
+from services.result_cache import TableCache
+from services.serialization import dataframe_to_columns
+
+
+def _tabela(n):
+    return dataframe_to_columns(pd.DataFrame({"valor": np.arange(n, dtype=np.float64), "nome": ["x"] * n}))
+
+
+def test_pagina_fatia_as_colunas():
+    cache = TableCache()
+    cache.put("k", "operacoes", _tabela(10))
+
+    pagina = cache.page("k", "operacoes", offset=8, limit=5)
+    assert pagina["length"] == 10
+    assert pagina["offset"] == 8
+    assert pagina["data"]["valor"].tolist() == [8.0, 9.0]
+    assert pagina["data"]["nome"] == ["x", "x"]
+    assert cache.page("k", "operacoes", offset=-3, limit=2)["data"]["valor"].tolist() == [0.0, 1.0]
+    assert len(cache.page("k", "operacoes")["data"]["valor"]) == 10
+    assert cache.page("k", "fundo") is None
+
+
+def test_limite_de_bytes_descarta_a_menos_recente():
+    # Cada tabela de 10 linhas: 80 bytes de float64 + 10 textos estimados em 64 bytes
+    cache = TableCache(max_bytes=2 * 720)
+    cache.put("a", "t", _tabela(10))
+    cache.put("b", "t", _tabela(10))
+    cache.page("a", "t")
+    cache.put("c", "t", _tabela(10))
+
+    assert cache.contains("a", "t")
+    assert not cache.contains("b", "t")
+    assert cache.contains("c", "t")
+    assert cache.stats() == {"entries": 2, "bytes": 2 * 720, "max_bytes": 2 * 720}
+
+    cache.put("grande", "t", _tabela(100))
+    assert not cache.contains("grande", "t")
+
+
+def test_simulacao_paginada_serve_as_operacoes(client):
+    params = {"simulation_months": 12, "random_seed": 21}
+    completa = orjson.loads(client.post("/simulate", json=params).data)["operacoes"]
+
+    resposta = orjson.loads(client.post("/simulate?tabelas=paginadas", json=params).data)
+    resumo = resposta["operacoes"]
+    assert "data" not in resumo
+    assert resumo["length"] == completa["length"]
+
+    pagina = client.get(resumo["page_url"] + "?offset=1&limit=3")
+    assert pagina.status_code == 200
+    assert pagina.cache_control.max_age == 3600
+    dados = orjson.loads(pagina.data)
+    assert dados["offset"] == 1
+    for coluna, valores in dados["data"].items():
+        assert valores == completa["data"][coluna][1:4]
+
+    assert client.get("/simulate/tables/inexistente/operacoes").status_code == 410
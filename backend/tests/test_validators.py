@@ -0,0 +1,54 @@
+from services.simulation import get_default_params
+from utils.validators import validate_simulation_params
+
+
+def _codigos(params):
+    return {(e["field"], e["code"]) for e in validate_simulation_params(params)}
+
+
+def test_padroes_validos():
+    assert validate_simulation_params(get_default_params()) == []
+
+
+def test_faixas_fora_de_ordem_sao_aceitas():
+    params = get_default_params()
+    params["faixas_operacoes"] = list(reversed(params["faixas_operacoes"]))
+    assert validate_simulation_params(params) == []
+
+
+def test_faixas_duplicadas_sao_recusadas():
+    params = get_default_params()
+    faixas = params["faixas_operacoes"]
+    params["faixas_operacoes"] = faixas + [dict(faixas[0])]
+    assert _codigos(params) == {(f"faixas_operacoes[{len(faixas)}].capital_ate", "duplicated")}
+
+
+def test_proporcoes_devem_somar_um():
+    params = get_default_params()
+    params["prop_MEI"] += 0.1
+    assert any(codigo == "sum_not_one" for _, codigo in _codigos(params))
+
+
+def test_aporte_extra_alem_do_horizonte_e_aceito():
+    params = get_default_params()
+    params["aportes_extra"] = [{"mes": params["simulation_months"] + 1, "valor": 1000}]
+    assert validate_simulation_params(params) == []
+
+
+def test_mes_do_aporte_extra_deve_ser_inteiro_positivo():
+    params = get_default_params()
+    params["aportes_extra"] = [{"mes": 0, "valor": 1000}, {"mes": 1.5, "valor": 1000}]
+    codigos = _codigos(params)
+    assert ("aportes_extra[0].mes", "below_min") in codigos
+    assert {campo for campo, _ in codigos} == {"aportes_extra[0].mes", "aportes_extra[1].mes"}
+
+
+def test_rota_simulate_aceita_horizonte_antes_dos_aportes_padrao(client):
+    # Os aportes padrão (meses 6 e 12) passam do horizonte de 10 meses
+    assert client.post("/simulate", json={"simulation_months": 10}).status_code == 200
+
+
+def test_rota_simulate_aceita_faixas_fora_de_ordem(client):
+    params = get_default_params()
+    corpo = {"simulation_months": 12, "faixas_operacoes": list(reversed(params["faixas_operacoes"]))}
+    assert client.post("/simulate", json=corpo).status_code == 200
@@ -0,0 +1,80 @@
+"""
+Acesso a bancos SQLite locais com pool de conexões.
+
+As conexões abrem em modo WAL (leitores não bloqueiam o escritor) e em
+autocommit; transações são explícitas via SQLitePool.transaction().
+"""
+
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def sqlite_path_from_url(url: str) -> str:
+    """Converte DATABASE_URL no formato sqlite:///arquivo.db para um caminho de arquivo"""
+    prefixo = "sqlite:///"
+    if url.startswith(prefixo):
+        return url[len(prefixo):]
+    if "://" in url:
+        raise ValueError(f"Apenas bancos SQLite são suportados (recebido: {url!r}).")
+    return url
+
+
+class SQLitePool:
+    """
+    Pool de conexões SQLite compartilhado entre threads.
+
+    Cada conexão é usada por uma thread de cada vez (check_same_thread=False
+    só permite passar a conexão entre threads, não usá-la em paralelo).
+    Não use ':memory:': cada conexão do pool teria um banco diferente.
+    """
+
+    def __init__(self, path: str, size: int = 5, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Empresta uma conexão do pool (em autocommit)"""
+        conn = self._pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Empresta uma conexão dentro de uma transação (commit ao sair, rollback em erro)"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def close(self):
+        """Fecha todas as conexões ociosas do pool"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,178 @@
+"""
+Otimizações HTTP da aplicação: compressão, cache condicional e cache de
+arquivos estáticos.
+
+- Compressão gzip/brotli negociada por Accept-Encoding; respostas grandes ou
+  em streaming são comprimidas em blocos, sem montar o corpo comprimido
+  inteiro em memória
+- Arquivos estáticos recebem um parâmetro ?v=<hash do conteúdo> no url_for
+  e, quando requisitados com ele, Cache-Control de longa duração (immutable)
+- source_version: hash do código-fonte, para que validadores (ETag) de
+  respostas calculadas mudem a cada deploy
+"""
+
+import gzip
+import hashlib
+import os
+import zlib
+from typing import Dict, Iterable, Tuple
+
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "text/html",
+    "text/css",
+    "text/csv",
+    "text/plain",
+    "text/javascript",
+    "text/event-stream",
+    "image/svg+xml",
+)
+MIN_COMPRESS_SIZE = 1024
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+
+def _choose_encoding() -> str:
+    """Escolhe a codificação aceita pelo cliente (brotli tem preferência)"""
+    oferecidas = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(oferecidas) or ""
+
+
+def _chunks(data: bytes) -> Iterable[bytes]:
+    for inicio in range(0, len(data), STREAM_CHUNK_SIZE):
+        yield data[inicio:inicio + STREAM_CHUNK_SIZE]
+
+
+def _stream_compress(chunks: Iterable[bytes], encoding: str) -> Iterable[bytes]:
+    """Comprime um iterável de blocos de bytes sob demanda"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            saida = compressor.process(chunk)
+            if saida:
+                yield saida
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            saida = compressor.compress(chunk)
+            if saida:
+                yield saida
+        yield compressor.flush()
+
+
+def _compress_bytes(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """after_request: comprime a resposta conforme Accept-Encoding"""
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or request.method == "HEAD"
+            or "Content-Encoding" in response.headers
+            or "no-transform" in response.headers.get("Cache-Control", "")
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        # Corpo produzido sob demanda (arquivos, SSE, geradores)
+        response.direct_passthrough = False
+        response.response = _stream_compress(response.iter_encoded(), encoding)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        if len(data) >= STREAM_THRESHOLD:
+            response.response = _stream_compress(_chunks(data), encoding)
+        else:
+            response.set_data(_compress_bytes(data, encoding))
+
+    if response.is_streamed:
+        response.headers.pop("Content-Length", None)
+    response.headers["Content-Encoding"] = encoding
+    # Bytes diferentes da versão original: o validador passa a ser fraco
+    # (If-None-Match usa comparação fraca, então continua validando)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+class StaticVersioner:
+    """Calcula (e memoriza por mtime) o hash do conteúdo dos arquivos estáticos"""
+
+    def __init__(self, static_folder: str):
+        self.static_folder = static_folder
+        self._cache: Dict[str, Tuple[float, str]] = {}
+
+    def version(self, filename: str) -> str:
+        caminho = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.path.getmtime(caminho)
+        except OSError:
+            return ""
+        memorizado = self._cache.get(filename)
+        if memorizado and memorizado[0] == mtime:
+            return memorizado[1]
+        with open(caminho, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        self._cache[filename] = (mtime, digest)
+        return digest
+
+
+def source_version(root: str, ignorar: Tuple[str, ...] = ("tests", "benchmarks", "__pycache__")) -> str:
+    """Hash (12 caracteres) dos arquivos .py sob root, exceto os diretórios em ignorar"""
+    digest = hashlib.sha256()
+    for diretorio, subdiretorios, arquivos in os.walk(root):
+        subdiretorios[:] = sorted(d for d in subdiretorios if d not in ignorar)
+        for nome in sorted(arquivos):
+            if nome.endswith(".py"):
+                caminho = os.path.join(diretorio, nome)
+                digest.update(os.path.relpath(caminho, root).encode("utf-8"))
+                with open(caminho, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def init_http_optimizations(app: Flask):
+    """Registra compressão e cache de estáticos na aplicação"""
+    versioner = StaticVersioner(app.static_folder)
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            versao = versioner.version(values["filename"])
+            if versao:
+                values["v"] = versao
+
+    @app.after_request
+    def cache_and_compress(response):
+        if request.endpoint == "static" and response.status_code in (200, 304):
+            if request.args.get("v"):
+                # URL muda junto com o conteúdo: pode ficar em cache indefinidamente
+                response.cache_control.no_cache = False
+                response.cache_control.public = True
+                response.cache_control.max_age = STATIC_MAX_AGE
+                response.cache_control.immutable = True
+            else:
+                response.cache_control.no_cache = True
+        return compress_response(response)
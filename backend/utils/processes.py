@@ -0,0 +1,18 @@
+"""
+Contexto de multiprocessing dos pools de processos da aplicação.
+
+O servidor web é multithread (requisições, jobs assíncronos, sessões ao
+vivo): um fork nesse estado copia locks que outras threads podem estar
+segurando e pode travar o processo filho. Os pools criam os workers com
+forkserver (ou spawn, onde forkserver não existe), a partir de um processo
+sem essas threads.
+"""
+
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+
+def process_context() -> BaseContext:
+    """Contexto forkserver, ou spawn na falta dele, para ProcessPoolExecutor(mp_context=...)"""
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
@@ -1,3 +1,10 @@
+import math
+from numbers import Integral, Real
+
+import numpy as np
+import pandas as pd
+
+
 def validate_credit_amount(amount):
     if amount <= 0:
         raise ValueError("Credit amount must be greater than zero.")
@@ -13,4 +20,280 @@ def validate_credit_application(data):
         raise ValueError("Credit application must include 'amount' and 'interest_rate'.")
     validate_credit_amount(data['amount'])
     validate_interest_rate(data['interest_rate'])
-    return True
\ No newline at end of file
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Validação em lote: todas as regras de todas as linhas, com máscaras
+# vetorizadas e sem exceções. O resultado é um relatório compacto com uma
+# linha por erro (row, field, code).
+# ---------------------------------------------------------------------------
+
+# Esquema: campo -> {"required", "type" ("number"|"integer"|"string"),
+#                    "min", "exclusive_min", "max", "choices"}
+CREDIT_APPLICATION_SCHEMA = {
+    "amount": {"required": True, "type": "number", "min": 0, "exclusive_min": True},
+    "interest_rate": {"required": True, "type": "number", "min": 0},
+}
+
+REPORT_COLUMNS = ["row", "field", "code"]
+
+
+def _column(data, field):
+    """Coluna de um DataFrame ou tabela Arrow (None se ausente)"""
+    if isinstance(data, pd.DataFrame):
+        return data[field].to_numpy() if field in data.columns else None
+    if field not in data.column_names:
+        return None
+    return data.column(field).to_numpy(zero_copy_only=False)
+
+
+def _as_columnar(data):
+    """Aceita DataFrame, tabela/lote Arrow, dict de colunas ou lista de dicts"""
+    if isinstance(data, pd.DataFrame) or hasattr(data, "column_names"):
+        return data
+    return pd.DataFrame(data)
+
+
+def _check_field(values, spec):
+    """Lista de (código, máscara) com os erros de um campo"""
+    erros = []
+    ausente = pd.isna(values) if values.dtype.kind in ("O", "f", "M") else np.zeros(len(values), dtype=bool)
+    erros.append(("missing", ausente))
+
+    tipo = spec.get("type", "number")
+    if tipo == "string":
+        invalido = ~ausente & ~np.fromiter((isinstance(v, str) for v in values), bool, len(values))
+        erros.append(("not_string", invalido))
+        if "choices" in spec:
+            escolhas = np.asarray(list(spec["choices"]), dtype=object)
+            erros.append(("invalid_choice", ~ausente & ~invalido & ~np.isin(values, escolhas)))
+        return erros
+
+    if values.dtype.kind == "b":
+        erros.append(("not_numeric", ~ausente))
+        return erros
+    if values.dtype.kind in ("i", "u", "f"):
+        numeros = values.astype(np.float64)
+    else:
+        numeros = np.array(pd.to_numeric(pd.Series(values), errors="coerce"), dtype=np.float64)
+        booleanos = np.fromiter((isinstance(v, (bool, np.bool_)) for v in values), bool, len(values))
+        numeros[booleanos] = np.nan
+        erros.append(("not_numeric", ~ausente & np.isnan(numeros)))
+
+    valido = np.isfinite(numeros)
+    erros.append(("not_finite", ~ausente & np.isinf(numeros)))
+    if tipo == "integer":
+        erros.append(("not_integer", valido & (numeros != np.round(numeros))))
+    if "min" in spec:
+        abaixo = numeros <= spec["min"] if spec.get("exclusive_min") else numeros < spec["min"]
+        erros.append(("below_min", valido & abaixo))
+    if "max" in spec:
+        erros.append(("above_max", valido & (numeros > spec["max"])))
+    if "choices" in spec:
+        erros.append(("invalid_choice", valido & ~np.isin(numeros, list(spec["choices"]))))
+    return erros
+
+
+def validate_batch(data, schema=None, offset=0):
+    """
+    Valida todas as linhas de um lote colunar sem lançar exceções.
+
+    data pode ser um DataFrame, uma tabela (ou RecordBatch) Arrow, um dict de
+    colunas ou uma lista de dicts. offset é somado ao número da linha (útil no
+    modo streaming). Retorna um DataFrame (row, field, code), vazio se não
+    houver erros.
+    """
+    schema = schema or CREDIT_APPLICATION_SCHEMA
+    data = _as_columnar(data)
+    n = data.num_rows if hasattr(data, "num_rows") else len(data)
+
+    linhas, campos, codigos = [], [], []
+
+    def registra(campo, codigo, idx):
+        if idx.size:
+            linhas.append(idx + offset)
+            campos.append(np.full(idx.size, campo, dtype=object))
+            codigos.append(np.full(idx.size, codigo, dtype=object))
+
+    for campo, spec in schema.items():
+        values = _column(data, campo)
+        if values is None:
+            if spec.get("required", False):
+                registra(campo, "missing", np.arange(n))
+            continue
+        for codigo, mascara in _check_field(values, spec):
+            if not spec.get("required", False) and codigo == "missing":
+                continue
+            registra(campo, codigo, np.flatnonzero(mascara))
+
+    if not linhas:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in zip(REPORT_COLUMNS, ("int64", "object", "object"))})
+    report = pd.DataFrame({
+        "row": np.concatenate(linhas).astype(np.int64),
+        "field": np.concatenate(campos),
+        "code": np.concatenate(codigos),
+    })
+    return report.sort_values("row", kind="stable").reset_index(drop=True)
+
+
+def iter_validate_batches(chunks, schema=None, chunk_size=10_000):
+    """
+    Valida um fluxo de blocos (DataFrames, lotes Arrow) ou de linhas (dicts).
+
+    Linhas avulsas são agrupadas em blocos de chunk_size. Gera um relatório
+    por bloco, com números de linha globais.
+    """
+    offset = 0
+    buffer = []
+    for item in chunks:
+        if isinstance(item, dict):
+            buffer.append(item)
+            if len(buffer) < chunk_size:
+                continue
+            item, buffer = buffer, []
+        elif buffer:
+            yield validate_batch(buffer, schema, offset)
+            offset += len(buffer)
+            buffer = []
+        report = validate_batch(item, schema, offset)
+        offset += item.num_rows if hasattr(item, "num_rows") else len(item)
+        yield report
+    if buffer:
+        yield validate_batch(buffer, schema, offset)
+
+
+# ---------------------------------------------------------------------------
+# Parâmetros da simulação
+# ---------------------------------------------------------------------------
+
+PORTES = ("MEI", "ME", "EPP")
+
+# campo -> (tipo, mínimo, máximo)
+SIMULATION_PARAM_RULES = {
+    "simulation_months": ("integer", 1, 600),
+    "start_year": ("integer", 1900, 2200),
+    "aporte_inicial_fundo": ("number", 0, None),
+    "aporte_mensal": ("number", 0, None),
+    "alavancagem_maxima": ("number", 0, None),
+    "taxa_recuperacao": ("number", 0, 1),
+    "prazo_medio_renegociacao": ("integer", 0, 600),
+    "prazo_honra": ("integer", 0, 600),
+    "prazo_recuperacao": ("integer", 0, 600),
+    "taxa_juros_cv": ("number", 0, None),
+    "taxa_concessao": ("number", 0, 1),
+    "meses_rampa_crescimento": ("integer", 0, 600),
+    "multiplicador_volume_operacoes": ("number", 0, None),
+    "ticket_cv": ("number", 0, None),
+    "prop_PRICE": ("number", 0, 1),
+    "prop_SAC": ("number", 0, 1),
+    "percentual_rendimento_selic": ("number", 0, None),
+    "random_seed": ("integer", 0, 2 ** 32 - 1),
+}
+for _porte in PORTES:
+    SIMULATION_PARAM_RULES.update({
+        f"prazo_operacao_{_porte}": ("integer", 1, 600),
+        f"percentual_garantia_{_porte}": ("number", 0, 1),
+        f"taxa_inadimplencia_{_porte}": ("number", 0, 1),
+        f"taxa_juros_media_anual_{_porte}": ("number", 0, None),
+        f"ticket_medio_{_porte}": ("number", 0, None),
+        f"prop_{_porte}": ("number", 0, 1),
+    })
+
+# Grupos de proporções que precisam somar 1
+SIMULATION_PROPORTIONS = {
+    "prop_porte": tuple(f"prop_{p}" for p in PORTES),
+    "prop_sistema": ("prop_PRICE", "prop_SAC"),
+}
+
+
+def _check_value(value, tipo, minimo=None, maximo=None):
+    """Código do erro de um valor escalar (None se válido)"""
+    if isinstance(value, bool) or not isinstance(value, Real):
+        return "not_numeric"
+    if not math.isfinite(value):
+        return "not_finite"
+    if tipo == "integer" and not (isinstance(value, Integral) or float(value).is_integer()):
+        return "not_integer"
+    if minimo is not None and value < minimo:
+        return "below_min"
+    if maximo is not None and value > maximo:
+        return "above_max"
+    return None
+
+
+def validate_simulation_params(params):
+    """
+    Valida tipos, intervalos e proporções dos parâmetros da simulação (já
+    mesclados com os padrões). Retorna a lista de erros
+    [{"field", "code"}], vazia se os parâmetros forem válidos.
+    """
+    erros = []
+
+    def erro(campo, codigo):
+        erros.append({"field": campo, "code": codigo})
+
+    for campo, (tipo, minimo, maximo) in SIMULATION_PARAM_RULES.items():
+        if campo not in params:
+            continue
+        codigo = _check_value(params[campo], tipo, minimo, maximo)
+        if codigo:
+            erro(campo, codigo)
+
+    for campo, valor in params.items():
+        if campo.startswith("Taxa_SELIC_"):
+            codigo = _check_value(valor, "number", 0, None)
+            if codigo:
+                erro(campo, codigo)
+
+    invalidos = {e["field"] for e in erros}
+    for grupo, campos in SIMULATION_PROPORTIONS.items():
+        if any(c not in params or c in invalidos for c in campos):
+            continue
+        if not math.isclose(sum(params[c] for c in campos), 1.0, abs_tol=1e-6):
+            erro(grupo, "sum_not_one")
+
+    escolhas = params.get("sistema_amortizacao_choices", ["PRICE", "SAC"])
+    if not isinstance(escolhas, list) or not escolhas or not set(escolhas) <= {"PRICE", "SAC"}:
+        erro("sistema_amortizacao_choices", "invalid_choice")
+
+    aportes = params.get("aportes_extra", [])
+    if not isinstance(aportes, list):
+        erro("aportes_extra", "not_list")
+    else:
+        for i, aporte in enumerate(aportes):
+            campo = f"aportes_extra[{i}]"
+            if not isinstance(aporte, dict):
+                erro(campo, "not_object")
+                continue
+            # Aportes depois do horizonte são ignorados pela simulação
+            codigo = _check_value(aporte.get("mes"), "integer", 1, None)
+            if codigo:
+                erro(f"{campo}.mes", codigo)
+            codigo = _check_value(aporte.get("valor"), "number", 0, None)
+            if codigo:
+                erro(f"{campo}.valor", codigo)
+
+    faixas = params.get("faixas_operacoes")
+    if not isinstance(faixas, list) or not faixas:
+        erro("faixas_operacoes", "not_list")
+    else:
+        # A ordem é livre (a simulação ordena as faixas), mas cada limite aparece uma só vez
+        limites = set()
+        for i, faixa in enumerate(faixas):
+            campo = f"faixas_operacoes[{i}]"
+            if not isinstance(faixa, dict):
+                erro(campo, "not_object")
+                continue
+            codigo = _check_value(faixa.get("capital_ate"), "number", 0, None)
+            if codigo:
+                erro(f"{campo}.capital_ate", codigo)
+            elif faixa["capital_ate"] in limites:
+                erro(f"{campo}.capital_ate", "duplicated")
+            else:
+                limites.add(faixa["capital_ate"])
+            codigo = _check_value(faixa.get("max_ops_mensal"), "integer", 0, None)
+            if codigo:
+                erro(f"{campo}.max_ops_mensal", codigo)
+
+    return erros
@@ -1,5 +1,26 @@
 let defaultParams = null;
 let currentData = null; // Armazena dados da última simulação
+let currentEtag = null; // ETag da última simulação (o servidor responde 304 se os parâmetros não mudaram)
+let virtualTables = {}; // Tabelas virtualizadas exibidas nas abas
+
+// Tabelas com muitas linhas: renderização em janela e páginas buscadas sob demanda
+const VIRTUAL_ROW_HEIGHT = 44;   // altura estimada da linha (px), corrigida após a primeira renderização
+const VIRTUAL_OVERSCAN = 10;     // linhas extras acima e abaixo da área visível
+const VIRTUAL_PAGE_SIZE = 200;   // linhas por página buscada no servidor
+const VIRTUAL_VIEWPORT = 600;    // altura usada enquanto a aba está oculta
+
+// Web Worker que interpreta as páginas e monta os CSVs fora da thread principal
+const TABLE_WORKER_URL = new URL('worker.js', document.currentScript.src).href;
+let tableWorker = null;
+let tableWorkerSeq = 0;
+const tableWorkerPending = new Map();
+
+// Recálculo ao vivo: sessão no servidor, resultados por SSE e envio só dos parâmetros alterados
+const LIVE_DEBOUNCE_MS = 300;
+let liveSession = null;     // {session_id, events_url, params_url, cancel_url}
+let liveEvents = null;      // EventSource da sessão
+let liveSentParams = null;  // últimos parâmetros enviados à sessão
+let liveTimer = null;
 
 // Carrega parâmetros padrão ao iniciar
 document.addEventListener('DOMContentLoaded', async function() {
@@ -33,6 +54,9 @@ document.addEventListener('DOMContentLoaded', async function() {
     
     // Inicializa slider de volume de operações
     initializeVolumeSlider();
+    
+    // Inicializa o recálculo ao vivo
+    initializeLiveMode(form);
 
     // Adicionar novo aporte extra
     addAporteBtn.addEventListener('click', function() {
@@ -83,92 +107,318 @@ document.addEventListener('DOMContentLoaded', async function() {
     form.addEventListener('submit', async function(event) {
         event.preventDefault();
         
-        // Limpa resultados anteriores
+        // Com o recálculo ao vivo ativo, o envio vai pela sessão (sem debounce)
+        if (liveSession) {
+            clearTimeout(liveTimer);
+            sendLiveParams(form);
+            return;
+        }
+        
+        markSimulationStart();
+        
+        // Limpa resultados anteriores (o gráfico é atualizado no lugar com Plotly.react)
         errorDiv.style.display = 'none';
         resumoDiv.innerHTML = '';
-        chartDiv.innerHTML = '';
         tablesSection.style.display = 'none';
         loadingDiv.style.display = 'block';
 
-        // Coleta dados do formulário
-        const formData = new FormData(form);
-        const params = {};
-        
-        for (let [key, value] of formData.entries()) {
-            // Converte para número se apropriado
-            if (value && !isNaN(value)) {
-                params[key] = parseFloat(value);
-            } else {
-                params[key] = value;
-            }
-        }
-
-        // Coleta aportes extras
-        const aportesExtras = [];
-        const aporteItems = document.querySelectorAll('.aporte-item');
-        aporteItems.forEach(item => {
-            const mes = parseInt(item.querySelector('.aporte-mes').value);
-            const valor = parseFloat(item.querySelector('.aporte-valor').value);
-            if (mes && valor) {
-                aportesExtras.push({"mes": mes, "valor": valor});
-            }
-        });
-        params.aportes_extra = aportesExtras;
-
-        // Adiciona parâmetros fixos
-        params.sistema_amortizacao_choices = ["PRICE", "SAC"];
-        params.random_seed = 42;
-
+        const params = collectFormParams(form);
         console.log('Parâmetros enviados:', params);
 
         try {
-            const response = await fetch('/simulate', {
+            const headers = {
+                'Content-Type': 'application/json',
+            };
+            if (currentEtag && currentData) {
+                headers['If-None-Match'] = currentEtag;
+            }
+
+            // Operações servidas por página: a resposta traz só colunas e tamanho
+            const response = await fetch('/simulate?tabelas=paginadas', {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
+                headers: headers,
                 body: JSON.stringify(params),
             });
 
-            loadingDiv.style.display = 'none';
+            if (response.status === 429 || response.status === 503) {
+                const errorData = await response.json();
+                const retryAfter = response.headers.get('Retry-After');
+                throw new Error((errorData.error || 'Servidor ocupado') +
+                    (retryAfter ? ` Tente novamente em ${retryAfter} s.` : ''));
+            }
 
-            if (!response.ok) {
+            if (!response.ok && response.status !== 304) {
                 const errorData = await response.json();
                 throw new Error(errorData.error || 'Erro na simulação');
             }
 
-            const result = await response.json();
-            
-            if (!result.success) {
-                throw new Error(result.error || 'Erro desconhecido na simulação');
+            // 304: mesmos parâmetros da última simulação, reaproveita o resultado local
+            // 202: simulações pesadas são executadas de forma assíncrona pelo servidor
+            let result;
+            let etag = null;
+            if (response.status === 304) {
+                result = currentData;
+                etag = currentEtag;
+            } else if (response.status === 202) {
+                result = await waitForSimulationJob(await response.json());
+            } else {
+                result = await response.json();
+                etag = response.headers.get('ETag');
             }
 
-            // Armazena dados globalmente
-            currentData = result;
-
-            // Exibe resumo
-            displayResumo(result.resumo);
-
-            // Exibe gráfico
-            displayChart(result.chart);
-
-            // Exibe tabelas
-            displayAllTables(result);
+            loadingDiv.style.display = 'none';
+            displaySimulationResult(result, etag);
 
         } catch (error) {
             loadingDiv.style.display = 'none';
-            errorDiv.style.display = 'block';
-            errorDiv.innerHTML = `
-                <div style="color: red; padding: 20px; border: 1px solid red; border-radius: 5px;">
-                    <h3>Erro na Simulação</h3>
-                    <p>${error.message}</p>
-                </div>
-            `;
-            console.error('Erro completo:', error);
+            displaySimulationError(error);
         }
     });
 });
 
+// Coleta os parâmetros do formulário (campos, aportes extras e parâmetros fixos)
+function collectFormParams(form) {
+    const formData = new FormData(form);
+    const params = {};
+    
+    for (let [key, value] of formData.entries()) {
+        // Converte para número se apropriado
+        if (value && !isNaN(value)) {
+            params[key] = parseFloat(value);
+        } else {
+            params[key] = value;
+        }
+    }
+
+    // Coleta aportes extras
+    const aportesExtras = [];
+    const aporteItems = document.querySelectorAll('.aporte-item');
+    aporteItems.forEach(item => {
+        const mes = parseInt(item.querySelector('.aporte-mes').value);
+        const valor = parseFloat(item.querySelector('.aporte-valor').value);
+        if (mes && valor) {
+            aportesExtras.push({"mes": mes, "valor": valor});
+        }
+    });
+    params.aportes_extra = aportesExtras;
+
+    // Adiciona parâmetros fixos
+    params.sistema_amortizacao_choices = ["PRICE", "SAC"];
+    params.random_seed = 42;
+    return params;
+}
+
+// Exibe o resultado de uma simulação (resposta de /simulate ou evento da sessão ao vivo).
+// etag só é informado para respostas 200/304 de /simulate: qualquer outro resultado
+// (job assíncrono, sessão ao vivo) não pode ser revalidado com If-None-Match
+function displaySimulationResult(result, etag = null) {
+    performance.clearMarks('simulacao-resposta');
+    performance.mark('simulacao-resposta');
+    
+    if (!result.success) {
+        displaySimulationError(new Error(result.error || 'Erro desconhecido na simulação'));
+        return;
+    }
+
+    document.getElementById('error-output').style.display = 'none';
+
+    // Armazena dados globalmente, sempre junto com o ETag correspondente
+    currentData = result;
+    currentEtag = etag;
+
+    // Exibe resumo
+    displayResumo(result.resumo);
+
+    // Exibe gráfico
+    displayChart(result.chart);
+
+    // Exibe tabelas
+    displayAllTables(result);
+
+    recordSimulationTimings(result);
+}
+
+function displaySimulationError(error) {
+    const errorDiv = document.getElementById('error-output');
+    Plotly.purge(document.getElementById('chart-output'));
+    errorDiv.style.display = 'block';
+    errorDiv.innerHTML = `
+        <div style="color: red; padding: 20px; border: 1px solid red; border-radius: 5px;">
+            <h3>Erro na Simulação</h3>
+            <p>${error.message}</p>
+        </div>
+    `;
+    console.error('Erro completo:', error);
+}
+
+// Início da medição do tempo até a tela interativa (window.simulationTimings)
+function markSimulationStart() {
+    performance.clearMarks('simulacao-inicio');
+    performance.mark('simulacao-inicio');
+}
+
+function initializeLiveMode(form) {
+    const toggle = document.getElementById('live-recalc');
+    if (!toggle) return;
+
+    toggle.addEventListener('change', function() {
+        if (this.checked) {
+            openLiveSession(form);
+        } else {
+            closeLiveSession();
+        }
+    });
+
+    // Qualquer edição (campos, sliders, aportes, restaurar padrões) agenda o envio com debounce
+    const schedule = function() {
+        if (!liveSession) return;
+        clearTimeout(liveTimer);
+        liveTimer = setTimeout(() => sendLiveParams(form), LIVE_DEBOUNCE_MS);
+    };
+    form.addEventListener('input', schedule);
+    form.addEventListener('click', function(e) {
+        if (e.target.matches('#add-aporte, .remove-aporte, #reset-btn')) schedule();
+    });
+
+    window.addEventListener('pagehide', closeLiveSession);
+}
+
+async function openLiveSession(form) {
+    const toggle = document.getElementById('live-recalc');
+    const params = collectFormParams(form);
+    markSimulationStart();
+    setLiveStatus('Abrindo sessão...');
+
+    try {
+        const response = await fetch('/live/sessions', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(params),
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Não foi possível abrir a sessão ao vivo');
+        }
+        if (!toggle.checked) {
+            // Desativado enquanto a sessão era aberta
+            fetch(`/live/sessions/${data.session_id}`, {method: 'DELETE'});
+            return;
+        }
+        liveSession = data;
+        liveSentParams = params;
+    } catch (error) {
+        toggle.checked = false;
+        setLiveStatus('');
+        displaySimulationError(error);
+        return;
+    }
+
+    liveEvents = new EventSource(liveSession.events_url);
+    liveEvents.addEventListener('executando', () => setLiveStatus('Recalculando...'));
+    liveEvents.addEventListener('cancelado', () => setLiveStatus('Recalculando...'));
+    liveEvents.addEventListener('resultado', function(event) {
+        setLiveStatus('');
+        displaySimulationResult(JSON.parse(event.data));
+    });
+    liveEvents.addEventListener('erro', function(event) {
+        setLiveStatus('');
+        displaySimulationError(new Error(JSON.parse(event.data).error));
+    });
+    liveEvents.onerror = function() {
+        // Sessão expirada no servidor: o EventSource desiste de reconectar
+        if (liveEvents && liveEvents.readyState === EventSource.CLOSED) {
+            toggle.checked = false;
+            closeLiveSession();
+        }
+    };
+}
+
+// Envia à sessão apenas os parâmetros que mudaram desde o último envio
+async function sendLiveParams(form) {
+    if (!liveSession) return;
+    const params = collectFormParams(form);
+    const delta = {};
+    for (const key in params) {
+        if (JSON.stringify(params[key]) !== JSON.stringify(liveSentParams[key])) {
+            delta[key] = params[key];
+        }
+    }
+    if (Object.keys(delta).length === 0) return;
+
+    markSimulationStart();
+    const response = await fetch(liveSession.params_url, {
+        method: 'PATCH',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(delta),
+    });
+    if (response.status === 404) {
+        document.getElementById('live-recalc').checked = false;
+        closeLiveSession();
+        return;
+    }
+    const data = await response.json();
+    if (!response.ok) {
+        displaySimulationError(new Error(data.error || 'Parâmetros inválidos'));
+        return;
+    }
+    liveSentParams = params;
+}
+
+function closeLiveSession() {
+    clearTimeout(liveTimer);
+    if (liveEvents) {
+        liveEvents.close();
+        liveEvents = null;
+    }
+    if (liveSession) {
+        fetch(`/live/sessions/${liveSession.session_id}`, {method: 'DELETE', keepalive: true});
+        liveSession = null;
+    }
+    setLiveStatus('');
+}
+
+function setLiveStatus(text) {
+    const status = document.getElementById('live-status');
+    if (status) status.textContent = text;
+}
+
+// Consulta o status de uma simulação assíncrona até o resultado ficar pronto
+async function waitForSimulationJob(job) {
+    const statusUrl = job.status_url || `/simulate/jobs/${job.job_id}`;
+    while (true) {
+        const response = await fetch(statusUrl);
+        if (response.status === 202) {
+            const retryAfter = parseInt(response.headers.get('Retry-After') || '1');
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            continue;
+        }
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Erro na simulação');
+        }
+        return result;
+    }
+}
+
+// Mede o tempo até a resposta e até o primeiro quadro com resultados (tela interativa)
+function recordSimulationTimings(result) {
+    requestAnimationFrame(() => setTimeout(() => {
+        ['simulacao-interativa', 'simulacao-resposta-ms', 'simulacao-interativa-ms'].forEach(nome => {
+            performance.clearMarks(nome);
+            performance.clearMeasures(nome);
+        });
+        performance.mark('simulacao-interativa');
+        const resposta = performance.measure('simulacao-resposta-ms', 'simulacao-inicio', 'simulacao-resposta');
+        const interativa = performance.measure('simulacao-interativa-ms', 'simulacao-inicio', 'simulacao-interativa');
+        window.simulationTimings = {
+            resposta_ms: Math.round(resposta.duration),
+            interativa_ms: Math.round(interativa.duration),
+            operacoes: result.operacoes ? (result.operacoes.length ?? tableRowCount(result.operacoes)) : 0,
+        };
+        console.log('Tempos da simulação:', window.simulationTimings);
+    }, 0));
+}
+
 function loadFormValues(params) {
     for (let key in params) {
         const input = document.getElementById(key);
@@ -237,8 +487,8 @@ function displayResumo(resumo) {
 function displayChart(chartData) {
     const chartDiv = document.getElementById('chart-output');
     
-    // Usa Plotly para renderizar o gráfico
-    Plotly.newPlot(chartDiv, chartData.data, chartData.layout, {responsive: true});
+    // Plotly.react reaproveita o gráfico existente em vez de recriá-lo
+    Plotly.react(chartDiv, chartData.data, chartData.layout, {responsive: true});
 }
 
 function displayAllTables(data) {
@@ -254,61 +504,146 @@ function displayAllTables(data) {
 function displayTableInTab(tableName, tableData) {
     const container = document.getElementById(`table-${tableName}`);
     
-    if (!tableData || tableData.length === 0) {
+    const totalRows = tableData ? (tableData.length ?? tableRowCount(tableData)) : 0;
+    if (totalRows === 0) {
         container.innerHTML = '<p>Nenhum dado disponível.</p>';
+        delete virtualTables[tableName];
         return;
     }
 
-    // Obtém colunas
-    const columns = Object.keys(tableData[0]);
-    
-    // Mostra apenas as 20 primeiras linhas
-    let dataToShow = tableData;
-    let showingMessage = '';
-    
-    if (tableData.length > 20) {
-        dataToShow = tableData.slice(0, 20);
-        showingMessage = `<p style="text-align: center; margin: 10px 0; color: #666;">
-            Exibindo primeiras 20 linhas de ${tableData.length} totais. 
-            Use o botão de download para visualizar todos os dados.
-        </p>`;
+    virtualTables[tableName] = new VirtualTable(container, tableData);
+}
+
+// Formata valores monetários (exceto parcela_inadimplente) e numéricos
+function formatCell(col, value) {
+    if (typeof value === 'number' && !col.includes('parcela_inadimplente') && 
+        (col.includes('valor') || col.includes('saldo') || 
+        col.includes('desembolso') || col.includes('garantido') || col.includes('honra') || 
+        col.includes('limite') || col.includes('recupera'))) {
+        value = 'R$ ' + formatMoney(value);
+    } else if (typeof value === 'number' && !col.includes('mes') && !col.includes('prazo') && 
+               !col.includes('operacoes') && !col.includes('taxa') && !col.includes('prop') && 
+               !col.includes('alavancagem') && !col.includes('percentual') && 
+               !col.includes('parcela_inadimplente')) {
+        value = value.toFixed(2);
     }
+    return value !== null && value !== undefined && value !== '' ? value : '-';
+}
 
-    let tableHTML = '<div class="table-container"><table class="data-table"><thead><tr>';
-    
-    // Cabeçalho
-    columns.forEach(col => {
-        const label = col.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
-        tableHTML += `<th>${label}</th>`;
-    });
-    tableHTML += '</tr></thead><tbody>';
+// Tabela com rolagem virtual: só as linhas visíveis (mais uma margem) existem no DOM.
+// Aceita dados inline ({columns, data}) ou paginados no servidor ({columns, length, page_url}).
+class VirtualTable {
+    constructor(container, tableData) {
+        this.columns = tableData.columns;
+        this.length = tableData.length ?? tableRowCount(tableData);
+        this.data = tableData.page_url ? null : tableData.data;
+        this.pageUrl = tableData.page_url || null;
+        this.pages = new Map(); // índice da página -> página carregada ou Promise em andamento
+        this.rowHeight = VIRTUAL_ROW_HEIGHT;
+        this.measured = false;
+        this.range = null;
+        this.frame = null;
+
+        const header = this.columns.map(col => {
+            const label = col.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+            return `<th>${label}</th>`;
+        }).join('');
+        container.innerHTML = `
+            <div class="table-container virtual-table">
+                <table class="data-table"><thead><tr>${header}</tr></thead><tbody></tbody></table>
+            </div>
+            <p class="virtual-table-info">${this.length.toLocaleString('pt-BR')} linhas</p>
+        `;
+        this.viewport = container.querySelector('.virtual-table');
+        this.tbody = container.querySelector('tbody');
+        this.info = container.querySelector('.virtual-table-info');
+
+        // Renderiza no máximo uma vez por quadro durante a rolagem
+        this.viewport.addEventListener('scroll', () => {
+            if (this.frame === null) {
+                this.frame = requestAnimationFrame(() => {
+                    this.frame = null;
+                    this.render();
+                });
+            }
+        }, {passive: true});
 
-    // Dados
-    dataToShow.forEach((row, idx) => {
-        tableHTML += '<tr>';
-        columns.forEach(col => {
-            let value = row[col];
-            // Formata valores monetários (exceto parcela_inadimplente)
-            if (typeof value === 'number' && !col.includes('parcela_inadimplente') && 
-                (col.includes('valor') || col.includes('saldo') || 
-                col.includes('desembolso') || col.includes('garantido') || col.includes('honra') || 
-                col.includes('limite') || col.includes('recupera'))) {
-                value = 'R$ ' + formatMoney(value);
-            } else if (typeof value === 'number' && !col.includes('mes') && !col.includes('prazo') && 
-                       !col.includes('operacoes') && !col.includes('taxa') && !col.includes('prop') && 
-                       !col.includes('alavancagem') && !col.includes('percentual') && 
-                       !col.includes('parcela_inadimplente')) {
-                value = value.toFixed(2);
+        this.render();
+    }
+
+    render(force = false) {
+        const height = this.viewport.clientHeight || VIRTUAL_VIEWPORT;
+        const top = this.viewport.scrollTop;
+        const first = Math.max(0, Math.floor(top / this.rowHeight) - VIRTUAL_OVERSCAN);
+        const last = Math.min(this.length, Math.ceil((top + height) / this.rowHeight) + VIRTUAL_OVERSCAN);
+        if (!force && this.range && this.range[0] === first && this.range[1] === last) return;
+        this.range = [first, last];
+
+        const ncols = this.columns.length;
+        let html = this.spacer(first * this.rowHeight);
+        for (let idx = first; idx < last; idx++) {
+            const row = this.row(idx);
+            const parity = idx % 2 ? ' linha-par' : '';
+            if (row === null) {
+                html += `<tr class="linha linha-carregando${parity}"><td colspan="${ncols}">Carregando...</td></tr>`;
+                continue;
             }
-            tableHTML += `<td>${value !== null && value !== undefined && value !== '' ? value : '-'}</td>`;
-        });
-        tableHTML += '</tr>';
-    });
+            html += `<tr class="linha${parity}">`;
+            for (let c = 0; c < ncols; c++) {
+                html += `<td>${formatCell(this.columns[c], row[c])}</td>`;
+            }
+            html += '</tr>';
+        }
+        html += this.spacer((this.length - last) * this.rowHeight);
+        this.tbody.innerHTML = html;
+
+        // Ajusta a altura real da linha (depende da fonte) uma única vez
+        if (!this.measured) {
+            const tr = this.tbody.querySelector('tr.linha:not(.linha-carregando)');
+            if (tr && tr.offsetHeight) {
+                this.measured = true;
+                if (Math.abs(tr.offsetHeight - this.rowHeight) > 1) {
+                    this.rowHeight = tr.offsetHeight;
+                    this.render(true);
+                }
+            }
+        }
+    }
 
-    tableHTML += '</tbody></table></div>';
-    tableHTML += showingMessage;
+    spacer(height) {
+        if (height <= 0) return '';
+        return `<tr class="virtual-spacer"><td colspan="${this.columns.length}" style="height: ${height}px"></td></tr>`;
+    }
+
+    // Valores da linha idx, ou null enquanto a página correspondente é carregada
+    row(idx) {
+        if (this.data) {
+            return this.columns.map(col => this.data[col][idx]);
+        }
+        const pageIndex = Math.floor(idx / VIRTUAL_PAGE_SIZE);
+        const page = this.pages.get(pageIndex);
+        if (!page || page instanceof Promise) {
+            if (!page) this.loadPage(pageIndex);
+            return null;
+        }
+        return this.columns.map(col => page.data[col][idx - page.offset]);
+    }
 
-    container.innerHTML = tableHTML;
+    loadPage(pageIndex) {
+        const request = callTableWorker({
+            tipo: 'pagina',
+            url: this.pageUrl,
+            offset: pageIndex * VIRTUAL_PAGE_SIZE,
+            limit: VIRTUAL_PAGE_SIZE,
+        }).then(page => {
+            this.pages.set(pageIndex, page);
+            this.render(true);
+        }).catch(error => {
+            this.pages.delete(pageIndex);
+            this.info.textContent = error.message;
+        });
+        this.pages.set(pageIndex, request);
+    }
 }
 
 function initializeTabs() {
@@ -323,6 +658,11 @@ function initializeTabs() {
             // Adiciona active ao clicado
             this.classList.add('active');
             document.getElementById(`tab-${tabName}`).classList.add('active');
+            
+            // A aba oculta não tinha altura: recalcula as linhas visíveis
+            if (virtualTables[tabName]) {
+                virtualTables[tabName].render(true);
+            }
         });
     });
 }
@@ -336,53 +676,70 @@ function initializeDownloads() {
     });
 }
 
-function downloadCSV(tableName) {
+// Envia uma mensagem ao worker das tabelas e aguarda a resposta
+function callTableWorker(message) {
+    if (!tableWorker) {
+        tableWorker = new Worker(TABLE_WORKER_URL);
+        tableWorker.onmessage = function(event) {
+            const {id, ok, resultado, erro} = event.data;
+            const pending = tableWorkerPending.get(id);
+            tableWorkerPending.delete(id);
+            if (pending) {
+                ok ? pending.resolve(resultado) : pending.reject(new Error(erro));
+            }
+        };
+    }
+    return new Promise((resolve, reject) => {
+        const id = ++tableWorkerSeq;
+        tableWorkerPending.set(id, {resolve, reject});
+        tableWorker.postMessage({...message, id: id});
+    });
+}
+
+async function downloadCSV(tableName) {
     if (!currentData || !currentData[tableName]) {
         alert('Dados não disponíveis para download.');
         return;
     }
 
+    // O CSV é montado no worker; tabelas paginadas são buscadas inteiras por ele
     const data = currentData[tableName];
-    const csv = convertToCSV(data);
-    const blob = new Blob([csv], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    const url = URL.createObjectURL(blob);
-    
-    link.setAttribute('href', url);
-    link.setAttribute('download', `simulacao_${tableName}_${new Date().toISOString().slice(0,10)}.csv`);
-    link.style.visibility = 'hidden';
-    document.body.appendChild(link);
-    link.click();
-    document.body.removeChild(link);
-}
+    const message = data.page_url
+        ? {tipo: 'csv', url: data.page_url, length: data.length}
+        : {tipo: 'csv', tabela: data};
+    const button = document.querySelector(`.download-btn[data-table="${tableName}"]`);
+    if (button) button.disabled = true;
 
-function convertToCSV(data) {
-    if (!data || data.length === 0) return '';
-    
-    const headers = Object.keys(data[0]);
-    const csvRows = [];
-    
-    // Cabeçalho
-    csvRows.push(headers.join(','));
-    
-    // Dados
-    for (const row of data) {
-        const values = headers.map(header => {
-            const value = row[header];
-            // Escapa vírgulas e aspas
-            const escaped = ('' + value).replace(/"/g, '""');
-            return `"${escaped}"`;
-        });
-        csvRows.push(values.join(','));
+    try {
+        const blob = await callTableWorker(message);
+        const link = document.createElement('a');
+        const url = URL.createObjectURL(blob);
+        
+        link.setAttribute('href', url);
+        link.setAttribute('download', `simulacao_${tableName}_${new Date().toISOString().slice(0,10)}.csv`);
+        link.style.visibility = 'hidden';
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+        setTimeout(() => URL.revokeObjectURL(url), 10000);
+    } catch (error) {
+        alert(`Erro ao gerar o CSV: ${error.message}`);
+    } finally {
+        if (button) button.disabled = false;
     }
-    
-    return csvRows.join('\n');
+}
+
+// Número de linhas de uma tabela em formato colunar
+function tableRowCount(tableData) {
+    if (!tableData || !tableData.columns || tableData.columns.length === 0) return 0;
+    return tableData.data[tableData.columns[0]].length;
 }
 
 function displayTable(carteiraData) {
     const tableDiv = document.getElementById('table-output');
     
-    if (!carteiraData || carteiraData.length === 0) {
+    const totalRows = tableRowCount(carteiraData);
+    if (totalRows === 0) {
         tableDiv.innerHTML = '<p>Nenhum dado de carteira disponível.</p>';
         return;
     }
@@ -417,11 +774,11 @@ function displayTable(carteiraData) {
     tableHTML += '</tr></thead><tbody>';
 
     // Dados (mostra últimos 12 meses por padrão)
-    const dataToShow = carteiraData.slice(-12);
-    dataToShow.forEach(row => {
+    const firstRow = Math.max(0, totalRows - 12);
+    for (let idx = firstRow; idx < totalRows; idx++) {
         tableHTML += '<tr>';
         columns.forEach(col => {
-            let value = row[col];
+            let value = carteiraData.data[col][idx];
             // Formata valores monetários
             if (['desembolso_mes', 'desembolso_acum', 'saldo_devedor_carteira', 
                  'valor_garantido_mes', 'honras_acumuladas', 'parcelas_recebidas_mes'].includes(col)) {
@@ -430,11 +787,11 @@ function displayTable(carteiraData) {
             tableHTML += `<td>${value !== null && value !== undefined ? value : '-'}</td>`;
         });
         tableHTML += '</tr>';
-    });
+    }
 
     tableHTML += '</tbody></table></div>';
     tableHTML += `<p style="text-align: center; margin-top: 10px; color: #666;">
-        Exibindo últimos ${dataToShow.length} meses de ${carteiraData.length} meses totais
+        Exibindo últimos ${totalRows - firstRow} meses de ${totalRows} meses totais
     </p>`;
 
     tableDiv.innerHTML = tableHTML;
@@ -0,0 +1,58 @@
+// Web Worker das tabelas de resultado: busca e interpreta páginas de tabelas
+// grandes e monta os CSVs de download fora da thread principal.
+//
+// Mensagens recebidas: {id, tipo: 'pagina', url, offset, limit}
+//                      {id, tipo: 'csv', url?, length?, tabela?}
+// Resposta: {id, ok: true, resultado} ou {id, ok: false, erro}
+
+const CSV_BLOCO = 5000; // linhas por bloco de texto do CSV
+
+self.onmessage = async function(event) {
+    const msg = event.data;
+    try {
+        let resultado;
+        if (msg.tipo === 'pagina') {
+            resultado = await fetchPagina(msg.url, msg.offset, msg.limit);
+        } else if (msg.tipo === 'csv') {
+            // Tabela enviada pela thread principal ou buscada inteira no servidor
+            const tabela = msg.tabela || await fetchPagina(msg.url, 0, msg.length);
+            resultado = convertToCSVBlob(tabela);
+        } else {
+            throw new Error(`Mensagem desconhecida: ${msg.tipo}`);
+        }
+        self.postMessage({id: msg.id, ok: true, resultado: resultado});
+    } catch (error) {
+        self.postMessage({id: msg.id, ok: false, erro: error.message});
+    }
+};
+
+async function fetchPagina(url, offset, limit) {
+    const response = await fetch(`${url}?offset=${offset}&limit=${limit}`);
+    // O JSON é interpretado aqui, fora da thread principal
+    const pagina = await response.json();
+    if (!response.ok) {
+        throw new Error(pagina.error || 'Erro ao carregar a tabela');
+    }
+    return pagina;
+}
+
+function convertToCSVBlob(tabela) {
+    const headers = tabela.columns;
+    const colunas = headers.map(header => tabela.data[header]);
+    const totalRows = colunas.length ? colunas[0].length : 0;
+
+    // Monta o texto em blocos para não concatenar uma única string gigante
+    const partes = [headers.join(',') + '\n'];
+    for (let inicio = 0; inicio < totalRows; inicio += CSV_BLOCO) {
+        const fim = Math.min(inicio + CSV_BLOCO, totalRows);
+        const linhas = new Array(fim - inicio);
+        for (let idx = inicio; idx < fim; idx++) {
+            // Escapa vírgulas e aspas
+            linhas[idx - inicio] = colunas.map(
+                valores => `"${('' + valores[idx]).replace(/"/g, '""')}"`
+            ).join(',');
+        }
+        partes.push(linhas.join('\n') + (fim < totalRows ? '\n' : ''));
+    }
+    return new Blob(partes, {type: 'text/csv;charset=utf-8;'});
+}